@@ -1,27 +1,35 @@
-import os
-from fastapi import Depends, FastAPI, Request
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-from src.pipeline import data_preprocessing_pipeline, train_pipeline, predict_pipeline
-from hydra import compose, initialize
-from omegaconf import DictConfig, OmegaConf
-from src.utils import get_logger
-app = FastAPI()
+from src.pipeline import (
+    data_preprocessing_pipeline, train_pipeline, full_pipeline, predict_pipeline, JobRunner,
+)
+from omegaconf import DictConfig
+from src.utils import get_logger, ConfigProvider
+from serve import PredictRequest, start_serving, stop_serving, handle_predict, get_health, get_cache_stats
 logger = get_logger()
 
 
+config_provider = ConfigProvider(config_dir="configs", job_name="mlops-crack")
+
+
 def get_config() -> DictConfig:
-    try:
-        with initialize(version_base="1.3", config_path="configs", job_name="mlops-crack"):
-            config = compose(config_name="config", return_hydra_config=True)
-            logger.info(f"Config loaded successfully at: {os.getcwd()}")
-            logger.info(f"Resolved config: {OmegaConf.to_yaml(config)}")  # Log the resolved config
-            OmegaConf.resolve(config)
-            return config 
-    except Exception as e:
-        logger.error(f"Error during Hydra config initialization: {e}")
-        raise
+    # Config được compose một lần và chỉ compose lại khi configs/ thay đổi
+    return config_provider.get()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load model một lần khi khởi động, các request sau chỉ lấy từ bộ nhớ
+    config = get_config()
+    await start_serving(app, config)
+    app.state.job_runner = JobRunner(app.state.model_store.config)
+    yield
+    await stop_serving(app)
+    app.state.job_runner.shutdown(wait=False)
+
+app = FastAPI(lifespan=lifespan)
 
 # Đường dẫn tới thư mục chứa template HTML
 templates = Jinja2Templates(directory="templates")
@@ -32,38 +40,80 @@ async def home(request: Request):
     """Trang chủ để test các pipeline"""
     return templates.TemplateResponse("index.html", {"request": request})
 
+@app.post("/config/reload")
+async def reload_config():
+    """Compose lại config từ thư mục configs/"""
+    try:
+        config_provider.reload()
+        return {"status": "Config reloaded successfully"}
+    except Exception as e:
+        return {"status": "Failed to reload config", "error": str(e)}
+
+def submit_job(job_type: str, fn, *args, **kwargs) -> dict:
+    try:
+        job = app.state.job_runner.submit(job_type, fn, *args, **kwargs)
+        return {"status": f"{job_type.capitalize()} pipeline submitted", "job_id": job.id}
+    except Exception as e:
+        logger.error(f"Error submitting {job_type} pipeline: {e}")
+        return {"status": f"Failed to submit {job_type} pipeline", "error": str(e)}
+
 @app.post("/data_pipeline")
 async def run_data_pipeline(
     hydra_config: DictConfig = Depends(get_config)
 ):
-    """Chạy data pipeline"""
-    try:
-        data_preprocessing_pipeline(hydra_config)
-        return {"status": "Data pipeline executed successfully"}
-    except Exception as e:
-        logger.error(f"Error executing data pipeline: {e}")
-        return {"status": "Failed to execute data pipeline", "error": str(e)}
+    """Chạy data pipeline ở background, trả về job_id"""
+    return submit_job("data", data_preprocessing_pipeline, hydra_config, defer_versioning=True)
 
 @app.post("/training_pipeline")
 async def run_training_pipeline(
     hydra_config: DictConfig = Depends(get_config)
 ):
-    """Chạy training pipeline"""
-    try:
-        train_pipeline(hydra_config)
-        return {"status": "Training pipeline executed successfully"}
-    except Exception as e:
-        logger.error(f"Error executing training pipeline: {e}")
-        return {"status": "Failed to execute training pipeline", "error": str(e)}
+    """Chạy training pipeline ở background, trả về job_id"""
+    return submit_job("training", train_pipeline, hydra_config, defer_versioning=True)
+
+@app.post("/full_pipeline")
+async def run_full_pipeline(
+    hydra_config: DictConfig = Depends(get_config)
+):
+    """Chạy data + training pipeline trong một job, dữ liệu truyền qua bộ nhớ"""
+    return submit_job("full", full_pipeline, hydra_config, defer_versioning=True)
 
 @app.post("/prediction_pipeline")
 async def run_prediction_pipeline(
     hydra_config: DictConfig = Depends(get_config)
 ):
-    """Chạy prediction pipeline"""
+    """Chạy prediction pipeline ở background, trả về job_id"""
     try:
-        predict_pipeline(hydra_config)
-        return {"status": "Prediction pipeline executed successfully"}
+        evaluator = app.state.model_store.get()
     except Exception as e:
-        logger.error(f"Error executing prediction pipeline: {e}")
-        return {"status": "Failed to execute prediction pipeline", "error": str(e)}
+        logger.error(f"Error loading model for prediction pipeline: {e}")
+        return {"status": "Failed to submit prediction pipeline", "error": str(e)}
+    return submit_job("prediction", predict_pipeline, hydra_config, evaluator=evaluator)
+
+@app.get("/jobs")
+async def list_jobs():
+    """Danh sách các job và trạng thái"""
+    return [job.to_dict() for job in app.state.job_runner.list_jobs()]
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Trạng thái và kết quả của một job"""
+    job = app.state.job_runner.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job.to_dict()
+
+@app.get("/health")
+async def health():
+    """Process đã sẵn sàng và version của model đang được serve (0: chưa load được)"""
+    return get_health(app)
+
+@app.get("/cache")
+async def cache_stats():
+    """Các bộ đếm hit/miss/eviction của prediction cache"""
+    return get_cache_stats(app)
+
+@app.post("/predict")
+async def predict(request: PredictRequest):
+    """Dự đoán các dòng feature, gom batch với các request đồng thời"""
+    return await handle_predict(app, request)
@@ -0,0 +1,366 @@
+"""
+Load test HTTP cho FastAPI app: phát lại một corpus request (JSONL) với số
+request đồng thời và tốc độ đến cấu hình được, báo cáo p50/p95/p99 latency,
+throughput và tỉ lệ lỗi theo từng endpoint.
+
+Mỗi dòng của corpus là một request:
+    {"method": "POST", "path": "/predict", "body": {"rows": [[5.1, 3.5, 1.4, 0.2]]}}
+    {"method": "GET", "path": "/health", "name": "health"}
+`name` (mặc định "METHOD path") là nhóm để tính số liệu. Không có `--corpus`
+thì corpus được sinh ngẫu nhiên (chủ yếu /predict 1-32 dòng, thêm /health và
+/cache); `--write-corpus` lưu lại để dùng cho các lần chạy sau.
+
+Không có `--url`, script dựng một môi trường local trong thư mục làm việc
+(không cần MLflow server hay S3):
+
+- bản sao configs/ với `mlflow.tracking_uri` là file store mlruns/ và
+  `dvc.remote: local`
+- DVC repo (`dvc init --no-scm`) với remote `local` là thư mục dvc-remote/,
+  dữ liệu raw (Iris.csv hoặc dữ liệu giả với `--rows`) đã được add và push
+- model được train bằng full_pipeline trước khi khởi động server
+- uvicorn chạy `--app` (app hoặc serve) với `--workers` process từ thư mục đó
+
+Với `--rate`, request đến theo lịch cố định (open loop, `--arrival poisson`
+cho khoảng cách ngẫu nhiên) và latency được tính từ thời điểm dự kiến gửi, kể
+cả thời gian chờ khi đã đủ `--concurrency` request đang chạy. Không có
+`--rate`, `--concurrency` client gửi request liên tục (closed loop).
+
+Chạy từ thư mục gốc của repo:
+    python -m benchmarks.load_test --workers 4 --concurrency 64 --rate 500 --duration 30 --json outputs/load.json
+    python -m benchmarks.load_test --url http://localhost:8000 --corpus outputs/corpus.jsonl --concurrency 16
+"""
+import argparse
+import asyncio
+import json
+import os
+import pathlib
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.pipeline_benchmark import git_info
+from benchmarks.synthetic_data import generate_dataset
+
+REPORT_FORMAT = "mlops-load-test"
+REPORT_VERSION = 1
+DVC_REMOTE = "local"
+PERCENTILES = [50, 95, 99]
+# Train model trong môi trường local bằng đúng pipeline của app (MLflow file store, DVC remote local)
+SEED_SCRIPT = (
+    "from src.utils import ConfigProvider; "
+    "from src.pipeline import full_pipeline; "
+    "future = full_pipeline(ConfigProvider(config_dir='configs').get()); "
+    "future is not None and future.result()"
+)
+
+
+def prepare_sandbox(workdir: str, rows: int = None, seed: int = 42) -> dict:
+    """
+    Dựng thư mục làm việc với MLflow file store, DVC remote local và model đã
+    train. Trả về biến môi trường để chạy server trong thư mục đó.
+    """
+    from omegaconf import OmegaConf
+
+    os.makedirs(workdir, exist_ok=True)
+    tracking_uri = pathlib.Path(workdir, "mlruns").as_uri()
+    env = {
+        **os.environ,
+        "MLFLOW_TRACKING_URI": tracking_uri,
+        "PYTHONPATH": os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])),
+        # DVCRemoteManager gọi `dvc` từ PATH
+        "PATH": os.pathsep.join([os.path.dirname(sys.executable), os.environ.get("PATH", "")]),
+    }
+
+    configs_dir = os.path.join(workdir, "configs")
+    if not os.path.exists(configs_dir):
+        shutil.copytree(os.path.join(ROOT, "configs"), configs_dir)
+        config_file = os.path.join(configs_dir, "config.yaml")
+        config = OmegaConf.load(config_file)
+        config.mlflow.tracking_uri = tracking_uri
+        config.dvc.remote = DVC_REMOTE
+        OmegaConf.save(config, config_file)
+    if not os.path.exists(os.path.join(workdir, "templates")):
+        os.symlink(os.path.join(ROOT, "templates"), os.path.join(workdir, "templates"))
+
+    raw_file = os.path.join(workdir, "data", "raw", "Iris.csv")
+    if not os.path.exists(raw_file):
+        source = os.path.join(ROOT, "data", "raw", "Iris.csv")
+        if rows is None and os.path.exists(source):
+            os.makedirs(os.path.dirname(raw_file), exist_ok=True)
+            shutil.copy(source, raw_file)
+        else:
+            generate_dataset(raw_file, rows or 1500, random_state=seed)
+
+    def run(*command):
+        subprocess.run(command, cwd=workdir, env=env, check=True, capture_output=True, text=True)
+
+    if not os.path.exists(os.path.join(workdir, ".dvc")):
+        run(sys.executable, "-m", "dvc", "init", "--no-scm")
+        run(sys.executable, "-m", "dvc", "remote", "add", "-d", DVC_REMOTE, os.path.join(workdir, "dvc-remote"))
+        run(sys.executable, "-m", "dvc", "add", os.path.relpath(raw_file, workdir))
+        run(sys.executable, "-m", "dvc", "push")
+    if not os.path.exists(os.path.join(workdir, "models", "model.pkl")):
+        print("Training the model for the sandbox...", flush=True)
+        run(sys.executable, "-c", SEED_SCRIPT)
+    return env
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workdir: str, env: dict, app_module: str, workers: int, port: int, timeout: float = 120.0):
+    """Khởi động uvicorn và chờ tới khi /health trả về model đã được load"""
+    import httpx
+
+    log_file = open(os.path.join(workdir, "server.log"), "w")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", f"{app_module}:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=workdir, env=env, stdout=log_file, stderr=subprocess.STDOUT,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}, see {log_file.name}")
+        try:
+            if httpx.get(f"{url}/health", timeout=1.0).json().get("model_version"):
+                return process, url
+        except (httpx.HTTPError, ValueError):
+            pass
+        time.sleep(0.2)
+    stop_server(process)
+    raise TimeoutError(f"Server was not ready after {timeout}s, see {log_file.name}")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def build_corpus(n_requests: int, n_features: int = 4, seed: int = 42) -> list:
+    """Corpus ngẫu nhiên: 90% /predict (1-32 dòng, 20% trùng các dòng hay gặp), 8% /health, 2% /cache"""
+    rng = random.Random(seed)
+    hot_rows = [[round(rng.uniform(0.1, 8.0), 1) for _ in range(n_features)] for _ in range(50)]
+    corpus = []
+    for _ in range(n_requests):
+        draw = rng.random()
+        if draw < 0.02:
+            corpus.append({"method": "GET", "path": "/cache"})
+        elif draw < 0.10:
+            corpus.append({"method": "GET", "path": "/health"})
+        else:
+            rows = [
+                rng.choice(hot_rows) if rng.random() < 0.2
+                else [round(rng.uniform(0.1, 8.0), 1) for _ in range(n_features)]
+                for _ in range(rng.choice([1, 1, 1, 4, 8, 32]))
+            ]
+            corpus.append({"method": "POST", "path": "/predict", "body": {"rows": rows}})
+    return corpus
+
+
+def load_corpus(path: str) -> list:
+    with open(path) as f:
+        corpus = [json.loads(line) for line in f if line.strip()]
+    if not corpus:
+        raise ValueError(f"Corpus {path} is empty")
+    return corpus
+
+
+def write_corpus(corpus: list, path: str):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        for entry in corpus:
+            f.write(json.dumps(entry) + "\n")
+
+
+async def send(client, entry: dict, scheduled: float, semaphore: asyncio.Semaphore, samples: list):
+    name = entry.get("name") or f"{entry.get('method', 'GET').upper()} {entry['path']}"
+    async with semaphore:
+        try:
+            response = await client.request(entry.get("method", "GET"), entry["path"], json=entry.get("body"))
+            status = response.status_code
+        except Exception as e:
+            status = type(e).__name__
+    samples.append((name, status, time.perf_counter() - scheduled))
+
+
+async def run_load(
+    url: str,
+    corpus: list,
+    concurrency: int,
+    rate: float = None,
+    arrival: str = "constant",
+    n_requests: int = None,
+    duration: float = None,
+    timeout: float = 30.0,
+    seed: int = 42,
+) -> tuple:
+    """
+    Gửi corpus (lặp lại vòng tròn) tới `url` cho tới khi đủ `n_requests` hoặc hết `duration` giây.
+
+    Returns:
+        tuple: (list các (name, status, latency_s), thời gian chạy tính bằng giây)
+    """
+    import httpx
+
+    if n_requests is None and duration is None:
+        n_requests = len(corpus)
+    rng = random.Random(seed)
+    semaphore = asyncio.Semaphore(concurrency)
+    samples = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=timeout) as client:
+        start = time.perf_counter()
+
+        def more(sent: int) -> bool:
+            if n_requests is not None and sent >= n_requests:
+                return False
+            return duration is None or time.perf_counter() - start < duration
+
+        if rate:
+            # Open loop: lịch gửi không phụ thuộc tốc độ trả lời của server
+            tasks = []
+            scheduled = start
+            while more(len(tasks)):
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                entry = corpus[len(tasks) % len(corpus)]
+                tasks.append(asyncio.create_task(send(client, entry, scheduled, semaphore, samples)))
+                scheduled += rng.expovariate(rate) if arrival == "poisson" else 1.0 / rate
+            await asyncio.gather(*tasks)
+        else:
+            sent = 0
+
+            async def worker():
+                nonlocal sent
+                while more(sent):
+                    entry = corpus[sent % len(corpus)]
+                    sent += 1
+                    await send(client, entry, time.perf_counter(), semaphore, samples)
+
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return samples, elapsed
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    # Nearest-rank
+    index = max(int(-(-q * len(sorted_values) // 100)) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+def summarize(samples: list, elapsed: float) -> dict:
+    groups = {"total": samples}
+    for sample in samples:
+        groups.setdefault(sample[0], []).append(sample)
+    summary = {}
+    for name, group in groups.items():
+        latencies = sorted(latency for _, _, latency in group)
+        statuses = {}
+        for _, status, _ in group:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        errors = sum(1 for _, status, _ in group if not isinstance(status, int) or status >= 400)
+        summary[name] = {
+            "requests": len(group),
+            "errors": errors,
+            "error_rate": errors / len(group),
+            "throughput_rps": len(group) / elapsed,
+            **{f"p{q}_ms": percentile(latencies, q) * 1000 for q in PERCENTILES},
+            "mean_ms": sum(latencies) / len(latencies) * 1000,
+            "max_ms": latencies[-1] * 1000,
+            "status_codes": statuses,
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="Server đang chạy; mặc định dựng môi trường local và khởi động server")
+    parser.add_argument("--app", default="app", choices=["app", "serve"])
+    parser.add_argument("--workers", type=int, default=1, help="Số worker uvicorn")
+    parser.add_argument("--corpus", default=None, help="File JSONL, mỗi dòng một request")
+    parser.add_argument("--corpus-size", type=int, default=1000, help="Số request của corpus sinh ngẫu nhiên")
+    parser.add_argument("--write-corpus", default=None, help="Lưu corpus sinh ngẫu nhiên ra file JSONL")
+    parser.add_argument("--concurrency", type=int, default=16, help="Số request đang chạy tối đa")
+    parser.add_argument("--rate", type=float, default=None, help="Số request mỗi giây (open loop)")
+    parser.add_argument("--arrival", default="constant", choices=["constant", "poisson"])
+    parser.add_argument("--requests", type=int, default=None, help="Tổng số request (mặc định: một lượt corpus)")
+    parser.add_argument("--duration", type=float, default=None, help="Số giây gửi request")
+    parser.add_argument("--warmup", type=int, default=50, help="Số request gửi trước, không tính vào kết quả")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--rows", type=int, default=None, help="Train trên dữ liệu giả thay vì data/raw/Iris.csv")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workdir", default=None, help="Thư mục môi trường local, giữ lại để dùng lại (mặc định: thư mục tạm)")
+    parser.add_argument("--json", default=None, help="Ghi báo cáo ra file JSON")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else build_corpus(args.corpus_size, seed=args.seed)
+    if args.write_corpus:
+        write_corpus(corpus, args.write_corpus)
+
+    server = None
+    workdir = None
+    url = args.url
+    try:
+        if url is None:
+            workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="load-test-"))
+            env = prepare_sandbox(workdir, args.rows, args.seed)
+            server, url = start_server(workdir, env, args.app, args.workers, free_port())
+        if args.warmup:
+            asyncio.run(run_load(url, corpus, args.concurrency, n_requests=args.warmup, timeout=args.timeout))
+        samples, elapsed = asyncio.run(run_load(
+            url, corpus, args.concurrency, rate=args.rate, arrival=args.arrival,
+            n_requests=args.requests, duration=args.duration, timeout=args.timeout, seed=args.seed,
+        ))
+    finally:
+        if server is not None:
+            stop_server(server)
+        if workdir is not None and args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    summary = summarize(samples, elapsed)
+    print(f"{len(samples)} requests in {elapsed:.1f}s, concurrency {args.concurrency}, rate {args.rate or 'max'}")
+    print(f"{'endpoint':<20}{'requests':>9}{'rps':>9}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name, stats in summary.items():
+        print(
+            f"{name:<20}{stats['requests']:>9}{stats['throughput_rps']:>9.1f}{stats['error_rate']:>8.1%}"
+            f"{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}"
+        )
+    if args.json:
+        report = {
+            "format": REPORT_FORMAT,
+            "version": REPORT_VERSION,
+            "git": git_info(),
+            "settings": {
+                "url": args.url,
+                "app": None if args.url else args.app,
+                "workers": None if args.url else args.workers,
+                "corpus": args.corpus,
+                "corpus_size": len(corpus),
+                **{key: getattr(args, key) for key in ("concurrency", "rate", "arrival", "requests", "duration")},
+            },
+            "elapsed_s": elapsed,
+            "endpoints": summary,
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Microbenchmark cho src/utils/custom_logger: số record/giây mà thread gọi log
+xử lý được với
+
+- legacy: formatter cũ (copy record, tách pathname, click.style mỗi record),
+  handler ghi đồng bộ
+- sync: formatter mới, handler ghi đồng bộ
+- async: formatter mới, handler nằm sau QueueHandler/QueueListener
+
+Với async, "caller" là tốc độ phía thread gọi log, "total" tính cả thời gian
+listener ghi hết queue.
+
+Chạy từ thư mục gốc của repo:
+    python -m benchmarks.logging_benchmark --records 50000 --colors
+"""
+import argparse
+import logging
+import os
+import queue
+import sys
+import tempfile
+import time
+from copy import copy
+from logging.handlers import QueueListener
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.custom_logger import (  # noqa: E402
+    DefaultFormatter,
+    FileFormater,
+    _AsyncQueueHandler,
+)
+
+STREAM_FORMAT = "%(asctime)s | %(levelprefix)s - [%(relpathname)s %(funcName)s(%(lineno)d)] - %(message)s"
+FILE_FORMAT = "%(asctime)s | %(levelname)-8s - [%(relpathname)s %(funcName)s(%(lineno)d)] - %(message)s"
+
+
+class LegacyStreamFormatter(DefaultFormatter):
+    """formatMessage của DefaultFormatter trước khi tối ưu, giữ lại để so sánh"""
+
+    def formatMessage(self, record):
+        recordcopy = copy(record)
+        recordcopy.__dict__["relpathname"] = "/".join(recordcopy.pathname.split("/")[-2:])
+        levelname = recordcopy.levelname
+        seperator = " " * (8 - len(levelname))
+        if self.use_colors:
+            levelname = self.color_level_name(levelname, recordcopy.levelno)
+            recordcopy.msg = self.color_message(recordcopy.msg, recordcopy.levelno)
+            recordcopy.__dict__["message"] = recordcopy.getMessage()
+            recordcopy.asctime = self.color_date(recordcopy)
+        recordcopy.__dict__["levelprefix"] = levelname + seperator
+        return logging.Formatter.formatMessage(self, recordcopy)
+
+
+class LegacyFileFormatter(logging.Formatter):
+    def formatMessage(self, record):
+        recordcopy = copy(record)
+        recordcopy.__dict__["relpathname"] = "/".join(recordcopy.pathname.split("/")[-2:])
+        return super().formatMessage(recordcopy)
+
+
+def build_handlers(log_dir: str, legacy: bool, use_colors: bool) -> list:
+    stream_formatter = (LegacyStreamFormatter if legacy else DefaultFormatter)(
+        STREAM_FORMAT, datefmt="%Y/%m/%d  %H:%M:%S", use_colors=use_colors
+    )
+    file_formatter = (LegacyFileFormatter if legacy else FileFormater)(
+        FILE_FORMAT, datefmt="%Y/%m/%d - %H:%M:%S"
+    )
+    stream_handler = logging.StreamHandler(open(os.devnull, "w"))
+    stream_handler.setFormatter(stream_formatter)
+    file_handler = logging.FileHandler(os.path.join(log_dir, "benchmark.log"))
+    file_handler.setFormatter(file_formatter)
+    return [stream_handler, file_handler]
+
+
+def run(mode: str, records: int, use_colors: bool) -> dict:
+    with tempfile.TemporaryDirectory() as log_dir:
+        handlers = build_handlers(log_dir, legacy=mode == "legacy", use_colors=use_colors)
+        logger = logging.getLogger(f"logging_benchmark.{mode}")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        listener = None
+        if mode == "async":
+            log_queue = queue.SimpleQueue()
+            listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+            listener.start()
+            logger.addHandler(_AsyncQueueHandler(log_queue))
+        else:
+            for handler in handlers:
+                logger.addHandler(handler)
+
+        start = time.perf_counter()
+        for i in range(records):
+            logger.info("Predicted batch %d with %d rows", i, 64)
+        caller = time.perf_counter() - start
+        if listener is not None:
+            listener.stop()
+        total = time.perf_counter() - start
+
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+        for handler in handlers:
+            handler.close()
+        return {
+            "mode": mode,
+            "caller_records_per_s": records / caller,
+            "total_records_per_s": records / total,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=50000)
+    parser.add_argument("--colors", action="store_true", help="Format stream handler có màu như trên terminal")
+    args = parser.parse_args()
+
+    print(f"{args.records} records, colors={args.colors}")
+    print(f"{'mode':<8}{'caller rec/s':>16}{'total rec/s':>16}")
+    for mode in ("legacy", "sync", "async"):
+        result = run(mode, args.records, args.colors)
+        print(f"{mode:<8}{result['caller_records_per_s']:>16,.0f}{result['total_records_per_s']:>16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
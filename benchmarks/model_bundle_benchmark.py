@@ -0,0 +1,165 @@
+"""
+So sánh cách load artifact hiện tại (model.pkl + scaler.joblib +
+label_encoder.joblib, mỗi process unpickle một bản riêng) với ModelBundle
+(một file, mảng được load bằng mmap) khi chạy nhiều worker cùng lúc.
+
+Mỗi worker là một process (spawn) load artifact, predict một batch rồi đo
+bộ nhớ trong khi mọi worker khác vẫn đang sống:
+
+- load_ms: thời gian load (không tính import sklearn và src)
+- rss_mb: RSS của process sau khi predict, tăng thêm so với trước khi load
+- private_mb: phần bộ nhớ riêng của process (Private_Clean + Private_Dirty)
+- pss_mb: RSS với phần dùng chung chia đều cho các process; tổng pss của mọi
+  worker là lượng RAM thực sự bị chiếm
+
+Số liệu bộ nhớ đọc từ /proc/self/smaps_rollup nên chỉ có trên Linux.
+
+Chạy từ thư mục gốc của repo:
+    python -m benchmarks.model_bundle_benchmark --workers 4 --n-estimators 300
+"""
+import argparse
+import multiprocessing
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FEATURE_COLS = ["SepalLengthCm", "SepalWidthCm", "PetalLengthCm", "PetalWidthCm"]
+LABELS = ["Iris-setosa", "Iris-versicolor", "Iris-virginica"]
+
+
+def memory_mb() -> dict:
+    fields = {}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    except FileNotFoundError:
+        import resource
+        fields["Rss"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {
+        "rss_mb": fields.get("Rss", 0.0),
+        "pss_mb": fields.get("Pss", 0.0),
+        "private_mb": fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0),
+    }
+
+
+def build_artifacts(directory: str, n_estimators: int, n_rows: int):
+    import joblib
+    import numpy as np
+    import pandas as pd
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.preprocessing import LabelEncoder, StandardScaler
+    from src.models.model_bundle import BUNDLE_FILE, ModelBundle
+
+    rng = np.random.default_rng(0)
+    y = rng.integers(0, len(LABELS), n_rows)
+    X = pd.DataFrame(rng.normal(y[:, None], 1.5, (n_rows, len(FEATURE_COLS))), columns=FEATURE_COLS)
+    labels = np.array(LABELS)[y]
+    scaler = StandardScaler().fit(X)
+    label_encoder = LabelEncoder().fit(labels)
+    model = RandomForestClassifier(n_estimators=n_estimators, n_jobs=-1, random_state=0)
+    model.fit(scaler.transform(X), label_encoder.transform(labels))
+    model.n_jobs = None
+
+    with open(os.path.join(directory, "model.pkl"), "wb") as f:
+        pickle.dump(model, f)
+    joblib.dump(scaler, os.path.join(directory, "scaler.joblib"))
+    joblib.dump(label_encoder, os.path.join(directory, "label_encoder.joblib"))
+    ModelBundle.build(model, scaler, label_encoder, "random_forest").save(os.path.join(directory, BUNDLE_FILE))
+    return {name: os.path.getsize(os.path.join(directory, name)) / 2**20 for name in os.listdir(directory)}
+
+
+def load_pickle(directory: str):
+    import joblib
+    with open(os.path.join(directory, "model.pkl"), "rb") as f:
+        model = pickle.load(f)
+    scaler = joblib.load(os.path.join(directory, "scaler.joblib"))
+    label_encoder = joblib.load(os.path.join(directory, "label_encoder.joblib"))
+
+    def predict(X):
+        return label_encoder.inverse_transform(model.predict(scaler.transform(X)))
+    return predict
+
+
+def load_bundle(directory: str):
+    from src.models.model_bundle import BUNDLE_FILE, ModelBundle
+    bundle = ModelBundle.load(os.path.join(directory, BUNDLE_FILE))
+    return lambda X: bundle.predict(X)["label_text"]
+
+
+def worker(mode: str, directory: str, batch_size: int, barrier, results):
+    import numpy as np
+    import pandas as pd
+    import sklearn.ensemble  # noqa: F401
+    import sklearn.preprocessing  # noqa: F401
+    import src.models.model_bundle  # noqa: F401
+
+    before = memory_mb()
+    start = time.perf_counter()
+    predict = (load_bundle if mode == "bundle" else load_pickle)(directory)
+    load_ms = (time.perf_counter() - start) * 1000
+    X = pd.DataFrame(np.random.default_rng(1).normal(1, 1.5, (batch_size, len(FEATURE_COLS))), columns=FEATURE_COLS)
+    predict(X)
+    # Đo khi mọi worker đều đã load xong để Pss phản ánh phần dùng chung
+    barrier.wait()
+    after = memory_mb()
+    results.put({
+        "load_ms": load_ms,
+        "rss_mb": after["rss_mb"] - before["rss_mb"],
+        "private_mb": after["private_mb"] - before["private_mb"],
+        "pss_mb": after["pss_mb"] - before["pss_mb"],
+    })
+    barrier.wait()
+
+
+def run(mode: str, directory: str, workers: int, batch_size: int) -> dict:
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+    processes = [
+        context.Process(target=worker, args=(mode, directory, batch_size, barrier, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    samples = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return {
+        "mode": mode,
+        "load_ms": sum(sample["load_ms"] for sample in samples) / workers,
+        "rss_mb": sum(sample["rss_mb"] for sample in samples) / workers,
+        "private_mb": sum(sample["private_mb"] for sample in samples) / workers,
+        "total_pss_mb": sum(sample["pss_mb"] for sample in samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--n-estimators", type=int, default=300)
+    parser.add_argument("--rows", type=int, default=50000, help="Số dòng dữ liệu train (quyết định kích thước cây)")
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        sizes = build_artifacts(directory, args.n_estimators, args.rows)
+        print("artifacts: " + ", ".join(f"{name} {size:.1f}MB" for name, size in sorted(sizes.items())))
+        print(f"{args.workers} workers, batch of {args.batch_size} rows")
+        print(f"{'mode':<8}{'load ms':>10}{'rss MB':>10}{'private MB':>12}{'total pss MB':>14}")
+        for mode in ("pickle", "bundle"):
+            result = run(mode, directory, args.workers, args.batch_size)
+            print(
+                f"{mode:<8}{result['load_ms']:>10.1f}{result['rss_mb']:>10.1f}"
+                f"{result['private_mb']:>12.1f}{result['total_pss_mb']:>14.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
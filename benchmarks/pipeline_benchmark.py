@@ -0,0 +1,292 @@
+"""
+Đo thời gian và bộ nhớ của từng stage trên dữ liệu giả (benchmarks.synthetic_data)
+với nhiều kích thước, để so sánh giữa các commit:
+
+- ingestion: DataIngestion.run_ingestion
+- transformation: DataTransformer.run_transformation
+- training: ModelTrainer.train (không tính save_model)
+- predict: ModelEvaluation.predict với từng batch size (1 là predict một dòng)
+
+Mỗi stage chạy trong một process mới, đọc output của stage trước từ disk như
+khi chạy từng pipeline riêng, nên số liệu bộ nhớ không bị lẫn giữa các stage:
+
+- seconds: thời gian gọi hàm của stage (predict: median_ms/p95_ms mỗi lần gọi và rows_per_s)
+- rss_before_mb: RSS sau khi import và compose config, trước khi chạy stage
+- peak_rss_mb / peak_increase_mb: RSS lớn nhất của process và phần tăng so với rss_before_mb
+
+MLflow ghi vào file store trong thư mục làm việc (mlruns/), DVC được thay bằng
+một manager không làm gì nên không cần MLflow server hay remote S3. Các override
+Hydra được truyền nguyên cho mọi stage, vd. `--override data.storage_format=parquet
+data.streaming=true default_model=logistic_regression`.
+
+Báo cáo JSON (`--json`) có key `name` ổn định cho từng dòng kết quả;
+`--compare` in tỉ lệ thời gian so với một báo cáo cũ và `--max-slowdown` trả về
+exit code 1 khi có stage chậm hơn ngưỡng.
+
+Chạy từ thư mục gốc của repo:
+    python -m benchmarks.pipeline_benchmark --sizes 10k 1m --json outputs/pipeline.json
+    python -m benchmarks.pipeline_benchmark --sizes 10k --compare outputs/pipeline.json --max-slowdown 1.2
+"""
+import argparse
+import json
+import os
+import pathlib
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic_data import generate_dataset, parse_rows
+
+REPORT_FORMAT = "mlops-pipeline-benchmark"
+REPORT_VERSION = 1
+# stage -> (module, class, method)
+STAGES = {
+    "ingestion": ("src.data.data_ingestion", "DataIngestion", "run_ingestion"),
+    "transformation": ("src.data.data_transform", "DataTransformer", "run_transformation"),
+    "training": ("src.models.model_trainer", "ModelTrainer", "train"),
+}
+
+
+class NullDVCManager:
+    """Thay cho DVCRemoteManager: mọi lệnh add/push/pull/sync đều không làm gì"""
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except FileNotFoundError:
+        pass
+    return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux trả về kB, macOS trả về byte
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def compose_config(overrides: list):
+    from hydra import compose, initialize_config_dir
+    from omegaconf import OmegaConf
+
+    with initialize_config_dir(version_base="1.3", config_dir=os.path.join(ROOT, "configs"), job_name="benchmark"):
+        config = compose(config_name="config", overrides=overrides, return_hydra_config=True)
+        OmegaConf.resolve(config)
+    return config
+
+
+def benchmark_predict(config, batch_sizes: list, min_time: float) -> list:
+    from src.data.storage import get_storage
+    from src.models.model_evaluation import ModelEvaluation
+    import pandas as pd
+
+    start = time.perf_counter()
+    evaluator = ModelEvaluation(config)
+    load_s = time.perf_counter() - start
+    X = get_storage(config).read(config.data.processed_data_path, "test")
+    X = X.drop(columns=[config.data.label_col], errors="ignore")
+
+    results = []
+    for batch_size in batch_sizes:
+        batch = X.iloc[:batch_size]
+        if len(batch) < batch_size:
+            batch = pd.concat([X] * (batch_size // len(X) + 1), ignore_index=True).iloc[:batch_size]
+        evaluator.predict(batch)  # warmup
+        latencies = []
+        total = 0.0
+        while len(latencies) < 5 or (total < min_time and len(latencies) < 1000):
+            start = time.perf_counter()
+            evaluator.predict(batch)
+            latencies.append(time.perf_counter() - start)
+            total += latencies[-1]
+        latencies.sort()
+        results.append({
+            "stage": "predict",
+            "batch_size": batch_size,
+            "iterations": len(latencies),
+            "load_s": load_s,
+            "median_ms": statistics.median(latencies) * 1000,
+            "p95_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+            "rows_per_s": batch_size * len(latencies) / total,
+            # Chỉ so sánh được seconds giữa các báo cáo có cùng batch size
+            "seconds": statistics.median(latencies),
+        })
+    return results
+
+
+def child(spec: dict):
+    from src.data import dvc_manager
+    from src.utils import get_tracker
+
+    dvc_manager._manager = NullDVCManager()
+    config = compose_config(spec["overrides"])
+    stage = spec["stage"]
+    rss_before = rss_mb()
+    if stage == "predict":
+        results = benchmark_predict(config, spec["batch_sizes"], spec["min_time"])
+    else:
+        module_name, class_name, method_name = STAGES[stage]
+        stage_object = getattr(__import__(module_name, fromlist=[class_name]), class_name)(config)
+        with get_tracker().start_run(run_name=f"benchmark-{stage}", config=config):
+            start = time.perf_counter()
+            getattr(stage_object, method_name)()
+            result = {"stage": stage, "seconds": time.perf_counter() - start}
+            if stage == "training":
+                # Stage predict load model.pkl
+                stage_object.save_model()
+                result["model"] = stage_object.model_name
+        results = [result]
+    peak = peak_rss_mb()
+    for result in results:
+        result.update(rss_before_mb=rss_before, peak_rss_mb=peak, peak_increase_mb=max(peak - rss_before, 0.0))
+    print(json.dumps(results))
+
+
+def run_stage(stage: str, overrides: list, env: dict, args) -> list:
+    spec = {"stage": stage, "overrides": overrides, "batch_sizes": args.batch_sizes, "min_time": args.min_time}
+    process = subprocess.run(
+        [sys.executable, "-m", "benchmarks.pipeline_benchmark", "--child", json.dumps(spec)],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if process.returncode != 0:
+        sys.stderr.write(process.stderr[-5000:])
+        raise RuntimeError(f"Stage {stage} failed with exit code {process.returncode}")
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def benchmark_size(label: str, n_rows: int, workdir: str, env: dict, args) -> list:
+    size_dir = os.path.join(workdir, label)
+    data_file = f"synthetic.{args.data_format}"
+    start = time.perf_counter()
+    generate_dataset(
+        os.path.join(size_dir, "data", "raw", data_file), n_rows,
+        args.class_weights, args.extra_features, random_state=args.seed,
+    )
+    results = [{"stage": "generate", "seconds": time.perf_counter() - start}]
+    overrides = [
+        f"paths.data_dir={size_dir}/data",
+        f"paths.models_dir={size_dir}/models",
+        f"data.data_file={data_file}",
+        *args.override,
+    ]
+    for stage in [*STAGES, "predict"]:
+        print(f"[{label}] {stage}...", flush=True)
+        results.extend(run_stage(stage, overrides, env, args))
+    for result in results:
+        suffix = f"/b{result['batch_size']}" if "batch_size" in result else ""
+        result.update(name=f"{label}/{result['stage']}{suffix}", rows=n_rows)
+    return results
+
+
+def git_info() -> dict:
+    def git(*command):
+        return subprocess.run(["git", *command], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    return {"commit": git("rev-parse", "HEAD") or None, "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def compare(results: list, baseline_path: str) -> list:
+    """In thời gian so với báo cáo cũ, trả về (name, ratio) của các dòng có trong cả hai"""
+    with open(baseline_path) as f:
+        baseline = {result["name"]: result for result in json.load(f)["results"]}
+    ratios = []
+    print(f"\ncompared with {baseline_path}")
+    print(f"{'name':<28}{'old s':>10}{'new s':>10}{'ratio':>8}{'old MB':>9}{'new MB':>9}")
+    for result in results:
+        old = baseline.get(result["name"])
+        if old is None or result["stage"] == "generate" or not old["seconds"]:
+            continue
+        ratio = result["seconds"] / old["seconds"]
+        ratios.append((result["name"], ratio))
+        print(
+            f"{result['name']:<28}{old['seconds']:>10.4f}{result['seconds']:>10.4f}{ratio:>8.2f}"
+            f"{old.get('peak_rss_mb', 0.0):>9.0f}{result.get('peak_rss_mb', 0.0):>9.0f}"
+        )
+    return ratios
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", default=["10k"], help="Số dòng của từng lần chạy, vd. 10k 1m 10m")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 100, 10000])
+    parser.add_argument("--min-time", type=float, default=1.0, help="Thời gian đo tối thiểu cho mỗi batch size")
+    parser.add_argument("--class-weights", type=float, nargs=3, default=None, metavar="W")
+    parser.add_argument("--extra-features", type=int, default=0)
+    parser.add_argument("--data-format", default="csv", choices=["csv", "parquet", "feather"])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--override", nargs="*", default=[], help="Override Hydra cho mọi stage")
+    parser.add_argument("--workdir", default=None, help="Thư mục chứa dữ liệu, model và mlruns (mặc định: thư mục tạm)")
+    parser.add_argument("--json", default=None, help="Ghi báo cáo ra file JSON")
+    parser.add_argument("--compare", default=None, help="Báo cáo JSON cũ để so sánh")
+    parser.add_argument("--max-slowdown", type=float, default=None)
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(json.loads(args.child))
+        return
+
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="pipeline-benchmark-"))
+    env = {
+        **os.environ,
+        "MLFLOW_TRACKING_URI": pathlib.Path(workdir, "mlruns").as_uri(),
+        "PYTHONPATH": os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])),
+    }
+    try:
+        results = []
+        for label in args.sizes:
+            results.extend(benchmark_size(label.lower(), parse_rows(label), workdir, env, args))
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"\n{'name':<28}{'seconds':>10}{'rows/s':>12}{'peak MB':>9}{'+MB':>8}")
+    for result in results:
+        rows_per_s = result.get("rows_per_s", result["rows"] / result["seconds"] if result["seconds"] else 0.0)
+        print(
+            f"{result['name']:<28}{result['seconds']:>10.4f}{rows_per_s:>12.0f}"
+            f"{result.get('peak_rss_mb', 0.0):>9.0f}{result.get('peak_increase_mb', 0.0):>8.0f}"
+        )
+    if args.json:
+        report = {
+            "format": REPORT_FORMAT,
+            "version": REPORT_VERSION,
+            "git": git_info(),
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+            },
+            "settings": {
+                key: getattr(args, key)
+                for key in ("sizes", "batch_sizes", "min_time", "class_weights", "extra_features",
+                            "data_format", "seed", "override")
+            },
+            "results": results,
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        ratios = compare(results, args.compare)
+        slower = [f"{name} x{ratio:.2f}" for name, ratio in ratios if args.max_slowdown and ratio > args.max_slowdown]
+        if slower:
+            print("Pipeline regression: " + "; ".join(slower))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
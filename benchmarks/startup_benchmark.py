@@ -0,0 +1,128 @@
+"""
+Đo thời gian khởi động của các entry point serving, mỗi lần đo là một
+process Python mới (cold start):
+
+- import_s: thời gian `import serve` / `import app`
+- ready_s: import + lifespan (compose config, load model) + request /predict đầu tiên
+- process_s: ready_s cộng thời gian khởi động interpreter, đo từ process cha
+- heavy: các module nặng đã bị import sau khi import entry point
+
+Với `--max-import-s`/`--max-ready-s`, script trả về exit code 1 khi median của
+serve vượt ngưỡng, hoặc khi serve import một module trong FORBIDDEN, để CI bắt
+được regression.
+
+Chạy từ thư mục gốc của repo:
+    python -m benchmarks.startup_benchmark --runs 5 --json outputs/startup.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ["mlflow", "sklearn", "scipy", "pandas", "dvc", "matplotlib", "src.data.data_ingestion", "src.models.model_trainer"]
+# Serve chỉ predict nên không được import phần training, DVC và MLflow
+FORBIDDEN = ["mlflow", "dvc", "src.data.data_ingestion", "src.models.model_trainer", "src.utils.tracking"]
+
+
+def child(module_name: str):
+    sys.path.insert(0, ROOT)
+    start = time.perf_counter()
+    module = __import__(module_name)
+    import_s = time.perf_counter() - start
+    heavy = [name for name in HEAVY if name in sys.modules]
+    forbidden = [name for name in FORBIDDEN if name in sys.modules]
+
+    async def first_predict():
+        app = module.app
+        async with app.router.lifespan_context(app):
+            from src.pipeline.prediction_pipeline import get_feature_names
+            n_features = len(get_feature_names(app.state.model_store.get()))
+            await module.handle_predict(app, module.PredictRequest(rows=[[1.0] * n_features]))
+
+    error = None
+    try:
+        asyncio.run(first_predict())
+    except Exception as e:
+        error = str(e) or type(e).__name__
+    print(json.dumps({
+        "import_s": import_s,
+        "ready_s": time.perf_counter() - start,
+        "heavy": heavy,
+        "forbidden": forbidden,
+        "error": error,
+    }))
+
+
+def measure(module_name: str, runs: int) -> dict:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.startup_benchmark", "--child", module_name],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout
+        sample = json.loads(output.strip().splitlines()[-1])
+        sample["process_s"] = time.perf_counter() - start
+        samples.append(sample)
+    return {
+        "entry_point": module_name,
+        "runs": runs,
+        **{
+            key: statistics.median(sample[key] for sample in samples)
+            for key in ("import_s", "ready_s", "process_s")
+        },
+        "heavy": samples[-1]["heavy"],
+        "forbidden": samples[-1]["forbidden"],
+        "error": samples[-1]["error"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--entry-points", nargs="+", default=["serve", "app"])
+    parser.add_argument("--max-import-s", type=float, default=None)
+    parser.add_argument("--max-ready-s", type=float, default=None)
+    parser.add_argument("--json", default=None, help="Ghi kết quả ra file JSON")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child)
+        return
+
+    results = [measure(module_name, args.runs) for module_name in args.entry_points]
+    print(f"median of {args.runs} runs")
+    print(f"{'entry':<8}{'import s':>10}{'ready s':>10}{'process s':>11}  heavy modules")
+    for result in results:
+        print(
+            f"{result['entry_point']:<8}{result['import_s']:>10.2f}{result['ready_s']:>10.2f}"
+            f"{result['process_s']:>11.2f}  {', '.join(result['heavy']) or '-'}"
+        )
+        if result["error"]:
+            print(f"  first predict failed: {result['error']}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    failures = []
+    for result in results:
+        if result["entry_point"] != "serve":
+            continue
+        if result["forbidden"]:
+            failures.append(f"serve imports {result['forbidden']}")
+        if args.max_import_s is not None and result["import_s"] > args.max_import_s:
+            failures.append(f"serve import {result['import_s']:.2f}s > {args.max_import_s}s")
+        if args.max_ready_s is not None and result["ready_s"] > args.max_ready_s:
+            failures.append(f"serve ready {result['ready_s']:.2f}s > {args.max_ready_s}s")
+    if failures:
+        print("Startup regression: " + "; ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Sinh dữ liệu giả cùng schema với data/raw/Iris.csv (Id, 4 feature *Cm,
+Species) với số dòng tuỳ ý, dùng cho benchmark và test:
+
+- mỗi class lấy mẫu từ phân phối chuẩn theo mean/std của từng feature trong
+  Iris.csv, làm tròn 1 chữ số như dữ liệu gốc
+- `class_weights`: tỉ lệ của Iris-setosa, Iris-versicolor, Iris-virginica
+- `extra_features`: thêm các cột nhiễu Feature1..FeatureN (N(0, 1)) trước Species
+
+File được ghi theo từng chunk (định dạng theo đuôi file, như DataStorage) nên
+10M dòng không cần giữ toàn bộ trong bộ nhớ.
+
+Chạy từ thư mục gốc của repo:
+    python -m benchmarks.synthetic_data 1m data/raw/Iris_1m.csv --class-weights 0.6 0.3 0.1
+"""
+import argparse
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.data.storage import DataStorage
+
+FEATURE_COLS = ["SepalLengthCm", "SepalWidthCm", "PetalLengthCm", "PetalWidthCm"]
+LABELS = ["Iris-setosa", "Iris-versicolor", "Iris-virginica"]
+# Mean và std của từng feature theo class, tính từ Iris.csv
+CLASS_MEANS = np.array([
+    [5.006, 3.428, 1.462, 0.246],
+    [5.936, 2.770, 4.260, 1.326],
+    [6.588, 2.974, 5.552, 2.026],
+])
+CLASS_STDS = np.array([
+    [0.352, 0.379, 0.174, 0.105],
+    [0.516, 0.314, 0.470, 0.198],
+    [0.636, 0.322, 0.552, 0.275],
+])
+SUFFIXES = {"k": 10**3, "m": 10**6}
+
+
+def parse_rows(value: str) -> int:
+    """"10k" -> 10000, "1m" -> 1000000, "2500" -> 2500"""
+    value = value.strip().lower()
+    if value[-1:] in SUFFIXES:
+        return int(float(value[:-1]) * SUFFIXES[value[-1]])
+    return int(value)
+
+
+def generate_chunk(
+    rng: np.random.Generator, n_rows: int, start_id: int = 1, class_weights=None, extra_features: int = 0
+) -> pd.DataFrame:
+    weights = np.asarray(class_weights if class_weights is not None else [1.0] * len(LABELS), dtype=float)
+    y = rng.choice(len(LABELS), size=n_rows, p=weights / weights.sum())
+    X = rng.normal(CLASS_MEANS[y], CLASS_STDS[y])
+    # Giữ độ chính xác và miền giá trị như Iris.csv (0.1 cm)
+    X = np.maximum(np.round(X, 1), 0.1)
+    df = pd.DataFrame(X, columns=FEATURE_COLS)
+    df.insert(0, "Id", np.arange(start_id, start_id + n_rows))
+    for i in range(1, extra_features + 1):
+        df[f"Feature{i}"] = np.round(rng.standard_normal(n_rows), 4)
+    df["Species"] = np.asarray(LABELS, dtype=object)[y]
+    return df
+
+
+def generate_dataset(
+    output_path: str,
+    n_rows: int,
+    class_weights=None,
+    extra_features: int = 0,
+    chunk_size: int = 1000000,
+    random_state: int = 42,
+) -> str:
+    """
+    Ghi `n_rows` dòng dữ liệu giả ra `output_path` (.csv, .parquet hoặc .feather).
+
+    Returns:
+        str: `output_path`
+    """
+    if class_weights is not None and len(class_weights) != len(LABELS):
+        raise ValueError(f"class_weights must have {len(LABELS)} values, got {len(class_weights)}")
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    rng = np.random.default_rng(random_state)
+    with DataStorage.open_file_writer(output_path) as writer:
+        for start in range(0, n_rows, chunk_size):
+            writer.write(generate_chunk(
+                rng, min(chunk_size, n_rows - start), start + 1, class_weights, extra_features
+            ))
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("rows", help="Số dòng, vd. 10k, 1m, 10m")
+    parser.add_argument("output_path", help="File kết quả, định dạng theo đuôi file (.csv, .parquet, .feather)")
+    parser.add_argument("--class-weights", type=float, nargs=len(LABELS), default=None, metavar="W")
+    parser.add_argument("--extra-features", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=1000000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    generate_dataset(
+        args.output_path, parse_rows(args.rows), args.class_weights,
+        args.extra_features, args.chunk_size, args.seed,
+    )
+
+
+if __name__ == "__main__":
+    main()
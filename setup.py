@@ -9,6 +9,7 @@ setup(
     install_requires=[
         "numpy",
         "pandas",
+        "pyarrow",
         "scikit-learn",
         "mlflow>=2.0.0",
         "dvc[s3]",  # Add appropriate remote storage
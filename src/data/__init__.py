@@ -1,6 +1,21 @@
-from .data_ingestion import DataIngestion
-from .data_transform import DataTransformer
-from .dvc_manager import DVCRemoteManager
-__all__ = [
-    "DataIngestion","DataTransformer","DVCRemoteManager",
-]
+import importlib
+
+# Import module con khi tên được dùng tới (xem src/models/__init__.py)
+_EXPORTS = {
+    "DataIngestion": ".data_ingestion",
+    "DataTransformer": ".data_transform",
+    "DVCRemoteManager": ".dvc_manager",
+    "VersioningQueue": ".dvc_manager",
+    "get_dvc_manager": ".dvc_manager",
+    "DataStorage": ".storage",
+    "get_storage": ".storage",
+}
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -1,15 +1,19 @@
 # src/data/data_ingestion.py
-import mlflow
+import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
 import os
 from omegaconf import DictConfig
-from src.utils import get_logger
+from src.utils import get_logger, get_tracker
+from .storage import get_storage
 
 logger = get_logger()
+tracker = get_tracker()
 
 
 class DataIngestion:
+    # Tăng khi logic của stage thay đổi để cache của các lần chạy cũ không còn được dùng
+    STAGE_VERSION = 1
 
     def __init__(self, config: DictConfig):
         self.config = config
@@ -17,27 +21,37 @@ class DataIngestion:
         self.processed_data_path = config.data.processed_data_path
         self.data_file = config.data.data_file
         self.label_col = config.data.label_col
+        self.id_col = config.data.id_col
+        self.streaming = config.data.streaming
+        self.chunk_size = config.data.chunk_size
+        self.storage = get_storage(config)
         # Tạo thư mục processed nếu chưa tồn tại
         if not os.path.exists(self.processed_data_path):
             os.makedirs(self.processed_data_path)
 
+    def output_paths(self):
+        return [
+            self.storage.path(self.processed_data_path, name)
+            for name in ["train", "val", "test"]
+        ]
+
     def read_data(self):
         try:
-            df = pd.read_csv(os.path.join(self.raw_data_path, self.data_file))
-            mlflow.log_param("raw_data_path", self.raw_data_path)
-            mlflow.log_param("data_file_name", self.data_file)
-            mlflow.log_param("label_col", self.label_col)
+            df = self.storage.read_file(os.path.join(self.raw_data_path, self.data_file))
+            tracker.log_param("raw_data_path", self.raw_data_path)
+            tracker.log_param("data_file_name", self.data_file)
+            tracker.log_param("label_col", self.label_col)
             logger.info("Đã đọc dữ liệu thành công")
             return df
         except Exception as e:
             logger.error(f"Lỗi khi đọc dữ liệu: {e}")
-            mlflow.log_param("error_read_data", str(e))
+            tracker.log_param("error_read_data", str(e))
             raise
 
     def split_data(self, df):
         try:
             # Tách features và target
-            X = df.drop([self.label_col, "Id"], axis=1)
+            X = df.drop([self.label_col, self.id_col], axis=1)
             y = df[self.label_col]
 
             # Phân chia train và temp
@@ -58,16 +72,81 @@ class DataIngestion:
                 random_state=self.config.data.random_state,
                 stratify=y_temp,
             )
-            mlflow.log_param("train_ratio", self.config.data.train_ratio)
-            mlflow.log_param("test_ratio", self.config.data.test_ratio)
-            mlflow.log_param("val_ratio", self.config.data.val_ratio)
-            mlflow.log_param("random_state", self.config.data.random_state)
+            tracker.log_param("train_ratio", self.config.data.train_ratio)
+            tracker.log_param("test_ratio", self.config.data.test_ratio)
+            tracker.log_param("val_ratio", self.config.data.val_ratio)
+            tracker.log_param("random_state", self.config.data.random_state)
 
             logger.info("Đã phân chia dữ liệu thành công")
             return X_train, X_val, X_test, y_train, y_val, y_test
         except Exception as e:
             logger.error(f"Lỗi khi phân chia dữ liệu: {e}")
-            mlflow.log_param("error_split_data", str(e))
+            tracker.log_param("error_split_data", str(e))
+            raise
+
+    def assign_splits(self, chunk):
+        """
+        Gán mỗi dòng vào train (0), val (1) hoặc test (2) một cách tất định.
+
+        Hash của (label, id) được đưa về khoảng [0, 1) rồi so với train_ratio/
+        val_ratio. Vì hash phân bố đều trong từng class nên tỉ lệ mỗi class ở
+        các tập xấp xỉ tỉ lệ chia (stratified), và một dòng luôn rơi vào cùng
+        một tập bất kể kích thước chunk.
+        """
+        # Khoá của dòng gồm cả label để việc chia được thực hiện trong từng class
+        key = chunk[[self.label_col, self.id_col]] if self.id_col in chunk else chunk
+        hashes = pd.util.hash_pandas_object(
+            key, index=False, hash_key=f"{self.config.data.random_state:016d}"[-16:]
+        ).to_numpy()
+        position = hashes / np.float64(2**64)
+        train_ratio = self.config.data.train_ratio
+        val_ratio = self.config.data.val_ratio
+        return np.where(
+            position < train_ratio, 0, np.where(position < train_ratio + val_ratio, 1, 2)
+        )
+
+    def run_streaming_ingestion(self):
+        """
+        Đọc file raw theo từng chunk, chia và ghi nối tiếp vào train/val/test.
+        Bộ nhớ tối đa phụ thuộc vào `chunk_size` chứ không phụ thuộc kích thước dữ liệu.
+        """
+        try:
+            raw_file_path = os.path.join(self.raw_data_path, self.data_file)
+            tracker.log_param("raw_data_path", self.raw_data_path)
+            tracker.log_param("data_file_name", self.data_file)
+            tracker.log_param("label_col", self.label_col)
+            tracker.log_param("chunk_size", self.chunk_size)
+
+            split_names = ["train", "val", "test"]
+            writers = [self.storage.open_writer(self.processed_data_path, name) for name in split_names]
+            total_rows = total_columns = 0
+            try:
+                for chunk in self.storage.iter_file_chunks(raw_file_path, self.chunk_size):
+                    total_rows += len(chunk)
+                    total_columns = chunk.shape[1]
+                    split_idx = self.assign_splits(chunk)
+                    # Giữ thứ tự cột giống run_ingestion: features rồi tới label
+                    out = chunk.drop(columns=[self.label_col, self.id_col], errors="ignore")
+                    out[self.label_col] = chunk[self.label_col]
+                    for i, writer in enumerate(writers):
+                        writer.write(out[split_idx == i])
+            finally:
+                for writer in writers:
+                    writer.close()
+
+            tracker.log_param("train_ratio", self.config.data.train_ratio)
+            tracker.log_param("test_ratio", self.config.data.test_ratio)
+            tracker.log_param("val_ratio", self.config.data.val_ratio)
+            tracker.log_param("random_state", self.config.data.random_state)
+            tracker.log_metric("total_rows", total_rows)
+            tracker.log_metric("total_columns", total_columns)
+            for name, writer in zip(split_names, writers):
+                tracker.log_metric(f"{name}_samples", writer.rows)
+            tracker.log_artifacts(self.processed_data_path, artifact_path="processed_data")
+            logger.info(f"Streaming ingestion running successfully with {total_rows} rows")
+        except Exception as e:
+            logger.error(f"Error in streaming data ingestion: {e}")
+            tracker.log_param("error_streaming_ingestion", str(e))
             raise
 
     def save_splits(self, X_train, X_val, X_test, y_train, y_val, y_test):
@@ -75,24 +154,18 @@ class DataIngestion:
             # Lưu training data
             train_df = X_train.copy()
             train_df[self.label_col] = y_train
-            train_df.to_csv(
-                os.path.join(self.processed_data_path, "train.csv"), index=False
-            )
+            self.storage.write(train_df, self.processed_data_path, "train")
 
             # Lưu validation data
             val_df = X_val.copy()
             val_df[self.label_col] = y_val
-            val_df.to_csv(
-                os.path.join(self.processed_data_path, "val.csv"), index=False
-            )
+            self.storage.write(val_df, self.processed_data_path, "val")
 
             # Lưu testing data
             test_df = X_test.copy()
             test_df[self.label_col] = y_test
-            test_df.to_csv(
-                os.path.join(self.processed_data_path, "test.csv"), index=False
-            )
-            mlflow.log_artifacts(
+            self.storage.write(test_df, self.processed_data_path, "test")
+            tracker.log_artifacts(
                     self.processed_data_path, artifact_path="processed_data"
                 )
             logger.info("Đã lưu dữ liệu đã phân chia thành công")
@@ -100,25 +173,39 @@ class DataIngestion:
             logger.error(f"Lỗi khi lưu dữ liệu: {e}")
             raise
 
-    def run_ingestion(self):
+    def run_ingestion(self, context=None):
+        """
+        Args:
+            context (StageContext | None): Nếu có, các tập đã chia được đưa vào
+                context cho stage sau và việc lưu file chạy ở background
+        """
+        if self.streaming:
+            # Dữ liệu không nằm trong bộ nhớ nên stage sau sẽ đọc từ disk
+            self.run_streaming_ingestion()
+            return None
         try:
 
             # Đọc dữ liệu
             df = self.read_data()
-            mlflow.log_metric("total_rows", len(df))
-            mlflow.log_metric("total_columns", df.shape[1])
+            tracker.log_metric("total_rows", len(df))
+            tracker.log_metric("total_columns", df.shape[1])
 
             # Phân chia dữ liệu
             X_train, X_val, X_test, y_train, y_val, y_test = self.split_data(df)
-            mlflow.log_metric("train_samples", len(X_train))
-            mlflow.log_metric("val_samples", len(X_val))
-            mlflow.log_metric("test_samples", len(X_test))
+            tracker.log_metric("train_samples", len(X_train))
+            tracker.log_metric("val_samples", len(X_val))
+            tracker.log_metric("test_samples", len(X_test))
 
             # Lưu dữ liệu đã phân chia
-            self.save_splits(X_train, X_val, X_test, y_train, y_val, y_test)
+            splits = (X_train, X_val, X_test, y_train, y_val, y_test)
+            if context is not None:
+                context.put("splits", splits)
+                context.persist(self.save_splits, *splits)
+            else:
+                self.save_splits(*splits)
             logger.info("Ingestion pipeline running successfully")
 
-            return X_train, X_val, X_test, y_train, y_val, y_test
+            return splits
         except Exception as e:
             logger.error(f"Error in data ingestion: {e}")
             raise
@@ -1,13 +1,15 @@
 # src/data/data_transform.py
-import mlflow
+import numpy as np
 import pandas as pd
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 import os
 import joblib
 from omegaconf import DictConfig
-from src.utils import get_logger
+from src.utils import get_logger, get_tracker
+from .storage import get_storage
 
 logger = get_logger()
+tracker = get_tracker()
 
 
 class DataTransformer:
@@ -15,6 +17,9 @@ class DataTransformer:
     Class để xử lý và biến đổi dữ liệu Iris dataset sử dụng Hydra config
     """
 
+    # Tăng khi logic của stage thay đổi để cache của các lần chạy cũ không còn được dùng
+    STAGE_VERSION = 1
+
     def __init__(self, config: DictConfig):
         """
         Args:
@@ -25,6 +30,9 @@ class DataTransformer:
         self.transformed_data_path = config.data.transformed_data_path
         self.data_file = config.data.data_file
         self.label_col = config.data.label_col
+        self.streaming = config.data.streaming
+        self.chunk_size = config.data.chunk_size
+        self.storage = get_storage(config)
         # Tạo thư mục transformed nếu chưa tồn tại
         if not os.path.exists(self.transformed_data_path):
             os.makedirs(self.transformed_data_path)
@@ -32,17 +40,26 @@ class DataTransformer:
         self.scaler = StandardScaler()
         self.label_encoder = LabelEncoder()
 
+    def output_paths(self):
+        return [
+            self.storage.path(self.transformed_data_path, f"{name}_transformed")
+            for name in ["train", "val", "test"]
+        ] + [
+            os.path.join(self.transformed_data_path, "scaler.joblib"),
+            os.path.join(self.transformed_data_path, "label_encoder.joblib"),
+        ]
+
     def load_data(self):
         """Load dữ liệu đã được phân chia"""
         try:
             # Đọc training data
-            train_df = pd.read_csv(os.path.join(self.processed_data_path, "train.csv"))
+            train_df = self.storage.read(self.processed_data_path, "train")
 
             # Đọc validation data
-            val_df = pd.read_csv(os.path.join(self.processed_data_path, "val.csv"))
+            val_df = self.storage.read(self.processed_data_path, "val")
 
             # Đọc testing data
-            test_df = pd.read_csv(os.path.join(self.processed_data_path, "test.csv"))
+            test_df = self.storage.read(self.processed_data_path, "test")
 
             # Tách features và target
             X_train = train_df.drop(self.label_col, axis=1)
@@ -105,36 +122,20 @@ class DataTransformer:
             # Lưu training data
             train_df = X_train_scaled.copy()
             train_df[self.label_col] = y_train
-            train_df.to_csv(
-                os.path.join(self.transformed_data_path, "train_transformed.csv"),
-                index=False,
-            )
+            self.storage.write(train_df, self.transformed_data_path, "train_transformed")
 
             # Lưu validation data
             val_df = X_val_scaled.copy()
             val_df[self.label_col] = y_val
-            val_df.to_csv(
-                os.path.join(self.transformed_data_path, "val_transformed.csv"),
-                index=False,
-            )
+            self.storage.write(val_df, self.transformed_data_path, "val_transformed")
 
             # Lưu testing data
             test_df = X_test_scaled.copy()
             test_df[self.label_col] = y_test
-            test_df.to_csv(
-                os.path.join(self.transformed_data_path, "test_transformed.csv"),
-                index=False,
-            )
+            self.storage.write(test_df, self.transformed_data_path, "test_transformed")
 
-            # Lưu scaler
-            joblib.dump(
-                self.scaler, os.path.join(self.transformed_data_path, "scaler.joblib")
-            )
-            joblib.dump(
-                self.label_encoder,
-                os.path.join(self.transformed_data_path, "label_encoder.joblib"),
-            )
-            mlflow.log_artifacts(
+            self.save_preprocessors()
+            tracker.log_artifacts(
                     self.transformed_data_path, artifact_path="transformed_data"
                 )
             logger.info("Đã lưu dữ liệu đã transform thành công")
@@ -142,10 +143,79 @@ class DataTransformer:
             logger.error(f"Lỗi khi lưu dữ liệu transformed: {e}")
             raise
 
-    def run_transformation(self):
+    def save_preprocessors(self):
+        """Lưu scaler và label encoder đã fit"""
+        joblib.dump(
+            self.scaler, os.path.join(self.transformed_data_path, "scaler.joblib")
+        )
+        joblib.dump(
+            self.label_encoder,
+            os.path.join(self.transformed_data_path, "label_encoder.joblib"),
+        )
+
+    def fit_streaming(self):
+        """
+        Pass 1: fit scaler (partial_fit) và thu thập tập label trên từng chunk
+        của tập train. Kết quả giống hệt `fit` trên toàn bộ dữ liệu.
+        """
+        self.scaler = StandardScaler()
+        classes = None
+        for chunk in self.storage.iter_chunks(self.processed_data_path, "train", self.chunk_size):
+            self.scaler.partial_fit(chunk.drop(self.label_col, axis=1))
+            chunk_classes = chunk[self.label_col].unique()
+            classes = chunk_classes if classes is None else np.concatenate([classes, chunk_classes])
+            classes = np.unique(classes)
+        if classes is None:
+            raise ValueError("Training data is empty")
+        # LabelEncoder.fit chỉ lưu các giá trị unique đã sắp xếp vào classes_
+        self.label_encoder = LabelEncoder()
+        self.label_encoder.classes_ = classes
+        logger.info(f"Fitted scaler on {self.scaler.n_samples_seen_} rows with {len(classes)} classes")
+
+    def transform_streaming(self, name: str) -> int:
+        """Pass 2: transform từng chunk của tập `name` và ghi nối tiếp ra file"""
+        with self.storage.open_writer(self.transformed_data_path, f"{name}_transformed") as writer:
+            for chunk in self.storage.iter_chunks(self.processed_data_path, name, self.chunk_size):
+                X = chunk.drop(self.label_col, axis=1)
+                transformed = pd.DataFrame(self.scaler.transform(X), columns=X.columns)
+                transformed[self.label_col] = self.label_encoder.transform(chunk[self.label_col])
+                writer.write(transformed)
+        return writer.rows
+
+    def run_streaming_transformation(self):
+        """
+        Transform dữ liệu lớn hơn bộ nhớ với hai lượt đọc theo chunk:
+        fit trên tập train rồi transform và ghi từng chunk của train/val/test.
+        """
+        try:
+            self.fit_streaming()
+            for name in ["train", "val", "test"]:
+                rows = self.transform_streaming(name)
+                logger.info(f"Transformed {rows} rows of {name} data")
+            self.save_preprocessors()
+            tracker.log_artifacts(self.transformed_data_path, artifact_path="transformed_data")
+            logger.info("Streaming transformation running successfully")
+        except Exception as e:
+            logger.error(f"Error in streaming data transformation: {e}")
+            raise
+
+    def run_transformation(self, context=None):
+        """
+        Args:
+            context (StageContext | None): Nếu có, dùng các tập đã chia trong
+                context thay vì đọc lại từ disk và lưu kết quả ở background
+        """
+        in_memory = context is not None and "splits" in context
+        if self.streaming and not in_memory:
+            # Dữ liệu không nằm trong bộ nhớ nên stage sau sẽ đọc từ disk
+            self.run_streaming_transformation()
+            return None
         try:
             # Load dữ liệu
-            X_train, X_val, X_test, y_train, y_val, y_test = self.load_data()
+            if in_memory:
+                X_train, X_val, X_test, y_train, y_val, y_test = context.get("splits")
+            else:
+                X_train, X_val, X_test, y_train, y_val, y_test = self.load_data()
 
             # Transform features
             X_train_scaled, X_val_scaled, X_test_scaled = self.transform_features(
@@ -156,7 +226,7 @@ class DataTransformer:
             )
 
             # Lưu dữ liệu đã transform
-            self.save_transformed_data(
+            transformed = (
                 X_train_scaled,
                 X_val_scaled,
                 X_test_scaled,
@@ -164,15 +234,15 @@ class DataTransformer:
                 y_val_scaled,
                 y_test_scaled,
             )
+            if context is not None:
+                context.put("transformed", transformed)
+                context.put("scaler", self.scaler)
+                context.put("label_encoder", self.label_encoder)
+                context.persist(self.save_transformed_data, *transformed)
+            else:
+                self.save_transformed_data(*transformed)
             logger.info("Transformation pipeline running successfully")
-            return (
-                X_train_scaled,
-                X_val_scaled,
-                X_test_scaled,
-                y_train_scaled,
-                y_val_scaled,
-                y_test_scaled,
-            )
+            return transformed
         except Exception as e:
             logger.error(f"Error in data transformation: {e}")
             raise
@@ -1,19 +1,65 @@
+import fcntl
+import fnmatch
+import hashlib
+import json
 import os
 import subprocess
-from dotenv import load_dotenv
-load_dotenv()
-from src.utils import get_logger
+import threading
+import yaml
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from src.utils import get_logger, load_env
 logger = get_logger()
+
+# (path, size, mtime_ns) -> md5, tránh hash lại file không đổi giữa các lần sync
+_md5_cache = {}
+# DVC giữ lock trên repo (.dvc/tmp/rwlock) và báo lỗi ngay nếu lệnh khác đang chạy,
+# nên mọi lệnh dvc (pull, add, push chạy nền...) của mọi process trong repo, vd. server
+# và các worker của JobRunner, được chạy lần lượt qua flock trên file này
+_LOCK_FILE = os.path.join('.dvc', 'tmp', 'commands.lock')
+
+
+@contextmanager
+def _repo_lock():
+    # flock gắn với từng lần open nên cũng chặn các thread khác trong cùng process
+    os.makedirs(os.path.dirname(_LOCK_FILE), exist_ok=True)
+    with open(_LOCK_FILE, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _file_md5(file_path):
+    stat = os.stat(file_path)
+    key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+    if key not in _md5_cache:
+        md5 = hashlib.md5()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                md5.update(block)
+        _md5_cache[key] = md5.hexdigest()
+    return _md5_cache[key]
+
+
 class DVCRemoteManager:
     def __init__(self):
+        # AWS credentials của remote nằm trong .env
+        load_env()
         # Kiểm tra xem có file .dvc/config không
         if not os.path.exists('.dvc/config'):
             logger.error("File .dvc/config not found. Make sure you in correct project path")
             raise Exception("File .dvc/config not found. Make sure you in correct project path")
 
+    @staticmethod
+    def _run(command, check=True):
+        with _repo_lock():
+            return subprocess.run(command, check=check)
+
     def add_file(self, file_path):
         try:
-            subprocess.run(['dvc', 'add', file_path], check=True)
+            self._run(['dvc', 'add', file_path])
             logger.info(f"Adding file successfully with {file_path} in DVC tracking")
         except subprocess.CalledProcessError as e:
             logger.error(f"Error when adding file: {e}")
@@ -21,20 +67,146 @@ class DVCRemoteManager:
 
     def push_to_s3(self):
         try:
-            subprocess.run(['dvc', 'push'], check=True)
+            self._run(['dvc', 'push'])
             logger.info("Push data to s3 successfully")
         except subprocess.CalledProcessError as e:
             logger.error(f"Error when push data to s3: {e}")
             raise
 
+    def add_files(self, file_paths):
+        """Track nhiều file/thư mục trong một lần gọi `dvc add`"""
+        try:
+            self._run(['dvc', 'add', *file_paths])
+            logger.info(f"Adding files successfully with {file_paths} in DVC tracking")
+        except subprocess.CalledProcessError as e:
+            logger.error(f"Error when adding files: {e}")
+            raise
+
+    def push(self, targets=None, jobs=None, remote=None):
+        """Push các target (mặc định là toàn bộ workspace) lên remote"""
+        command = ['dvc', 'push']
+        if jobs:
+            command += ['--jobs', str(jobs)]
+        if remote:
+            command += ['--remote', remote]
+        try:
+            self._run(command + [self._dvc_file(target) for target in targets or []])
+            logger.info(f"Push {targets or 'workspace'} to remote successfully")
+        except subprocess.CalledProcessError as e:
+            logger.error(f"Error when push data to remote: {e}")
+            raise
+
     def pull_from_s3(self):
         try:
-            subprocess.run(['dvc', 'pull'], check=True)
+            self._run(['dvc', 'pull'])
             logger.info("Pull data from s3 successfully")
         except subprocess.CalledProcessError as e:
             logger.error(f"Error when pull data from s3: {e}")
             raise
 
+    @staticmethod
+    def _dvc_file(target):
+        return target if target.endswith('.dvc') else f"{target}.dvc"
+
+    @staticmethod
+    def _cache_file(md5):
+        # DVC 3 lưu cache trong files/md5/, DVC 2 lưu thẳng trong cache/
+        for cache_dir in ['.dvc/cache/files/md5', '.dvc/cache']:
+            cache_file = os.path.join(cache_dir, md5[:2], md5[2:])
+            if os.path.exists(cache_file):
+                return cache_file
+        return None
+
+    @staticmethod
+    def _ignore_patterns():
+        # Pattern trong .dvcignore (vd. marker .stage_fingerprint của StageCache)
+        if not os.path.exists('.dvcignore'):
+            return []
+        with open('.dvcignore') as f:
+            lines = [line.strip() for line in f]
+        return [line for line in lines if line and not line.startswith('#')]
+
+    @staticmethod
+    def _is_ignored(relpath, patterns):
+        name = relpath.rsplit('/', 1)[-1]
+        return any(
+            fnmatch.fnmatch(relpath, pattern.lstrip('/')) or fnmatch.fnmatch(name, pattern)
+            for pattern in patterns
+        )
+
+    def _is_dir_current(self, dir_path, md5):
+        # Danh sách file của thư mục nằm trong file .dir của cache local
+        manifest_file = self._cache_file(md5)
+        if manifest_file is None or not os.path.isdir(dir_path):
+            return False
+        with open(manifest_file) as f:
+            entries = {entry['relpath']: entry['md5'] for entry in json.load(f)}
+        patterns = self._ignore_patterns()
+        local_files = {
+            os.path.relpath(os.path.join(root, name), dir_path).replace(os.sep, '/')
+            for root, _, names in os.walk(dir_path)
+            for name in names
+        }
+        # File bị .dvcignore bỏ qua không có trong manifest
+        local_files = {path for path in local_files if not self._is_ignored(path, patterns)}
+        if local_files != set(entries):
+            return False
+        return all(
+            _file_md5(os.path.join(dir_path, relpath)) == file_md5
+            for relpath, file_md5 in entries.items()
+        )
+
+    def is_current(self, target):
+        """Kiểm tra file/thư mục trong workspace có đúng md5 ghi trong file .dvc không"""
+        dvc_file = self._dvc_file(target)
+        if not os.path.exists(dvc_file):
+            raise FileNotFoundError(f"DVC file not found: {dvc_file}")
+        with open(dvc_file) as f:
+            outs = yaml.safe_load(f).get('outs', [])
+        for out in outs:
+            out_path = os.path.join(os.path.dirname(dvc_file), out['path'])
+            md5 = out.get('md5')
+            if md5 is None:
+                return False
+            if md5.endswith('.dir'):
+                if not self._is_dir_current(out_path, md5):
+                    return False
+            elif not os.path.isfile(out_path) or _file_md5(out_path) != md5:
+                return False
+        return True
+
+    def sync(self, targets, jobs=None, remote=None, force=False):
+        """
+        Chỉ pull các target (file .dvc hoặc output của nó) chưa khớp với md5
+        trong file .dvc. Không gọi dvc nếu mọi target đã mới nhất.
+
+        Returns:
+            list: Các file .dvc đã được pull
+        """
+        stale = [
+            os.path.relpath(self._dvc_file(target))
+            for target in targets
+            if not self.is_current(target)
+        ]
+        if not stale:
+            logger.info(f"DVC targets are up to date, skip pull: {targets}")
+            return []
+        command = ['dvc', 'pull']
+        if jobs:
+            command += ['--jobs', str(jobs)]
+        if remote:
+            command += ['--remote', remote]
+        if force:
+            # Ghi đè cả thay đổi local chưa được dvc add
+            command += ['--force']
+        try:
+            self._run(command + stale)
+            logger.info(f"Pull {stale} successfully")
+        except subprocess.CalledProcessError as e:
+            logger.error(f"Error when pull {stale}: {e}")
+            raise
+        return stale
+
     def set_aws_credentials(self, aws_access_key, aws_secret_key):
         os.environ['AWS_ACCESS_KEY_ID'] = aws_access_key
         os.environ['AWS_SECRET_ACCESS_KEY'] = aws_secret_key
@@ -42,9 +214,80 @@ class DVCRemoteManager:
 
     def check_remote_status(self):
         try:
-            subprocess.run(['dvc', 'remote', 'list'], check=True)
+            self._run(['dvc', 'remote', 'list'])
             logger.info("\nList of tracking file:")
-            subprocess.run(['dvc', 'list', '.'])
+            self._run(['dvc', 'list', '.'], check=False)
         except subprocess.CalledProcessError as e:
             logger.error(f"Error when checking remote: {e}")
-            raise
\ No newline at end of file
+            raise
+
+
+class VersioningQueue:
+    """
+    Gom các output cần version của một lần chạy pipeline.
+
+    Các stage chỉ `register()` output; `add()` chạy một `dvc add` cho tất cả
+    (nhanh, chỉ copy vào cache local nên output có thể bị ghi đè ngay sau đó),
+    còn `flush()` chạy một `dvc push` cho đúng các output đó. Với
+    `background=True`, push chạy trên một thread nền dùng chung cho cả process
+    và trả về Future; caller phải chờ Future trước khi process thoát.
+    """
+
+    _executor = None
+    _executor_lock = threading.Lock()
+
+    def __init__(self, jobs=None, remote=None):
+        self.jobs = jobs
+        self.remote = remote
+        self.paths = []
+        self.added = False
+
+    def register(self, path):
+        path = os.path.relpath(path)
+        if path not in self.paths:
+            self.paths.append(path)
+            self.added = False
+
+    def __len__(self):
+        return len(self.paths)
+
+    def add(self):
+        """Track mọi output đã đăng ký bằng một lần `dvc add`"""
+        if self.paths and not self.added:
+            get_dvc_manager().add_files(self.paths)
+        self.added = True
+
+    def _push(self, paths):
+        get_dvc_manager().push(paths, jobs=self.jobs, remote=self.remote)
+        logger.info(f"Versioned {paths} successfully")
+        return paths
+
+    @classmethod
+    def _get_executor(cls):
+        with cls._executor_lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dvc-versioning")
+            return cls._executor
+
+    def flush(self, background=False):
+        """Add (nếu chưa) và push các output đã đăng ký. Trả về Future nếu chạy nền"""
+        if not self.paths:
+            return None
+        self.add()
+        paths, self.paths = self.paths, []
+        if background:
+            return self._get_executor().submit(self._push, paths)
+        return self._push(paths)
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_dvc_manager() -> DVCRemoteManager:
+    """DVCRemoteManager dùng chung cho cả process, chỉ được tạo ở lần dùng đầu tiên"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = DVCRemoteManager()
+        return _manager
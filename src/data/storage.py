@@ -0,0 +1,160 @@
+import os
+from typing import Any
+import pandas as pd
+from omegaconf import DictConfig
+from src.utils import get_logger
+
+logger = get_logger()
+
+
+class DataStorage:
+    """
+    Đọc/ghi các tập dữ liệu (train/val/test...) theo định dạng trong config.
+
+    `parquet` và `feather` (Apache Arrow) giữ nguyên dtype, nhỏ hơn và đọc/ghi
+    nhanh hơn nhiều so với `csv`; `csv` được giữ lại để tương thích.
+    """
+
+    EXTENSIONS = {"csv": ".csv", "parquet": ".parquet", "feather": ".feather"}
+
+    def __init__(self, storage_format: str = "csv"):
+        if storage_format not in self.EXTENSIONS:
+            raise ValueError(
+                f"Storage format '{storage_format}' is not supported. "
+                f"Choose one of {list(self.EXTENSIONS)}"
+            )
+        self.storage_format = storage_format
+
+    def path(self, directory: str, name: str) -> str:
+        """Đường dẫn file của tập dữ liệu `name` (không có đuôi file)"""
+        return os.path.join(directory, name + self.EXTENSIONS[self.storage_format])
+
+    def read(self, directory: str, name: str) -> pd.DataFrame:
+        return self.read_file(self.path(directory, name))
+
+    @staticmethod
+    def read_file(file_path: str) -> pd.DataFrame:
+        """Đọc một file bất kỳ, định dạng được suy ra từ đuôi file"""
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension == ".parquet":
+            return pd.read_parquet(file_path)
+        if extension == ".feather":
+            return pd.read_feather(file_path)
+        return pd.read_csv(file_path)
+
+    def iter_chunks(self, directory: str, name: str, chunk_size: int):
+        return self.iter_file_chunks(self.path(directory, name), chunk_size)
+
+    @staticmethod
+    def iter_file_chunks(file_path: str, chunk_size: int):
+        """Đọc file theo từng chunk `chunk_size` dòng, không load cả file vào bộ nhớ"""
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension == ".parquet":
+            import pyarrow.parquet as pq
+
+            for batch in pq.ParquetFile(file_path).iter_batches(batch_size=chunk_size):
+                yield batch.to_pandas()
+        elif extension == ".feather":
+            import pyarrow as pa
+
+            with pa.memory_map(file_path) as source:
+                reader = pa.ipc.open_file(source)
+                for i in range(reader.num_record_batches):
+                    batch = reader.get_batch(i)
+                    for offset in range(0, batch.num_rows, chunk_size):
+                        yield batch.slice(offset, chunk_size).to_pandas()
+        else:
+            with pd.read_csv(file_path, chunksize=chunk_size) as reader:
+                yield from reader
+
+    @staticmethod
+    def read_file_columns(file_path: str) -> pd.DataFrame:
+        """DataFrame rỗng với các cột của file, không đọc dòng dữ liệu nào"""
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension == ".parquet":
+            import pyarrow.parquet as pq
+
+            return pq.read_schema(file_path).empty_table().to_pandas()
+        if extension == ".feather":
+            import pyarrow as pa
+
+            with pa.memory_map(file_path) as source:
+                return pa.ipc.open_file(source).schema.empty_table().to_pandas()
+        return pd.read_csv(file_path, nrows=0)
+
+    def open_writer(self, directory: str, name: str) -> "ChunkWriter":
+        """Writer để ghi nối tiếp từng chunk vào tập dữ liệu `name`"""
+        return ChunkWriter(self.path(directory, name), self.storage_format)
+
+    @classmethod
+    def open_file_writer(cls, file_path: str) -> "ChunkWriter":
+        """Writer cho một file bất kỳ, định dạng được suy ra từ đuôi file"""
+        extension = os.path.splitext(file_path)[1].lower()
+        formats = {ext: name for name, ext in cls.EXTENSIONS.items()}
+        if extension not in formats:
+            raise ValueError(
+                f"Cannot infer storage format of '{file_path}', use one of {list(formats)}."
+            )
+        return ChunkWriter(file_path, formats[extension])
+
+    def write(self, df: pd.DataFrame, directory: str, name: str) -> str:
+        file_path = self.path(directory, name)
+        if self.storage_format == "parquet":
+            df.to_parquet(file_path, index=False)
+        elif self.storage_format == "feather":
+            # Feather không lưu index khác RangeIndex
+            df.reset_index(drop=True).to_feather(file_path)
+        else:
+            df.to_csv(file_path, index=False)
+        return file_path
+
+
+class ChunkWriter:
+    """Ghi nối tiếp các DataFrame có cùng schema vào một file"""
+
+    def __init__(self, file_path: str, storage_format: str):
+        self.file_path = file_path
+        self.storage_format = storage_format
+        self.rows = 0
+        # pq.ParquetWriter hoặc pa.RecordBatchFileWriter, pyarrow chỉ được import khi cần
+        self._writer: Any = None
+        self._schema = None
+        self._started = False
+
+    def write(self, df: pd.DataFrame):
+        if self.storage_format == "csv":
+            df.to_csv(
+                self.file_path,
+                mode="a" if self._started else "w",
+                header=not self._started,
+                index=False,
+            )
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                self._schema = table.schema
+                if self.storage_format == "parquet":
+                    self._writer = pq.ParquetWriter(self.file_path, self._schema)
+                else:
+                    self._writer = pa.ipc.new_file(self.file_path, self._schema)
+            self._writer.write_table(table.cast(self._schema))
+        self._started = True
+        self.rows += len(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def get_storage(config: DictConfig) -> DataStorage:
+    return DataStorage(config.data.get("storage_format", "csv"))
@@ -1,5 +1,25 @@
-from .model_evaluation import ModelEvaluation
-from .model_trainer import ModelTrainer
-__all__ = [
-    "ModelEvaluation","ModelTrainer"
-]
+import importlib
+
+# Tên được export -> module con. Module con chỉ được import khi tên được dùng
+# tới, để process chỉ serve (serve.py) không phải import sklearn/hydra/mlflow
+# của phần training.
+_EXPORTS = {
+    "ModelEvaluation": ".model_evaluation",
+    "ModelTrainer": ".model_trainer",
+    "ModelStore": ".model_store",
+    "get_model_store": ".model_store",
+    "HyperparameterSearch": ".hyperparameter_search",
+    "CompiledScorer": ".compiled_scorer",
+    "compile_model": ".compiled_scorer",
+    "ModelBundle": ".model_bundle",
+    "PredictionCache": ".prediction_cache",
+}
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,252 @@
+import hashlib
+import json
+import os
+from typing import Optional
+import numpy as np
+from src.utils import get_logger
+
+logger = get_logger()
+
+COMPILED_MODEL_FILE = "model_compiled.npz"
+
+
+def file_digest(file_path: str, block_size: int = 1 << 20) -> str:
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def sources_digest(source_paths) -> str:
+    """
+    sha256 gộp của các file mà artifact serving được tạo ra từ đó: model.pkl,
+    scaler.joblib và label_encoder.joblib. Đổi một trong ba file là artifact cũ.
+    """
+    sha256 = hashlib.sha256()
+    for path in source_paths:
+        sha256.update(file_digest(path).encode())
+    return sha256.hexdigest()
+
+
+class CompiledScorer:
+    """
+    Model đã được "compile" thành các mảng NumPy phẳng, predict không cần sklearn.
+
+    - `forest`: RandomForest/ExtraTrees/DecisionTree. Node của mọi cây được gộp
+      vào các mảng feature/threshold/left/right/value; mọi cây và mọi dòng được
+      duyệt cùng lúc, mỗi bước xuống một tầng. Lá trỏ về chính nó nên chỉ cần
+      lặp đúng `max_depth` lần.
+    - `linear`: LogisticRegression/LinearSVC, scaler được gộp vào weights.
+    - `ovo`: SVC kernel linear (one-vs-one), scaler được gộp vào weights.
+
+    Label text được tra bằng mảng `label_text[label_code]`.
+    """
+
+    # Số dòng mỗi lần duyệt cây, giới hạn bộ nhớ của mảng (dòng x cây)
+    CHUNK_SIZE = 4096
+
+    def __init__(self, kind: str, arrays: dict, meta: dict):
+        self.kind = kind
+        self.arrays = arrays
+        self.meta = meta
+        self.classes = arrays["classes"]
+        self.label_text = arrays["label_text"]
+        self.feature_names = list(meta["feature_names"])
+
+    def predict(self, X) -> dict:
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != len(self.feature_names):
+            raise ValueError(
+                f"X has shape {X.shape}, expected (n_samples, {len(self.feature_names)})"
+            )
+        if self.kind == "forest":
+            label_index = np.concatenate([
+                self._predict_forest(X[start:start + self.CHUNK_SIZE])
+                for start in range(0, max(len(X), 1), self.CHUNK_SIZE)
+            ]) if len(X) else np.empty(0, dtype=np.intp)
+        elif self.kind == "linear":
+            label_index = self._predict_linear(X)
+        else:
+            label_index = self._predict_ovo(X)
+        label_code = self.classes[label_index]
+        return {
+            "label_code": label_code,
+            "label_text": self.label_text[label_code],
+        }
+
+    def _predict_forest(self, X):
+        a = self.arrays
+        # Giống sklearn: scale bằng float64 rồi so sánh ở float32
+        X = ((X - a["mean"]) / a["scale"]).astype(np.float32)
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(a["roots"], (len(X), len(a["roots"])))
+        for _ in range(int(self.meta["max_depth"])):
+            go_left = X[rows, a["feature"][node]] <= a["threshold"][node]
+            node = np.where(go_left, a["left"][node], a["right"][node])
+        proba = a["value"][node].sum(axis=1)
+        return proba.argmax(axis=1)
+
+    def _predict_linear(self, X):
+        scores = X @ self.arrays["weights"].T + self.arrays["bias"]
+        if scores.shape[1] == 1:
+            return (scores[:, 0] > 0).astype(np.intp)
+        return scores.argmax(axis=1)
+
+    def _predict_ovo(self, X):
+        a = self.arrays
+        scores = X @ a["weights"].T + a["bias"]
+        # Giống libsvm: mỗi cặp (i, j) bỏ phiếu cho i nếu score > 0, hoà thì lấy class nhỏ hơn
+        winners = np.where(scores > 0, a["pair_first"], a["pair_second"])
+        votes = np.zeros((len(X), len(self.classes)), dtype=np.int64)
+        np.add.at(votes, (np.arange(len(X))[:, None], winners), 1)
+        return votes.argmax(axis=1)
+
+    def save(self, file_path: str):
+        """Ghi ra file tạm rồi replace để process đang serve không đọc phải file dở dang"""
+        tmp_file_path = f"{file_path}.tmp.npz"
+        np.savez(
+            tmp_file_path,
+            __meta__=np.array(json.dumps({"kind": self.kind, **self.meta})),
+            **self.arrays,
+        )
+        os.replace(tmp_file_path, file_path)
+
+    @classmethod
+    def load(cls, file_path: str) -> "CompiledScorer":
+        with np.load(file_path, allow_pickle=False) as data:
+            meta = json.loads(str(data["__meta__"]))
+            arrays = {name: data[name] for name in data.files if name != "__meta__"}
+        return cls(meta.pop("kind"), arrays, meta)
+
+
+def _scaler_arrays(scaler, n_features: int):
+    mean = getattr(scaler, "mean_", None)
+    scale = getattr(scaler, "scale_", None)
+    mean = np.zeros(n_features) if mean is None else np.asarray(mean, dtype=np.float64)
+    scale = np.ones(n_features) if scale is None else np.asarray(scale, dtype=np.float64)
+    return mean, scale
+
+
+def _compile_forest(model, mean, scale) -> tuple:
+    trees = [estimator.tree_ for estimator in getattr(model, "estimators_", [model])]
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    for tree in trees:
+        node_ids = np.arange(tree.node_count)
+        is_leaf = tree.children_left == -1
+        # Lá: luôn "rẽ trái" về chính nó
+        features.append(np.where(is_leaf, 0, tree.feature).astype(np.intp))
+        thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+        lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+        rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+        value = tree.value[:, 0, :].astype(np.float64)
+        normalizer = value.sum(axis=1, keepdims=True)
+        normalizer[normalizer == 0] = 1.0
+        values.append(value / normalizer)
+        roots.append(offset)
+        offset += tree.node_count
+    arrays = {
+        "mean": mean,
+        "scale": scale,
+        "feature": np.concatenate(features),
+        "threshold": np.concatenate(thresholds),
+        "left": np.concatenate(lefts),
+        "right": np.concatenate(rights),
+        "value": np.concatenate(values),
+        "roots": np.asarray(roots, dtype=np.intp),
+    }
+    return "forest", arrays, {"max_depth": max(tree.max_depth for tree in trees)}
+
+
+def _fold_scaler(coef, intercept, mean, scale):
+    # w . ((x - mean) / scale) + b = (w / scale) . x + (b - w . (mean / scale))
+    weights = coef / scale
+    bias = intercept - weights @ mean
+    return weights, bias
+
+
+def _compile_linear(model, mean, scale) -> tuple:
+    weights, bias = _fold_scaler(
+        np.atleast_2d(model.coef_).astype(np.float64), np.atleast_1d(model.intercept_), mean, scale
+    )
+    return "linear", {"weights": weights, "bias": bias}, {}
+
+
+def _compile_ovo(model, mean, scale) -> tuple:
+    weights, bias = _fold_scaler(model.coef_.astype(np.float64), model.intercept_, mean, scale)
+    n_classes = len(model.classes_)
+    pairs = [(i, j) for i in range(n_classes) for j in range(i + 1, n_classes)]
+    arrays = {
+        "weights": weights,
+        "bias": bias,
+        "pair_first": np.array([i for i, _ in pairs], dtype=np.intp),
+        "pair_second": np.array([j for _, j in pairs], dtype=np.intp),
+    }
+    return "ovo", arrays, {}
+
+
+def compile_model(model, scaler, label_encoder, feature_names=None) -> CompiledScorer:
+    """
+    Compile model sklearn đã fit cùng scaler và label encoder thành CompiledScorer.
+
+    Raises:
+        NotImplementedError: Model không có dạng compile được (vd. KNN, SVC kernel rbf)
+    """
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.svm import SVC, LinearSVC
+    from sklearn.tree import BaseDecisionTree
+    from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+
+    n_features = model.n_features_in_
+    mean, scale = _scaler_arrays(scaler, n_features)
+    if isinstance(model, (RandomForestClassifier, ExtraTreesClassifier, BaseDecisionTree)):
+        kind, arrays, meta = _compile_forest(model, mean, scale)
+    elif isinstance(model, (LogisticRegression, LinearSVC)):
+        kind, arrays, meta = _compile_linear(model, mean, scale)
+    elif isinstance(model, SVC) and model.kernel == "linear" and len(model.classes_) == 2:
+        # SVC nhị phân đã đổi dấu coef_/intercept_: score > 0 là classes_[1]
+        kind, arrays, meta = _compile_linear(model, mean, scale)
+    elif isinstance(model, SVC) and model.kernel == "linear" and not model.break_ties:
+        kind, arrays, meta = _compile_ovo(model, mean, scale)
+    else:
+        raise NotImplementedError(f"Model {type(model).__name__} cannot be compiled.")
+
+    if feature_names is None:
+        feature_names = getattr(scaler, "feature_names_in_", [f"x{i}" for i in range(n_features)])
+    arrays["classes"] = np.asarray(model.classes_)
+    arrays["label_text"] = np.asarray(label_encoder.classes_).astype(str)
+    meta["feature_names"] = [str(name) for name in feature_names]
+    return CompiledScorer(kind, arrays, meta)
+
+
+def export_compiled_model(source_paths: list, model, scaler, label_encoder) -> Optional[str]:
+    """
+    Ghi CompiledScorer cạnh file model.pkl (`source_paths[0]`), kèm sha256 của
+    model.pkl, scaler và label encoder để người dùng kiểm tra bản compile còn
+    khớp. Trả về None nếu model không compile được.
+    """
+    compiled_path = os.path.join(os.path.dirname(source_paths[0]), COMPILED_MODEL_FILE)
+    try:
+        scorer = compile_model(model, scaler, label_encoder)
+    except NotImplementedError as e:
+        logger.info(f"Skip compiled export: {e}")
+        if os.path.exists(compiled_path):
+            os.remove(compiled_path)
+        return None
+    scorer.meta["source_sha256"] = sources_digest(source_paths)
+    scorer.save(compiled_path)
+    logger.info(f"Compiled model exported to {compiled_path}")
+    return compiled_path
+
+
+def load_compiled_model(source_paths: list):
+    """CompiledScorer khớp với model.pkl, scaler và label encoder hiện tại, None nếu chưa có hoặc đã cũ"""
+    compiled_path = os.path.join(os.path.dirname(source_paths[0]), COMPILED_MODEL_FILE)
+    if not os.path.exists(compiled_path):
+        return None
+    scorer = CompiledScorer.load(compiled_path)
+    if scorer.meta.get("source_sha256") != sources_digest(source_paths):
+        logger.warning(f"Compiled model {compiled_path} is stale, fall back to model.pkl")
+        return None
+    return scorer
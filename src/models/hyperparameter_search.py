@@ -0,0 +1,109 @@
+import time
+import hydra
+from omegaconf import DictConfig, ListConfig, OmegaConf
+from scipy import stats
+from sklearn.base import clone
+from sklearn.metrics import make_scorer
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import HalvingRandomSearchCV, StratifiedKFold
+from src.utils import get_logger, get_tracker
+from .metrics import ConfusionMatrix, is_supported
+
+logger = get_logger()
+tracker = get_tracker()
+
+DISTRIBUTIONS = {
+    "uniform": lambda low, high: stats.uniform(low, high - low),
+    "loguniform": stats.loguniform,
+    "randint": stats.randint,
+}
+
+
+def build_search_space(search_space: DictConfig) -> dict:
+    """Chuyển `search_space` trong YAML thành param_distributions của sklearn"""
+    distributions = {}
+    for name, spec in search_space.items():
+        if isinstance(spec, ListConfig):
+            distributions[name] = OmegaConf.to_container(spec, resolve=True)
+        elif isinstance(spec, DictConfig):
+            if spec.distribution not in DISTRIBUTIONS:
+                raise ValueError(f"Distribution '{spec.distribution}' of {name!r} is not supported.")
+            distributions[name] = DISTRIBUTIONS[spec.distribution](spec.low, spec.high)
+        else:
+            distributions[name] = [spec]
+    return distributions
+
+
+class HyperparameterSearch:
+    """
+    Tìm hyperparameter bằng k-fold CV với successive halving
+    (HalvingRandomSearchCV): mọi cấu hình được thử trên ít dữ liệu trước, chỉ
+    1/`factor` cấu hình tốt nhất được chạy tiếp với lượng dữ liệu lớn hơn.
+
+    Các fold chạy song song trên `n_jobs` process; joblib chuyển các mảng lớn
+    thành memmap nên các process dùng chung dữ liệu thay vì copy mỗi fold.
+    """
+
+    def __init__(self, search_config: DictConfig, selection_metric: str = "f1"):
+        if not is_supported(selection_metric):
+            raise ValueError(f"Selection metric '{selection_metric}' is not supported.")
+        self.search_config = search_config
+        self.metric_name = selection_metric
+        self.scoring = make_scorer(
+            lambda y_true, y_pred: ConfusionMatrix(y_true, y_pred).metric(selection_metric)
+        )
+        self.n_jobs = search_config.get("n_jobs", -1)
+        self.cv = StratifiedKFold(
+            n_splits=search_config.cv, shuffle=True, random_state=search_config.random_state
+        )
+
+    def search(self, model_name: str, class_path: str, params: dict, search_space: DictConfig, X, y):
+        """
+        Tìm params tốt nhất cho một model và fit lại model đó trên toàn bộ (X, y).
+
+        Returns:
+            tuple: (model đã fit, params tốt nhất, điểm CV trung bình)
+        """
+        estimator = hydra.utils.get_class(class_path)(**params)
+        searcher = HalvingRandomSearchCV(
+            estimator,
+            build_search_space(search_space),
+            n_candidates=self.search_config.n_candidates,
+            factor=self.search_config.factor,
+            cv=self.cv,
+            scoring=self.scoring,
+            n_jobs=self.n_jobs,
+            random_state=self.search_config.random_state,
+            refit=False,
+            return_train_score=False,
+        )
+        start = time.perf_counter()
+        searcher.fit(X, y)
+        logger.info(
+            f"Search for {model_name} finished in {time.perf_counter() - start:.2f}s after "
+            f"{searcher.n_iterations_} rounds ({searcher.n_candidates_} candidates): "
+            f"best {self.metric_name}={searcher.best_score_:.4f} with {searcher.best_params_}"
+        )
+        for step, (n_candidates, n_resources) in enumerate(zip(searcher.n_candidates_, searcher.n_resources_)):
+            tracker.log_metrics(
+                {f"search.{model_name}.n_candidates": n_candidates,
+                 f"search.{model_name}.n_resources": n_resources},
+                step=step,
+            )
+
+        # Điểm từng fold và thời gian fit/score của cấu hình tốt nhất lấy từ cv_results_,
+        # không chạy lại CV (sklearn chỉ giữ trung bình và độ lệch chuẩn của thời gian)
+        results, best = searcher.cv_results_, searcher.best_index_
+        for fold in range(self.cv.get_n_splits()):
+            tracker.log_metric(
+                f"search.{model_name}.fold_{self.metric_name}", results[f"split{fold}_test_score"][best], step=fold
+            )
+        tracker.log_metrics({
+            f"search.{model_name}.{name}": results[name][best]
+            for name in ("mean_fit_time", "std_fit_time", "mean_score_time", "std_score_time")
+        })
+        tracker.log_metric(f"search.{model_name}.best_cv_score", searcher.best_score_)
+
+        model = clone(estimator).set_params(**searcher.best_params_)
+        model.fit(X, y)
+        return model, searcher.best_params_, searcher.best_score_
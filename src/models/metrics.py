@@ -0,0 +1,158 @@
+from typing import Callable, Dict
+import numpy as np
+
+# Metric theo từng class: hàm nhận ConfusionMatrix, trả về mảng (n_classes,)
+PER_CLASS_METRICS: Dict[str, Callable] = {}
+# Metric một giá trị: hàm nhận ConfusionMatrix, trả về float
+SCALAR_METRICS: Dict[str, Callable] = {}
+AVERAGES = ("macro", "micro", "weighted")
+
+DEFAULT_METRICS = ("accuracy", "precision", "recall", "f1")
+
+
+def register_metric(name: str, per_class: bool = False):
+    """
+    Đăng ký metric mới, tính từ confusion matrix nên không cần thêm lần duyệt dữ liệu nào.
+
+    Metric `per_class=True` tự có các biến thể `<name>_macro`, `<name>_micro`,
+    `<name>_weighted`, `<name>_per_class`; riêng `<name>` là `<name>_macro`.
+    Hàm của metric per class cũng nhận thêm `micro=True` để tính trên tổng
+    tp/fp/fn của mọi class.
+    """
+    def decorator(fn):
+        (PER_CLASS_METRICS if per_class else SCALAR_METRICS)[name] = fn
+        return fn
+    return decorator
+
+
+def _divide(numerator, denominator):
+    # zero_division=0 giống mặc định của sklearn
+    numerator = np.asarray(numerator, dtype=np.float64)
+    denominator = np.asarray(denominator, dtype=np.float64)
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator != 0)
+
+
+def parse_metric(name: str) -> tuple:
+    """Tách tên metric per class thành (metric, kiểu average)"""
+    if name in PER_CLASS_METRICS:
+        return name, "macro"
+    if name.endswith("_per_class"):
+        base, average = name[: -len("_per_class")], "per_class"
+    else:
+        base, _, average = name.rpartition("_")
+    if base not in PER_CLASS_METRICS or average not in AVERAGES + ("per_class",):
+        raise ValueError(f"Metric '{name}' is not supported.")
+    return base, average
+
+
+def is_supported(name: str) -> bool:
+    if name in SCALAR_METRICS:
+        return True
+    try:
+        parse_metric(name)
+    except ValueError:
+        return False
+    return True
+
+
+class ConfusionMatrix:
+    """
+    Confusion matrix tính bằng một lần `np.bincount` trên (y_true, y_pred).
+
+    Các đại lượng tp/fp/fn/support được tính một lần từ matrix và dùng chung
+    cho mọi metric.
+    """
+
+    def __init__(self, y_true, y_pred):
+        y_true = np.asarray(y_true).ravel()
+        y_pred = np.asarray(y_pred).ravel()
+        if y_true.shape != y_pred.shape:
+            raise ValueError(
+                f"y_true and y_pred have different lengths: {len(y_true)} != {len(y_pred)}"
+            )
+
+        n = 0
+        if y_true.dtype.kind in "iu" and y_pred.dtype.kind in "iu" and len(y_true):
+            if min(y_true.min(), y_pred.min()) >= 0:
+                n = int(max(y_true.max(), y_pred.max())) + 1
+        if 0 < n and n * n <= max(len(y_true), 1 << 16):
+            # Label đã được encode thành 0..k-1 (LabelEncoder): dùng luôn làm index
+            matrix = np.bincount(y_true * n + y_pred, minlength=n * n).reshape(n, n)
+            # Giống sklearn: chỉ giữ các label xuất hiện trong y_true hoặc y_pred
+            present = np.flatnonzero(matrix.sum(axis=0) + matrix.sum(axis=1))
+            self.labels = present
+            self.matrix = matrix[np.ix_(present, present)]
+        else:
+            labels, codes = np.unique(np.concatenate([y_true, y_pred]), return_inverse=True)
+            true_codes, pred_codes = codes[: len(y_true)], codes[len(y_true):]
+            n = len(labels)
+            self.labels = labels
+            self.matrix = np.bincount(true_codes * n + pred_codes, minlength=n * n).reshape(n, n)
+
+        self.tp = np.diag(self.matrix)
+        self.support = self.matrix.sum(axis=1)
+        self.predicted = self.matrix.sum(axis=0)
+        self.fp = self.predicted - self.tp
+        self.fn = self.support - self.tp
+        self.total = self.support.sum()
+
+    def metric(self, name: str):
+        """Giá trị của một metric, vd. `accuracy`, `f1`, `recall_weighted`, `precision_per_class`"""
+        if name in SCALAR_METRICS:
+            return float(SCALAR_METRICS[name](self))
+        base, average = parse_metric(name)
+        fn = PER_CLASS_METRICS[base]
+        if average == "micro":
+            return float(fn(self, micro=True))
+        values = fn(self)
+        if average == "per_class":
+            return {str(label): float(value) for label, value in zip(self.labels, values)}
+        if average == "weighted":
+            return float(_divide(np.dot(values, self.support), self.total))
+        return float(values.mean()) if len(values) else 0.0
+
+    def compute(self, metrics=DEFAULT_METRICS) -> dict:
+        """
+        Tính nhiều metric một lúc. Metric `*_per_class` được trải thành các key
+        `<metric>.<label>` để log thẳng lên MLflow.
+        """
+        results = {}
+        for name in metrics:
+            value = self.metric(name)
+            if isinstance(value, dict):
+                base = name[: -len("_per_class")]
+                results.update({f"{base}.{label}": item for label, item in value.items()})
+            else:
+                results[name] = value
+        return results
+
+
+@register_metric("accuracy")
+def accuracy(cm: ConfusionMatrix):
+    return _divide(cm.tp.sum(), cm.total)
+
+
+@register_metric("precision", per_class=True)
+def precision(cm: ConfusionMatrix, micro: bool = False):
+    if micro:
+        return _divide(cm.tp.sum(), cm.predicted.sum())
+    return _divide(cm.tp, cm.predicted)
+
+
+@register_metric("recall", per_class=True)
+def recall(cm: ConfusionMatrix, micro: bool = False):
+    if micro:
+        return _divide(cm.tp.sum(), cm.support.sum())
+    return _divide(cm.tp, cm.support)
+
+
+@register_metric("f1", per_class=True)
+def f1(cm: ConfusionMatrix, micro: bool = False):
+    if micro:
+        return _divide(2 * cm.tp.sum(), 2 * cm.tp.sum() + cm.fp.sum() + cm.fn.sum())
+    return _divide(2 * cm.tp, 2 * cm.tp + cm.fp + cm.fn)
+
+
+def compute_metrics(y_true, y_pred, metrics=DEFAULT_METRICS) -> dict:
+    """Tính mọi metric trong `metrics` từ một confusion matrix duy nhất"""
+    return ConfusionMatrix(y_true, y_pred).compute(metrics)
@@ -0,0 +1,137 @@
+import os
+import time
+from typing import Optional
+import joblib
+from src.utils import get_logger
+from .compiled_scorer import CompiledScorer, compile_model, sources_digest
+from .metrics import DEFAULT_METRICS, compute_metrics
+
+logger = get_logger()
+
+BUNDLE_FILE = "model.bundle"
+BUNDLE_FORMAT = "mlops-model-bundle"
+BUNDLE_VERSION = 2
+
+
+class ModelBundle:
+    """
+    Model, scaler, label encoder, tên feature và schema trong một file duy nhất.
+
+    File là một `joblib.dump` không nén của một dict; mọi mảng NumPy trong đó
+    (mảng của scorer đã compile, mean_/scale_ của scaler và các mảng thuộc tính
+    của model như coef_, support_vectors_, _fit_X) được load bằng
+    `mmap_mode="r"`. Các worker cùng load một file vì vậy dùng chung page cache
+    của OS thay vì mỗi process giữ một bản copy riêng. Cây của model dạng
+    forest được sklearn copy khi load nên không được chia sẻ; với các model
+    này `predict` dùng scorer đã compile.
+    """
+
+    def __init__(self, content: dict):
+        if content.get("format") != BUNDLE_FORMAT:
+            raise ValueError("File is not a model bundle.")
+        if content.get("format_version") != BUNDLE_VERSION:
+            raise ValueError(
+                f"Bundle format version {content.get('format_version')} is not supported "
+                f"(expected {BUNDLE_VERSION})."
+            )
+        self.content = content
+        self.model_name = content["model_name"]
+        self.feature_names = list(content["feature_names"])
+        self.schema = content["schema"]
+        self.source_sha256 = content.get("source_sha256")
+        self.model = content["model"]
+        self.scaler = content["scaler"]
+        self.label_encoder = content["label_encoder"]
+        self.metrics = list(DEFAULT_METRICS)
+        compiled = content.get("compiled")
+        self.scorer = None if compiled is None else CompiledScorer(
+            compiled["kind"], compiled["arrays"], compiled["meta"]
+        )
+
+    @classmethod
+    def build(cls, model, scaler, label_encoder, model_name: str, label_col: Optional[str] = None,
+              source_sha256: Optional[str] = None) -> "ModelBundle":
+        feature_names = [str(name) for name in getattr(scaler, "feature_names_in_", [])]
+        try:
+            scorer = compile_model(model, scaler, label_encoder, feature_names or None)
+            compiled = {"kind": scorer.kind, "arrays": scorer.arrays, "meta": scorer.meta}
+        except NotImplementedError as e:
+            logger.info(f"Bundle without compiled scorer: {e}")
+            compiled = None
+        return cls({
+            "format": BUNDLE_FORMAT,
+            "format_version": BUNDLE_VERSION,
+            "created_at": time.time(),
+            "model_name": model_name,
+            "feature_names": feature_names,
+            "schema": {
+                "features": {name: "float64" for name in feature_names},
+                "label_col": label_col,
+                "labels": [str(label) for label in label_encoder.classes_],
+            },
+            "source_sha256": source_sha256,
+            # Lưu chính estimator (không phải bytes pickle) để joblib mmap được các mảng của nó
+            "model": model,
+            "scaler": scaler,
+            "label_encoder": label_encoder,
+            "compiled": compiled,
+        })
+
+    def save(self, file_path: str):
+        """Ghi ra file tạm rồi replace để process đang serve không đọc phải file dở dang"""
+        tmp_file_path = f"{file_path}.tmp"
+        # Không nén: joblib chỉ mmap được mảng lưu nguyên dạng
+        joblib.dump(self.content, tmp_file_path)
+        os.replace(tmp_file_path, file_path)
+
+    @classmethod
+    def load(cls, file_path: str, mmap_mode: str = "r") -> "ModelBundle":
+        return cls(joblib.load(file_path, mmap_mode=mmap_mode))
+
+    def predict(self, X) -> dict:
+        if self.scorer is not None:
+            return self.scorer.predict(X)
+        X_scaled = self.scaler.transform(X)
+        y_pred_label_code = self.model.predict(X_scaled)
+        return {
+            "label_code": y_pred_label_code,
+            "label_text": self.label_encoder.inverse_transform(y_pred_label_code),
+        }
+
+    def evaluate(self, X, y):
+        y_scaled = self.label_encoder.transform(y)
+        return compute_metrics(y_scaled, self.predict(X)["label_code"], self.metrics)
+
+
+def export_model_bundle(source_paths: list, model, scaler, label_encoder,
+                        model_name: str, label_col: Optional[str] = None) -> str:
+    """
+    Ghi bundle cạnh model.pkl (`source_paths[0]`), kèm sha256 của model.pkl,
+    scaler và label encoder để kiểm tra bundle còn khớp
+    """
+    bundle_path = os.path.join(os.path.dirname(source_paths[0]), BUNDLE_FILE)
+    bundle = ModelBundle.build(
+        model, scaler, label_encoder, model_name, label_col, source_sha256=sources_digest(source_paths)
+    )
+    bundle.save(bundle_path)
+    logger.info(f"Model bundle exported to {bundle_path}")
+    return bundle_path
+
+
+def load_model_bundle(source_paths: list, mmap_mode: str = "r"):
+    """
+    ModelBundle khớp với model.pkl, scaler và label encoder hiện tại, None nếu
+    chưa có, đã cũ hoặc khác version
+    """
+    bundle_path = os.path.join(os.path.dirname(source_paths[0]), BUNDLE_FILE)
+    if not os.path.exists(bundle_path):
+        return None
+    try:
+        bundle = ModelBundle.load(bundle_path, mmap_mode=mmap_mode)
+    except ValueError as e:
+        logger.warning(f"Cannot use model bundle {bundle_path}: {e}")
+        return None
+    if bundle.source_sha256 != sources_digest(source_paths):
+        logger.warning(f"Model bundle {bundle_path} is stale, fall back to model.pkl")
+        return None
+    return bundle
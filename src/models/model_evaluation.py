@@ -1,9 +1,9 @@
 import os
 import pickle
 import joblib
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
 from omegaconf import DictConfig
 from src.utils import get_logger
+from .metrics import DEFAULT_METRICS, compute_metrics
 
 logger = get_logger()
 
@@ -15,12 +15,7 @@ class ModelEvaluation:
         self.model = self.load_model()
         self.scaler = joblib.load(os.path.join(self.transformed_data_path, 'scaler.joblib'))
         self.label_encoder = joblib.load(os.path.join(self.transformed_data_path, 'label_encoder.joblib'))
-        self.metrics = {
-            'accuracy': accuracy_score,
-            'precision': precision_score,
-            'recall': recall_score,
-            'f1': f1_score
-        }
+        self.metrics = list(config.training.get("metrics", DEFAULT_METRICS))
 
     def load_model(self):
         model_file_path = os.path.join(self.model_path, "model.pkl")
@@ -34,19 +29,25 @@ class ModelEvaluation:
         X_scaled = self.scaler.transform(X)
         y_scaled = self.label_encoder.transform(y)
         y_pred = self.model.predict(X_scaled)
-        metrics = {}
-        for metric_name, metric_func in self.metrics.items():
-            if metric_name in ['precision', 'recall', 'f1']:
-                metrics[metric_name] = metric_func(y, y_pred, average='macro')
-            else:
-                metrics[metric_name] = metric_func(y, y_pred)
-        return metrics
+        # So sánh với label đã encode, cùng kiểu với output của model
+        return compute_metrics(y_scaled, y_pred, self.metrics)
 
-    def predict(self, X):
+    def predict(self, X, with_proba: bool = False):
+        """
+        Args:
+            with_proba (bool): Thêm `proba` (n_samples, n_classes) và `proba_labels`
+                (label text của từng cột); model phải có `predict_proba`
+        """
         X_scaled = self.scaler.transform(X)
         y_pred_label_code = self.model.predict(X_scaled)
         y_pred_label_text = self.label_encoder.inverse_transform(y_pred_label_code)
-        return {
+        result = {
                 "label_code":y_pred_label_code,
                 "label_text":y_pred_label_text
-                }
\ No newline at end of file
+                }
+        if with_proba:
+            if not hasattr(self.model, "predict_proba"):
+                raise ValueError(f"Model {type(self.model).__name__} does not support predict_proba.")
+            result["proba"] = self.model.predict_proba(X_scaled)
+            result["proba_labels"] = self.label_encoder.inverse_transform(self.model.classes_)
+        return result
\ No newline at end of file
@@ -0,0 +1,168 @@
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+from omegaconf import DictConfig
+from src.utils import get_logger
+from .compiled_scorer import COMPILED_MODEL_FILE, load_compiled_model
+from .model_bundle import BUNDLE_FILE, load_model_bundle
+from .model_evaluation import ModelEvaluation
+
+logger = get_logger()
+
+
+class ModelStore:
+    """
+    Giữ model, scaler và label encoder trong bộ nhớ cho cả process.
+
+    Artifact chỉ được load một lần; các lần gọi `get()` sau đó chỉ kiểm tra
+    mtime/size của file (tối đa một lần mỗi `reload_check_interval` giây) và
+    thay thế evaluator bằng phiên bản mới khi artifact thay đổi. Request đang
+    chạy vẫn giữ tham chiếu tới evaluator cũ nên không bị gián đoạn.
+
+    Khi `get()` được gọi trên event loop (serve.py), `start_watcher()` chuyển việc
+    kiểm tra và reload (đọc file, sha256 của artifact) sang một thread nền; `get()`
+    khi đó chỉ trả về evaluator hiện tại.
+
+    `serving.model_format` chọn evaluator:
+    - `bundle`: ModelBundle load bằng mmap từ models/model.bundle, các worker
+      dùng chung page cache
+    - `compiled`: CompiledScorer từ models/model_compiled.npz
+    - `pickle`: ModelEvaluation
+    File bundle/compiled chưa có hoặc không khớp với model.pkl thì lùi về pickle.
+    """
+
+    # File tuỳ chọn của mỗi format, được ghi sau model.pkl
+    FORMAT_FILES = {"bundle": BUNDLE_FILE, "compiled": COMPILED_MODEL_FILE}
+    FORMAT_LOADERS: Dict[str, Callable] = {"bundle": load_model_bundle, "compiled": load_compiled_model}
+
+    def __init__(self, config: DictConfig):
+        self.config = config
+        self.check_interval = config.serving.reload_check_interval
+        self.model_format = config.serving.get("model_format", "pickle")
+        if self.model_format not in ("pickle", *self.FORMAT_FILES):
+            raise ValueError(f"Model format '{self.model_format}' is not supported.")
+        self.version = 0
+        self._evaluator: Optional[ModelEvaluation] = None
+        self._signature = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def artifact_paths(self):
+        return [
+            os.path.join(self.config.paths.models_dir, "model.pkl"),
+            os.path.join(self.config.data.transformed_data_path, "scaler.joblib"),
+            os.path.join(self.config.data.transformed_data_path, "label_encoder.joblib"),
+        ]
+
+    def _read_signature(self):
+        signature = []
+        for path in self.artifact_paths():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                return None
+            signature.append((path, stat.st_mtime_ns, stat.st_size))
+        format_path = self.format_path()
+        if format_path is not None:
+            # Không bắt buộc, nhưng được ghi sau model.pkl nên cần reload khi nó xuất hiện
+            try:
+                stat = os.stat(format_path)
+                signature.append((format_path, stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                pass
+        return tuple(signature)
+
+    def format_path(self):
+        if self.model_format not in self.FORMAT_FILES:
+            return None
+        return os.path.join(self.config.paths.models_dir, self.FORMAT_FILES[self.model_format])
+
+    def load(self) -> ModelEvaluation:
+        """Load (hoặc reload) artifact và swap evaluator một cách atomic"""
+        with self._lock:
+            return self._load_locked(self._read_signature())
+
+    def _load_locked(self, signature) -> ModelEvaluation:
+        if signature is None:
+            raise FileNotFoundError(
+                f"Model artifacts not found: {self.artifact_paths()}"
+            )
+        evaluator = None
+        if self.model_format in self.FORMAT_LOADERS:
+            evaluator = self.FORMAT_LOADERS[self.model_format](self.artifact_paths())
+        if evaluator is None:
+            evaluator = ModelEvaluation(self.config)
+        # Gán một lần duy nhất -> reader luôn thấy evaluator hoàn chỉnh
+        self._evaluator = evaluator
+        self._signature = signature
+        self._last_check = time.monotonic()
+        self.version += 1
+        logger.info(f"Loaded model artifacts (version {self.version}, {type(evaluator).__name__})")
+        return evaluator
+
+    def refresh(self) -> bool:
+        """Reload artifact nếu file trên disk đã thay đổi. Trả về True nếu đã swap"""
+        with self._lock:
+            self._last_check = time.monotonic()
+            signature = self._read_signature()
+            if signature is None or signature == self._signature:
+                return False
+            try:
+                self._load_locked(signature)
+                return True
+            except Exception as e:
+                if self._evaluator is None:
+                    raise
+                # Giữ model cũ nếu artifact mới chưa ghi xong hoặc bị lỗi
+                logger.error(f"Error reloading model artifacts, keep version {self.version}: {e}")
+                return False
+
+    def start_watcher(self):
+        """Kiểm tra artifact mới mỗi `reload_check_interval` giây trên thread nền"""
+        if self._watcher is None:
+            self._stop.clear()
+            self._watcher = threading.Thread(target=self._watch, name="model-store-watcher", daemon=True)
+            self._watcher.start()
+
+    def stop_watcher(self):
+        if self._watcher is not None:
+            self._stop.set()
+            self._watcher.join()
+            self._watcher = None
+
+    def _watch(self):
+        while not self._stop.wait(self.check_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Error loading model artifacts: {e}")
+
+    def get(self) -> ModelEvaluation:
+        evaluator = self._evaluator
+        if self._watcher is not None:
+            # Không đọc file trên thread gọi, artifact được load bởi watcher
+            if evaluator is None:
+                raise FileNotFoundError(f"Model artifacts are not loaded yet: {self.artifact_paths()}")
+            return evaluator
+        if evaluator is None:
+            return self.load()
+        if time.monotonic() - self._last_check >= self.check_interval:
+            self.refresh()
+            evaluator = self._evaluator or evaluator
+        return evaluator
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_model_store(config: DictConfig) -> ModelStore:
+    """Trả về ModelStore dùng chung cho cả process"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ModelStore(config)
+        return _store
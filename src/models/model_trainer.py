@@ -1,95 +1,230 @@
 import os
 import pickle
+import time
+from typing import Any, Optional
 import hydra
 import joblib
-import mlflow
-import pandas as pd
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
-from omegaconf import DictConfig
-from src.utils import get_logger
+from joblib import Parallel, delayed
+from omegaconf import DictConfig, OmegaConf
+from src.utils import get_logger, get_tracker
+from src.data.storage import get_storage
+from .compiled_scorer import COMPILED_MODEL_FILE, export_compiled_model, load_compiled_model
+from .hyperparameter_search import HyperparameterSearch
+from .model_bundle import BUNDLE_FILE, export_model_bundle, load_model_bundle
+from .metrics import DEFAULT_METRICS, compute_metrics, is_supported
 
 logger = get_logger()
+tracker = get_tracker()
+
+def fit_candidate(model_name, class_path, params, X_train, y_train, X_val, y_val, metrics=DEFAULT_METRICS):
+    """Fit một model ứng viên và tính metric trên tập validation (chạy trong process con)"""
+    start = time.perf_counter()
+    model = hydra.utils.get_class(class_path)(**params)
+    model.fit(X_train, y_train)
+    fit_time = time.perf_counter() - start
+    return model_name, model, compute_metrics(y_val, model.predict(X_val), metrics), fit_time
+
+
 class ModelTrainer:
+    # Tăng khi logic của stage thay đổi để cache của các lần chạy cũ không còn được dùng
+    STAGE_VERSION = 1
+
     def __init__(self, config: DictConfig):
         self.config = config
-        self.model = None
+        self.model: Any = None
+        self.model_name = config.default_model
         self.model_path = config.paths.models_dir
         self.transformed_data_path = config.data.transformed_data_path
         self.scaler = None
-        self.metrics = {
-            'accuracy': accuracy_score,
-            'precision': precision_score,
-            'recall': recall_score,
-            'f1': f1_score
-        }
+        self.label_encoder = None
+        self.storage = get_storage(config)
+        self.metrics = list(config.training.get("metrics", DEFAULT_METRICS))
+    def output_paths(self):
+        return [os.path.join(self.model_path, "model.pkl")]
+    def source_paths(self):
+        """model.pkl, scaler và label encoder mà artifact serving được tạo ra từ đó"""
+        return self.output_paths() + [
+            os.path.join(self.transformed_data_path, 'scaler.joblib'),
+            os.path.join(self.transformed_data_path, 'label_encoder.joblib'),
+        ]
     def load_transformed_data(self):
         """Load dữ liệu đã được transform"""
         try:
             # Đọc training data
-            X_train = pd.read_csv(os.path.join(self.transformed_data_path, 'train_transformed.csv'))
+            X_train = self.storage.read(self.transformed_data_path, 'train_transformed')
             y_train = X_train[self.config.data.label_col]
             X_train = X_train.drop(self.config.data.label_col, axis=1)
 
             # Đọc validation data
-            X_val = pd.read_csv(os.path.join(self.transformed_data_path, 'val_transformed.csv'))
+            X_val = self.storage.read(self.transformed_data_path, 'val_transformed')
             y_val = X_val[self.config.data.label_col]
             X_val = X_val.drop(self.config.data.label_col, axis=1)
 
             # Đọc testing data
-            X_test = pd.read_csv(os.path.join(self.transformed_data_path, 'test_transformed.csv'))
+            X_test = self.storage.read(self.transformed_data_path, 'test_transformed')
             y_test = X_test[self.config.data.label_col]
             X_test = X_test.drop(self.config.data.label_col, axis=1)
             
             # Load scaler
             self.scaler = joblib.load(os.path.join(self.transformed_data_path, 'scaler.joblib'))
-            mlflow.log_params({
-                    "train_samples": len(X_train),
-                    "val_samples": len(X_val),
-                    "test_samples": len(X_test),
-                    "n_features": X_train.shape[1],
-                    "feature_names": list(X_train.columns)
-                })
+            self.label_encoder = joblib.load(os.path.join(self.transformed_data_path, 'label_encoder.joblib'))
+            self._log_data_params(X_train, X_val, X_test)
             logger.info("Đã load dữ liệu Train và Test đã transform thành công")
             return X_train, X_val, X_test, y_train, y_val, y_test
         except Exception as e:
             logger.error(f"Lỗi khi load dữ liệu đã transform: {e}")
-            mlflow.log_param("error_load_data", str(e))
+            tracker.log_param("error_load_data", str(e))
             raise
-    def train(self):
+    def _log_data_params(self, X_train, X_val, X_test):
+        tracker.log_params({
+                "train_samples": len(X_train),
+                "val_samples": len(X_val),
+                "test_samples": len(X_test),
+                "n_features": X_train.shape[1],
+                "feature_names": list(X_train.columns)
+            })
+    def train(self, context=None):
+        """
+        Args:
+            context (StageContext | None): Nếu context có dữ liệu đã transform
+                (chạy cùng process với DataTransformer) thì dùng luôn, không đọc lại từ disk
+        """
         try:
-            X_train, X_val, X_test, y_train, y_val, y_test = self.load_transformed_data()
-            self.model = self._build_model()
-            logger.info(f"Starting model training with model.fit(X_train, y_train)")
-            self.model.fit(X_train, y_train)
-            logger.info(f"Model training with model.fit(X_train, y_train) successfully!")
+            if context is not None and "transformed" in context:
+                X_train, X_val, X_test, y_train, y_val, y_test = context.get("transformed")
+                self.scaler = context.get("scaler")
+                self.label_encoder = context.get("label_encoder")
+                self._log_data_params(X_train, X_val, X_test)
+            else:
+                X_train, X_val, X_test, y_train, y_val, y_test = self.load_transformed_data()
+            candidates = self.candidate_names()
+            if self.config.training.get("search") and self.config.training.search.enabled:
+                self.search_models(candidates, X_train, y_train, X_val, y_val)
+            elif len(candidates) == 1:
+                self.model_name = candidates[0]
+                self.model = self._build_model(self.model_name)
+                logger.info(f"Starting model training with model.fit(X_train, y_train)")
+                self.model.fit(X_train, y_train)
+                logger.info(f"Model training with model.fit(X_train, y_train) successfully!")
+            else:
+                self.select_model(candidates, X_train, y_train, X_val, y_val)
             
-            train_metrics = self.evaluate(X_train, y_train)
+            train_metrics = self.evaluate(X_train, y_train, "train")
             logger.info(f"Training successfully with training metrics: {train_metrics}")
-            val_metrics = self.evaluate(X_val, y_val)
+            val_metrics = self.evaluate(X_val, y_val, "val")
             logger.info(f"Training successfully with validation metrics: {val_metrics}")
-            test_metrics = self.evaluate(X_test, y_test)
+            test_metrics = self.evaluate(X_test, y_test, "test")
             logger.info(f"Training successfully with test metrics: {test_metrics}")
-            mlflow.sklearn.log_model(
+            tracker.log_model(
                     self.model,
                     "model",
-                    registered_model_name=self.config.default_model
+                    registered_model_name=self.model_name
                 )
             return train_metrics, val_metrics, test_metrics
         except Exception as e:
             logger.error(f"Lỗi trong quá trình training: {e}")
-            mlflow.log_param("error_training", str(e))
+            tracker.log_param("error_training", str(e))
             raise
-    def evaluate(self, X, y):
-        y_pred = self.model.predict(X)
-            
-        metrics = {}
-        for metric_name, metric_func in self.metrics.items():
-            if metric_name in ['precision', 'recall', 'f1']:
-                value = metrics[metric_name] = metric_func(y, y_pred, average='macro')
+    def candidate_names(self) -> list:
+        """Tên các model cần train theo `training.candidates`"""
+        model_params = get_model_params(self.config.model)
+        candidates = self.config.training.get("candidates")
+        if candidates is None:
+            names = [self.config.default_model]
+        elif candidates == "all":
+            names = list(model_params)
+        else:
+            names = list(candidates)
+        for model_name in names:
+            if model_name not in model_params:
+                raise ValueError(f"Model name '{model_name}' is not supported.")
+        return names
+
+    def select_model(self, candidates, X_train, y_train, X_val, y_val):
+        """
+        Fit song song các model ứng viên trong process pool và giữ lại model có
+        metric `training.selection_metric` trên tập validation cao nhất.
+
+        Dữ liệu chỉ được load một lần; joblib ghi các mảng lớn ra memmap để các
+        process con dùng chung thay vì mỗi process nhận một bản copy.
+        """
+        selection_metric = self._selection_metric()
+        n_jobs = self.config.training.get("n_jobs", -1)
+        if n_jobs is None or n_jobs < 1:
+            n_jobs = min(len(candidates), os.cpu_count() or 1)
+
+        model_params = get_model_params(self.config.model)
+        logger.info(f"Training {len(candidates)} candidate models with {n_jobs} processes: {candidates}")
+        start = time.perf_counter()
+        results = Parallel(n_jobs=n_jobs, backend="loky", max_nbytes="1M", mmap_mode="r")(
+            delayed(fit_candidate)(
+                model_name,
+                model_params[model_name]["class"],
+                OmegaConf.to_container(model_params[model_name]["params"], resolve=True),
+                X_train, y_train, X_val, y_val, self.metrics,
+            )
+            for model_name in candidates
+        )
+        logger.info(f"Candidate models trained in {time.perf_counter() - start:.2f}s")
+        self._keep_best(results, selection_metric)
+
+    def search_models(self, candidates, X_train, y_train, X_val, y_val):
+        """
+        Tìm hyperparameter cho từng model ứng viên bằng HyperparameterSearch
+        (k-fold CV trên tập train) rồi giữ lại model tốt nhất trên tập validation.
+
+        Các model được search lần lượt vì mỗi lần search đã chạy song song các
+        fold trên `training.search.n_jobs` process.
+        """
+        selection_metric = self._selection_metric()
+        searcher = HyperparameterSearch(self.config.training.search, selection_metric)
+        model_params = get_model_params(self.config.model)
+        results, params = [], {}
+        for model_name in candidates:
+            params[model_name] = OmegaConf.to_container(model_params[model_name]["params"], resolve=True)
+            start = time.perf_counter()
+            if model_params[model_name]["search_space"]:
+                model, best_params, _ = searcher.search(
+                    model_name, model_params[model_name]["class"], params[model_name],
+                    model_params[model_name]["search_space"], X_train, y_train,
+                )
+                params[model_name].update(best_params)
             else:
-                value = metrics[metric_name] = metric_func(y, y_pred)
-            metrics[metric_name] = value
-            mlflow.log_metric(metric_name, value)
+                logger.info(f"Model {model_name} has no search_space, training it with its params")
+                model = hydra.utils.get_class(model_params[model_name]["class"])(**params[model_name])
+                model.fit(X_train, y_train)
+            fit_time = time.perf_counter() - start
+            results.append((model_name, model, compute_metrics(y_val, model.predict(X_val), self.metrics), fit_time))
+        self._keep_best(results, selection_metric, params)
+
+    def _selection_metric(self) -> str:
+        selection_metric = self.config.training.get("selection_metric", "f1")
+        if not is_supported(selection_metric) or selection_metric.endswith("_per_class"):
+            raise ValueError(f"Selection metric '{selection_metric}' is not supported.")
+        if selection_metric not in self.metrics:
+            self.metrics.append(selection_metric)
+        return selection_metric
+
+    def _keep_best(self, results, selection_metric, params=None):
+        """Log metric của các model ứng viên và giữ lại model tốt nhất trên tập validation"""
+        for model_name, _, val_metrics, fit_time in results:
+            logger.info(f"Candidate {model_name}: fit_time={fit_time:.2f}s, validation metrics: {val_metrics}")
+            tracker.log_metrics({
+                **{f"candidate.{model_name}.val_{name}": value for name, value in val_metrics.items()},
+                f"candidate.{model_name}.fit_time": fit_time,
+            })
+        self.model_name, self.model, _, _ = max(results, key=lambda result: result[2][selection_metric])
+        logger.info(f"Selected model {self.model_name} by validation {selection_metric}")
+        tracker.log_params({
+            "candidates": [result[0] for result in results], "selection_metric": selection_metric
+        })
+        self._log_model_params(self.model_name, params[self.model_name] if params else None)
+
+    def evaluate(self, X, y, split: str):
+        """Tính metric trên một tập dữ liệu, log lên MLflow với tiền tố là tên tập (train/val/test)"""
+        y_pred = self.model.predict(X)
+        metrics = compute_metrics(y, y_pred, self.metrics)
+        tracker.log_metrics({f"{split}_{name}": value for name, value in metrics.items()})
         return metrics
     def save_model(self):
         """
@@ -108,17 +243,69 @@ class ModelTrainer:
             # Tạo thư mục nếu chưa tồn tại
             os.makedirs(self.model_path, exist_ok=True)
 
-            with open(model_file_path, "wb") as f:
+            # Ghi ra file tạm rồi replace để process đang serve không đọc phải file dở dang
+            tmp_file_path = f"{model_file_path}.tmp"
+            with open(tmp_file_path, "wb") as f:
                 pickle.dump(self.model, f)
+            os.replace(tmp_file_path, model_file_path)
             logger.info(f"Model saved successfully at {model_file_path}")
-            mlflow.log_param("model_save_path", model_file_path)
-            mlflow.log_artifact(model_file_path, "models")
+            tracker.log_param("model_save_path", model_file_path)
+            tracker.log_artifact(model_file_path, "models")
             return model_file_path
         except Exception as e:
             logger.error(f"Error saving model: {e}")
-            mlflow.log_param("error_save_model", str(e))
+            tracker.log_param("error_save_model", str(e))
             raise
-    def _build_model(self):
+    def _serving_artifacts(self):
+        """(model, scaler, label encoder) để export, đọc từ disk những gì chưa có trong bộ nhớ"""
+        model = self.model
+        if model is None:
+            with open(self.output_paths()[0], "rb") as f:
+                model = pickle.load(f)
+        scaler = self.scaler or joblib.load(os.path.join(self.transformed_data_path, 'scaler.joblib'))
+        label_encoder = self.label_encoder or joblib.load(
+            os.path.join(self.transformed_data_path, 'label_encoder.joblib')
+        )
+        return model, scaler, label_encoder
+    def export_compiled(self):
+        """
+        Compile model đã lưu cùng scaler và label encoder thành scorer chỉ dùng
+        NumPy (models/model_compiled.npz) để serving không cần unpickle sklearn.
+
+        Khi stage training được lấy từ cache (self.model là None) thì chỉ
+        compile lại nếu bản compile hiện có không khớp với model.pkl, scaler
+        và label encoder.
+
+        Returns:
+            str | None: Đường dẫn file đã compile, None nếu model không compile được
+        """
+        if not self.config.training.get("export_compiled", True):
+            return None
+        if self.model is None and load_compiled_model(self.source_paths()) is not None:
+            return os.path.join(self.model_path, COMPILED_MODEL_FILE)
+        compiled_path = export_compiled_model(self.source_paths(), *self._serving_artifacts())
+        if compiled_path is not None:
+            tracker.log_artifact(compiled_path, "models")
+        return compiled_path
+    def export_bundle(self):
+        """
+        Đóng gói model, scaler, label encoder, tên feature và schema vào một
+        file (models/model.bundle) mà các worker serving load được bằng mmap.
+
+        Returns:
+            str | None: Đường dẫn bundle, None nếu `training.export_bundle` tắt
+        """
+        if not self.config.training.get("export_bundle", True):
+            return None
+        if self.model is None and load_model_bundle(self.source_paths()) is not None:
+            return os.path.join(self.model_path, BUNDLE_FILE)
+        bundle_path = export_model_bundle(
+            self.source_paths(), *self._serving_artifacts(),
+            model_name=self.model_name, label_col=self.config.data.label_col,
+        )
+        tracker.log_artifact(bundle_path, "models")
+        return bundle_path
+    def _build_model(self, model_name: Optional[str] = None):
         """
         Build the model based on the configuration.
 
@@ -126,26 +313,30 @@ class ModelTrainer:
         sklearn.base.BaseEstimator: The model instance
         """
         model_params = get_model_params(self.config.model)
-        model_name = self.config.default_model
+        model_name = model_name or self.config.default_model
         if model_name not in model_params:
             raise ValueError(f"Model name '{model_name}' is not supported.")
 
         model_class = hydra.utils.get_class(model_params[model_name]["class"])
         model_args = model_params[model_name]["params"]
-        mlflow.log_params({
+        self._log_model_params(model_name)
+
+        return model_class(**model_args)
+    def _log_model_params(self, model_name: str, params: Optional[dict] = None):
+        model_params = get_model_params(self.config.model)
+        tracker.log_params({
                     "model_name": model_name,
                     "model_class": model_params[model_name]["class"],
-                    **model_args  # Log individual model parameters
+                    **(params or model_params[model_name]["params"])  # Log individual model parameters
                 })
 
-        return model_class(**model_args)
-
 def get_model_params(config: DictConfig) -> dict:
     model_params = {}
     for model_name, model_info in config.items():
         if isinstance(model_info, DictConfig):
             model_params[model_name] = {
                 "class": model_info.model,
-                "params": model_info.params
+                "params": model_info.params,
+                "search_space": model_info.get("search_space")
             }
     return model_params
\ No newline at end of file
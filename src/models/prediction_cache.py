@@ -0,0 +1,160 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from omegaconf import DictConfig
+
+
+class PredictionCache:
+    """
+    Cache LRU (có TTL tuỳ chọn) cho kết quả predict của từng dòng feature.
+
+    Key là hash (blake2b) của dòng đã được chuẩn hoá (float64, làm tròn tới
+    `decimals` chữ số nếu có, -0.0 thành 0.0) cùng với version của model. Cache
+    chỉ giữ entry của một version: khi được gọi với version mới (ModelStore đã
+    reload artifact) mọi entry cũ bị xoá.
+
+    Với một batch, chỉ các dòng chưa có trong cache (mỗi dòng trùng nhau chỉ
+    một lần) được đưa vào `predict_fn`, kết quả được ghép lại đúng thứ tự.
+    """
+
+    def __init__(self, max_entries: int = 100000, ttl_seconds: Optional[float] = None, decimals: Optional[int] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.decimals = decimals
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        # key -> (hết hạn lúc, {tên output: giá trị của dòng})
+        self._entries: "OrderedDict[bytes, Tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, cache_config: DictConfig):
+        """PredictionCache theo `serving.cache`, None nếu cache bị tắt"""
+        if not cache_config or not cache_config.get("enabled", False):
+            return None
+        return cls(
+            max_entries=cache_config.get("max_entries", 100000),
+            ttl_seconds=cache_config.get("ttl_seconds"),
+            decimals=cache_config.get("decimals"),
+        )
+
+    def canonicalize(self, rows) -> np.ndarray:
+        X = np.asarray(rows, dtype=np.float64)
+        if self.decimals is not None:
+            X = np.round(X, self.decimals)
+        # -0.0 + 0.0 = 0.0: hai dòng bằng nhau luôn có cùng bytes
+        return np.ascontiguousarray(X + 0.0)
+
+    @staticmethod
+    def _key(row: np.ndarray) -> bytes:
+        return hashlib.blake2b(row.tobytes(), digest_size=16).digest()
+
+    def lookup(self, X: np.ndarray, version) -> tuple:
+        """
+        Tra cache cho các dòng đã chuẩn hoá.
+
+        Returns:
+            tuple: (keys, giá trị đã cache của từng dòng hoặc None,
+                    {key: index dòng đầu tiên} của các dòng cần predict)
+        """
+        keys = [self._key(row) for row in X]
+        cached: List[Optional[dict]] = [None] * len(keys)
+        missing: Dict[bytes, int] = {}
+        now = time.monotonic()
+        with self._lock:
+            if version != self.version:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self.version = version
+            for i, key in enumerate(keys):
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] < now:
+                    del self._entries[key]
+                    self.expirations += 1
+                    entry = None
+                if entry is None:
+                    self.misses += 1
+                    missing.setdefault(key, i)
+                else:
+                    self.hits += 1
+                    self._entries.move_to_end(key)
+                    cached[i] = entry[1]
+        return keys, cached, missing
+
+    def store(self, keys: list, result: dict, version):
+        """Lưu kết quả predict của các dòng `keys` (cùng thứ tự với các mảng trong `result`)"""
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else float("inf")
+        with self._lock:
+            # Model đã đổi trong lúc predict: kết quả không còn đúng với cache hiện tại
+            if version != self.version:
+                return
+            for i, key in enumerate(keys):
+                self._entries[key] = (expires_at, {name: values[i] for name, values in result.items()})
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    @staticmethod
+    def merge(keys: list, cached: list, missing: dict, result: Optional[dict]) -> dict:
+        """
+        Ghép giá trị đã cache và kết quả predict của các dòng thiếu theo thứ tự dòng,
+        `result` là None khi mọi dòng đều có trong cache
+        """
+        if not result:
+            return {name: np.asarray([value[name] for value in cached]) for name in cached[0]}
+        position = {key: i for i, key in enumerate(missing)}
+        merged = {}
+        for name in result:
+            merged[name] = np.asarray([
+                value[name] if value is not None else result[name][position[key]]
+                for key, value in zip(keys, cached)
+            ])
+        return merged
+
+    def predict(self, rows, version, predict_fn) -> dict:
+        """Predict qua cache, `predict_fn` chỉ nhận các dòng chưa có trong cache"""
+        X = self.canonicalize(rows)
+        keys, cached, missing = self.lookup(X, version)
+        result = None
+        if missing:
+            result = predict_fn(X[list(missing.values())])
+            self.store(list(missing), result, version)
+        return self.merge(keys, cached, missing, result)
+
+    async def predict_async(self, rows, version, predict_fn) -> dict:
+        """Như `predict` nhưng `predict_fn` là coroutine (vd. MicroBatcher.predict)"""
+        X = self.canonicalize(rows)
+        keys, cached, missing = self.lookup(X, version)
+        result = None
+        if missing:
+            result = await predict_fn(X[list(missing.values())])
+            self.store(list(missing), result, version)
+        return self.merge(keys, cached, missing, result)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "model_version": self.version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
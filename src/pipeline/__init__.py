@@ -1,6 +1,25 @@
-from .data_pipeline import data_preprocessing_pipeline
-from .training_pipeline import train_pipeline
-from .prediction_pipeline import predict_pipeline
-__all__ = [
-    "data_preprocessing_pipeline","train_pipeline","predict_pipeline"
-]
+import importlib
+
+# Import module con khi tên được dùng tới (xem src/models/__init__.py)
+_EXPORTS = {
+    "data_preprocessing_pipeline": ".data_pipeline",
+    "train_pipeline": ".training_pipeline",
+    "full_pipeline": ".end_to_end_pipeline",
+    "predict_pipeline": ".prediction_pipeline",
+    "predict_rows": ".prediction_pipeline",
+    "get_feature_names": ".prediction_pipeline",
+    "batch_predict_pipeline": ".batch_prediction_pipeline",
+    "MicroBatcher": ".micro_batcher",
+    "JobRunner": ".job_runner",
+    "Job": ".job_runner",
+    "StageContext": ".stage_context",
+}
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,204 @@
+import argparse
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Deque, Optional
+import numpy as np
+import pandas as pd
+from omegaconf import DictConfig, OmegaConf
+from src.utils import get_logger, configure_logging, ConfigProvider
+from src.models import ModelEvaluation
+from src.data import DataStorage, get_dvc_manager
+from .prediction_pipeline import get_feature_names
+
+logger = get_logger()
+
+# Evaluator của worker, load một lần khi process được tạo
+_evaluator: Optional[ModelEvaluation] = None
+
+
+def _init_worker(config: DictConfig, logging_config: dict):
+    global _evaluator
+    configure_logging(
+        log_format=logging_config.get("format"),
+        sampling=logging_config.get("sampling"),
+        rate_limits=logging_config.get("rate_limits"),
+        level=logging_config.get("level"),
+    )
+    _evaluator = ModelEvaluation(config)
+
+
+def _worker_evaluator() -> ModelEvaluation:
+    if _evaluator is None:
+        raise RuntimeError("Worker was not initialized with _init_worker.")
+    return _evaluator
+
+
+def _score_chunk(chunk: pd.DataFrame, id_col: Optional[str] = None, with_proba: bool = False) -> pd.DataFrame:
+    """Dự đoán một chunk trong worker, trả về DataFrame kết quả cùng thứ tự dòng"""
+    evaluator = _worker_evaluator()
+    if chunk.empty:
+        y_pred = _empty_prediction(evaluator, with_proba)
+    else:
+        y_pred = evaluator.predict(chunk[get_feature_names(evaluator)], with_proba=with_proba)
+    result = pd.DataFrame({
+        "label_code": y_pred["label_code"],
+        "label_text": y_pred["label_text"],
+    })
+    if id_col is not None and id_col in chunk:
+        result.insert(0, id_col, chunk[id_col].to_numpy())
+    if with_proba:
+        for label, column in zip(y_pred["proba_labels"], y_pred["proba"].T):
+            result[f"proba_{label}"] = column
+    return result
+
+
+def _empty_prediction(evaluator: ModelEvaluation, with_proba: bool) -> dict:
+    # sklearn không predict được 0 dòng, nhưng output vẫn phải có đủ cột như khi có dữ liệu
+    classes = evaluator.model.classes_
+    y_pred = {
+        "label_code": np.empty(0, dtype=classes.dtype),
+        "label_text": np.empty(0, dtype=evaluator.label_encoder.classes_.dtype),
+    }
+    if with_proba:
+        if not hasattr(evaluator.model, "predict_proba"):
+            raise ValueError(f"Model {type(evaluator.model).__name__} does not support predict_proba.")
+        y_pred["proba"] = np.empty((0, len(classes)))
+        y_pred["proba_labels"] = evaluator.label_encoder.inverse_transform(classes)
+    return y_pred
+
+
+def batch_predict_pipeline(
+    config: DictConfig,
+    input_path: str,
+    output_path: str,
+    chunk_size: Optional[int] = None,
+    n_workers: Optional[int] = None,
+    with_proba: Optional[bool] = None,
+) -> dict:
+    """
+    Dự đoán một file CSV/Parquet/Feather lớn và ghi kết quả ra file (định dạng
+    theo đuôi của `output_path`).
+
+    File input được đọc theo từng chunk, các chunk được dự đoán song song trên
+    một process pool (mỗi worker load model một lần) và được ghi ra theo đúng
+    thứ tự input. Số chunk đang chờ/đang xử lý không vượt quá `max_pending`
+    nên bộ nhớ không phụ thuộc kích thước file.
+
+    Returns:
+        dict: Số dòng, số chunk, thời gian và throughput (dòng/giây)
+    """
+    settings = config.batch_prediction
+    chunk_size = chunk_size or settings.chunk_size
+    n_workers = n_workers or settings.n_workers or os.cpu_count() or 1
+    max_pending = settings.max_pending or 2 * n_workers
+    with_proba = settings.probabilities if with_proba is None else with_proba
+    id_col = config.data.get("id_col")
+    # File tạm giữ đuôi file để suy ra định dạng, chỉ đổi tên khi đã ghi xong
+    root, extension = os.path.splitext(output_path)
+    tmp_output_path = f"{root}.tmp{extension}"
+    writer = DataStorage.open_file_writer(tmp_output_path)
+
+    # Chỉ pull model và scaler/label encoder khi bản local đã cũ
+    get_dvc_manager().sync(
+        [os.path.join(config.paths.models_dir, "model.pkl"), config.data.transformed_data_path],
+        jobs=config.dvc.jobs, remote=config.dvc.remote,
+    )
+    logger.info(
+        f"Starting batch prediction of {input_path} with {n_workers} workers, "
+        f"chunks of {chunk_size} rows"
+    )
+    logging_config = OmegaConf.to_container(config.logging, resolve=True) if "logging" in config else {}
+    if not isinstance(logging_config, dict):
+        logging_config = {}
+    start = last_report = time.perf_counter()
+    rows = chunks = 0
+    pending: Deque[Future] = deque()
+    try:
+        with ProcessPoolExecutor(
+            max_workers=n_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(config, logging_config),
+        ) as executor, writer:
+
+            def write_next():
+                nonlocal rows, chunks, last_report
+                result = pending.popleft().result()
+                writer.write(result)
+                rows += len(result)
+                chunks += 1
+                now = time.perf_counter()
+                if now - last_report >= settings.progress_interval:
+                    last_report = now
+                    logger.info(
+                        f"Batch prediction progress: {rows} rows in {now - start:.1f}s "
+                        f"({rows / (now - start):.0f} rows/s)",
+                        extra={"event": "batch_predict", "rows": rows, "chunks": chunks},
+                    )
+
+            try:
+                for chunk in DataStorage.iter_file_chunks(input_path, chunk_size):
+                    # Chờ chunk cũ nhất xong trước khi đọc thêm: giới hạn bộ nhớ và giữ thứ tự output
+                    while len(pending) >= max_pending:
+                        write_next()
+                    pending.append(executor.submit(_score_chunk, chunk, id_col, with_proba))
+                if not pending:
+                    # File không có dòng nào: vẫn ghi file kết quả rỗng với đủ cột
+                    empty = DataStorage.read_file_columns(input_path)
+                    pending.append(executor.submit(_score_chunk, empty, id_col, with_proba))
+                while pending:
+                    write_next()
+            except BaseException:
+                for future in pending:
+                    future.cancel()
+                raise
+    except BaseException:
+        # Không để lại file kết quả dở dang
+        if os.path.exists(tmp_output_path):
+            os.remove(tmp_output_path)
+        raise
+    os.replace(tmp_output_path, output_path)
+
+    duration = time.perf_counter() - start
+    summary = {
+        "output_path": output_path,
+        "rows": rows,
+        "chunks": chunks,
+        "duration_s": duration,
+        "rows_per_s": rows / duration if duration > 0 else 0.0,
+    }
+    logger.info(
+        f"Batch prediction finished: {rows} rows in {duration:.1f}s "
+        f"({summary['rows_per_s']:.0f} rows/s) -> {output_path}",
+        extra={"event": "batch_predict", **summary},
+    )
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dự đoán offline một file CSV/Parquet/Feather lớn")
+    parser.add_argument("input_path")
+    parser.add_argument("output_path", help="File kết quả, định dạng theo đuôi file (.csv, .parquet, .feather)")
+    parser.add_argument("--chunk-size", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--proba", action="store_true", default=None, help="Ghi thêm xác suất của từng class")
+    args = parser.parse_args()
+
+    config = ConfigProvider(config_dir="configs").get()
+    configure_logging(
+        log_format=config.logging.format,
+        sampling=config.logging.sampling,
+        rate_limits=config.logging.rate_limits,
+        level=config.logging.get("level"),
+    )
+    batch_predict_pipeline(
+        config, args.input_path, args.output_path,
+        chunk_size=args.chunk_size, n_workers=args.workers, with_proba=args.proba,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,19 @@
 import os
-from src.data import DVCRemoteManager, DataIngestion, DataTransformer
-import mlflow
-from hydra import compose, initialize
-from src.utils import get_logger
+import time
+from src.data import get_dvc_manager, DataIngestion, DataTransformer, VersioningQueue
+from src.utils import get_logger, get_tracker, ConfigProvider
 from omegaconf import DictConfig
+from .stage_context import StageContext
+from .stage_cache import StageCache
 
 logger = get_logger()
-manager = DVCRemoteManager()
+tracker = get_tracker()
 
 
 def data_version_update_pipeline(config: DictConfig):
     try:
         logger.info("Starting push new data file to s3 remote by DVC")
+        manager = get_dvc_manager()
         # manager.set_aws_credentials(
         #     aws_access_key='your-access-key',
         #     aws_secret_key='your-secret-key'
@@ -23,38 +25,87 @@ def data_version_update_pipeline(config: DictConfig):
         logger.error(f"Có lỗi xảy ra: {e}")
 
 
-def data_preprocessing_pipeline(config: DictConfig):
-    with mlflow.start_run(run_name="data_preprocessing_pipeline"):
+def run_data_stages(config: DictConfig, context: StageContext, cache: StageCache):
+    """
+    Chạy ingestion và transformation, bỏ qua stage có output đã nằm trong cache.
+    Trả về fingerprint của dữ liệu transformed.
+    """
+    start = time.perf_counter()
+    ingestion = DataIngestion(config)
+    ingestion_fingerprint = cache.fingerprint(
+        "ingestion", DataIngestion.STAGE_VERSION, cache.raw_data_hash(config), config.data
+    )
+    if not cache.restore(
+        "ingestion", ingestion_fingerprint, ingestion.output_paths(), ingestion.processed_data_path
+    ):
+        logger.info("Starting ingestion data")
+        ingestion.run_ingestion(context)
+        tracker.flush(wait=False)
+    logger.info("Stage ingestion finished", extra={
+        "stage": "ingestion", "run_id": tracker.run_id, "cache": cache.results["ingestion"],
+        "duration_ms": (time.perf_counter() - start) * 1000,
+    })
+
+    start = time.perf_counter()
+    transformer = DataTransformer(config)
+    transformation_fingerprint = cache.fingerprint(
+        "transformation", DataTransformer.STAGE_VERSION, ingestion_fingerprint, config.data
+    )
+    if not cache.restore(
+        "transformation", transformation_fingerprint, transformer.output_paths(), transformer.transformed_data_path
+    ):
+        # Dùng luôn các tập đã chia trong bộ nhớ nếu ingestion vừa chạy
+        logger.info("Starting transformer data")
+        transformer.run_transformation(context)
+        tracker.flush(wait=False)
+    logger.info("Stage transformation finished", extra={
+        "stage": "transformation", "run_id": tracker.run_id, "cache": cache.results["transformation"],
+        "duration_ms": (time.perf_counter() - start) * 1000,
+    })
+    return transformation_fingerprint
+
+
+def data_preprocessing_pipeline(config: DictConfig, defer_versioning: bool = False):
+    """
+    Args:
+        defer_versioning (bool): Trả về VersioningQueue (đã `dvc add`) để caller tự push
+            (vd. JobRunner); mặc định push chạy nền và trả về Future
+    """
+    with tracker.start_run(run_name="data_preprocessing_pipeline", config=config), StageContext() as context:
         try:
-            # Bước 1: Kéo dữ liệu từ S3
-            manager.pull_from_s3()
-            manager.check_remote_status()
-            logger.info("Pulled data from S3 successfully")
-
-            # Bước 2: Data ingestion
-
-            logger.info("Starting ingestion data")
-            ingestion = DataIngestion(config)
-            ingestion.run_ingestion()
-            # Track processed data với DVC
-            manager.add_file("data/processed")
-            manager.push_to_s3()
-
-            # Bước 4: Data transformation
-            logger.info("Starting transformer data")
-            transformer = DataTransformer(config)
-            transformer.run_transformation()
-            # Push transformed data lên S3
-            manager.add_file("data/transformed")
-            manager.push_to_s3()
+            # Bước 1: Kéo dữ liệu raw từ S3 nếu bản local chưa mới nhất
+            get_dvc_manager().sync(
+                [os.path.join(config.data.raw_data_path, config.data.data_file)],
+                jobs=config.dvc.jobs, remote=config.dvc.remote,
+            )
+            logger.info("Synced raw data from S3 successfully")
+
+            # Bước 2, 3: Data ingestion và transformation
+            cache = StageCache(config)
+            run_data_stages(config, context, cache)
+            tracker.set_tags(cache.tags())
+
+            # Bước 4: Chờ lưu file xong rồi track processed/transformed data với DVC
+            context.wait()
+            cache.commit()
+            versioning = VersioningQueue(jobs=config.dvc.jobs, remote=config.dvc.remote)
+            if cache.missed("ingestion"):
+                versioning.register(config.data.processed_data_path)
+            if cache.missed("transformation"):
+                versioning.register(config.data.transformed_data_path)
 
+            versioning.add()
             logger.info("Data preprocessing pipeline completed successfully")
+            return versioning if defer_versioning else versioning.flush(background=True)
         except Exception as e:
             logger.error(f"Error in data preprocessing pipeline: {e}")
-            mlflow.log_param("error", str(e))
+            tracker.log_param("error", str(e))
             raise
 
 
 if __name__ == "__main__":
     # data_version_update()
-    data_preprocessing_pipeline()
+    versioned = data_preprocessing_pipeline(ConfigProvider(config_dir="configs").get())
+    # Chờ dvc push chạy nền xong, lỗi push làm process thoát với mã lỗi
+    if versioned is not None:
+        versioned.result()
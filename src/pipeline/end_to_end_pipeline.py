@@ -0,0 +1,63 @@
+import os
+from omegaconf import DictConfig
+from src.utils import get_logger, get_tracker, ConfigProvider
+from src.data import get_dvc_manager, VersioningQueue
+from .stage_context import StageContext
+from .stage_cache import StageCache
+from .data_pipeline import run_data_stages
+from .training_pipeline import run_training_stage
+
+logger = get_logger()
+tracker = get_tracker()
+
+
+def full_pipeline(config: DictConfig, defer_versioning: bool = False):
+    """
+    Chạy data -> transform -> train trong một process. Dữ liệu được chuyển
+    giữa các stage trong bộ nhớ, việc ghi file chỉ chạy nền.
+
+    Args:
+        defer_versioning (bool): Trả về VersioningQueue (đã `dvc add`) để caller tự push
+            (vd. JobRunner); mặc định push chạy nền và trả về Future
+    """
+    with tracker.start_run(run_name="full_pipeline", config=config), StageContext() as context:
+        try:
+            get_dvc_manager().sync(
+                [os.path.join(config.data.raw_data_path, config.data.data_file)],
+                jobs=config.dvc.jobs, remote=config.dvc.remote,
+            )
+            logger.info("Starting full pipeline")
+
+            cache = StageCache(config)
+            transformation_fingerprint = run_data_stages(config, context, cache)
+            model_file_path = run_training_stage(
+                config, cache, context, transformation_fingerprint
+            )
+            tracker.set_tags(cache.tags())
+
+            # Chờ lưu file xong rồi mới lưu cache và track bằng DVC
+            context.wait()
+            cache.commit()
+
+            # Chỉ track những output vừa được tạo mới, một lần add và push cho cả run
+            versioning = VersioningQueue(jobs=config.dvc.jobs, remote=config.dvc.remote)
+            if cache.missed("ingestion"):
+                versioning.register(config.data.processed_data_path)
+            if cache.missed("transformation"):
+                versioning.register(config.data.transformed_data_path)
+            if cache.missed("training"):
+                versioning.register(model_file_path)
+            versioning.add()
+            logger.info("Full pipeline completed successfully")
+            return versioning if defer_versioning else versioning.flush(background=True)
+        except Exception as e:
+            logger.error(f"Error in full pipeline: {e}")
+            tracker.log_param("full_pipeline_error", str(e))
+            raise
+
+
+if __name__ == "__main__":
+    versioned = full_pipeline(ConfigProvider(config_dir="configs").get())
+    # Chờ dvc push chạy nền xong, lỗi push làm process thoát với mã lỗi
+    if versioned is not None:
+        versioned.result()
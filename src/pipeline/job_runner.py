@@ -0,0 +1,222 @@
+import multiprocessing
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import CancelledError, Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from omegaconf import DictConfig, OmegaConf
+from src.data import VersioningQueue
+from src.utils import get_logger, configure_logging
+
+logger = get_logger()
+
+
+def to_jsonable(value):
+    """Chuyển kết quả pipeline (dict, list, numpy array...) về kiểu JSON được"""
+    if isinstance(value, dict):
+        return {str(key): to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(item) for item in value]
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+class Job:
+    def __init__(self, job_type: str):
+        self.id = uuid.uuid4().hex
+        self.type = job_type
+        self.status = "queued"
+        self.result: Any = None
+        self.error: Optional[str] = None
+        # Trạng thái dvc push chạy sau khi pipeline tính toán xong
+        self.versioning: Optional[str] = None
+        self.versioning_error: Optional[str] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "type": self.type,
+            "status": self.status,
+            "result": to_jsonable(self.result),
+            "error": self.error,
+            "versioning": self.versioning,
+            "versioning_error": self.versioning_error,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobRunner:
+    """
+    Chạy các pipeline trong pool riêng để không chặn event loop của FastAPI.
+
+    Mỗi loại job có giới hạn số job chạy đồng thời (`max_concurrency`), job
+    vượt giới hạn sẽ nằm trong hàng đợi của loại đó cho tới khi có chỗ trống.
+    Các loại job ghi cùng output được khai báo chung một `group` (mục
+    `jobs.groups`): giới hạn và hàng đợi khi đó được tính chung cho cả nhóm.
+    Job dùng MLflow nên chạy trong process pool: run đang active của MLflow
+    là trạng thái toàn cục của process, hai run trong cùng process sẽ đè nhau.
+    """
+
+    def __init__(self, config: DictConfig):
+        self.max_workers = config.jobs.max_workers
+        self.max_history = config.jobs.max_history
+        self.pipelines = config.jobs.pipelines
+        groups = config.jobs.get("groups") or {}
+        # Loại job không khai báo group là một nhóm riêng của chính nó
+        self.groups = {job_type: pipeline.get("group") or job_type for job_type, pipeline in self.pipelines.items()}
+        self.limits: Dict[str, int] = {}
+        for job_type, group in self.groups.items():
+            if group in groups:
+                self.limits[group] = groups[group].max_concurrency
+            elif group == job_type:
+                self.limits[group] = self.pipelines[job_type].max_concurrency
+            else:
+                raise ValueError(f"Job type '{job_type}' uses unknown group '{group}'.")
+        logging_config = OmegaConf.to_container(config.logging, resolve=True) if "logging" in config else {}
+        self.logging: dict = logging_config if isinstance(logging_config, dict) else {}
+        self._executors: Dict[str, Executor] = {}
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._pending: Dict[str, Deque[Tuple[Job, Any, tuple, dict]]] = {group: deque() for group in self.limits}
+        self._running = {group: 0 for group in self.limits}
+        self._lock = threading.Lock()
+
+    def _get_executor(self, kind: str):
+        if kind not in self._executors:
+            if kind == "process":
+                self._executors[kind] = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    # Process mới cần áp dụng lại định dạng log và sampling
+                    initializer=configure_logging,
+                    initargs=(
+                        "python_app", self.logging.get("format"),
+                        self.logging.get("sampling"), self.logging.get("rate_limits"),
+                        self.logging.get("level"),
+                    ),
+                )
+            elif kind == "thread":
+                self._executors[kind] = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="pipeline-job"
+                )
+            else:
+                raise ValueError(f"Executor '{kind}' is not supported.")
+        return self._executors[kind]
+
+    def submit(self, job_type: str, fn, *args, **kwargs) -> Job:
+        """Đưa pipeline vào hàng đợi và trả về Job ngay lập tức"""
+        if job_type not in self.pipelines:
+            raise ValueError(f"Job type '{job_type}' is not supported.")
+        job = Job(job_type)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._evict_history()
+            self._pending[self.groups[job_type]].append((job, fn, args, kwargs))
+            started = self._dispatch(self.groups[job_type])
+        self._watch(started)
+        logger.info(f"Submitted {job_type} job {job.id}")
+        return job
+
+    def get(self, job_id: str):
+        return self._jobs.get(job_id)
+
+    def list_jobs(self) -> List[Job]:
+        return list(self._jobs.values())
+
+    def _dispatch(self, group: str) -> list:
+        # Gọi khi đang giữ self._lock, trả về các (job, future) vừa được submit để
+        # gắn callback bằng `_watch()` sau khi nhả lock
+        started = []
+        while self._pending[group] and self._running[group] < self.limits[group]:
+            job, fn, args, kwargs = self._pending[group].popleft()
+            self._running[group] += 1
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                future = self._get_executor(self.pipelines[job.type].executor).submit(fn, *args, **kwargs)
+            except Exception as e:
+                self._running[group] -= 1
+                self._finish(job, error=e)
+                continue
+            started.append((job, future))
+        return started
+
+    def _watch(self, started: list):
+        # Future đã xong thì add_done_callback gọi _on_done ngay trên thread này,
+        # _on_done lại lấy self._lock nên không được gọi khi đang giữ lock
+        for job, future in started:
+            future.add_done_callback(lambda f, job=job: self._on_done(job, f))
+
+    @staticmethod
+    def _error(future):
+        # future.exception() raise CancelledError với job bị huỷ khi shutdown
+        if future.cancelled():
+            return CancelledError("Job was cancelled")
+        return future.exception()
+
+    def _on_done(self, job: Job, future):
+        error = self._error(future)
+        result = None if error else future.result()
+        if isinstance(result, VersioningQueue):
+            result = self._start_versioning(job, result)
+        with self._lock:
+            self._running[self.groups[job.type]] -= 1
+            self._finish(job, result=result, error=error)
+            started = self._dispatch(self.groups[job.type])
+        self._watch(started)
+
+    def _start_versioning(self, job: Job, versioning: VersioningQueue) -> dict:
+        """Push output của job ở nền, slot của loại job được trả lại ngay"""
+        paths = list(versioning.paths)
+        if not paths:
+            job.versioning = "skipped"
+            return {"versioned_paths": paths}
+        job.versioning = "running"
+        future = versioning.flush(background=True)
+        future.add_done_callback(lambda f, job=job: self._on_versioned(job, f))
+        return {"versioned_paths": paths}
+
+    def _on_versioned(self, job: Job, future):
+        error = self._error(future)
+        if error is not None:
+            job.versioning = "failed"
+            job.versioning_error = str(error)
+            logger.error(f"Versioning of {job.type} job {job.id} failed: {error}")
+        else:
+            job.versioning = "succeeded"
+            logger.info(f"Versioning of {job.type} job {job.id} succeeded")
+
+    def _finish(self, job: Job, result=None, error=None):
+        job.finished_at = time.time()
+        if error is not None:
+            job.status = "failed"
+            job.error = str(error)
+            logger.error(f"{job.type} job {job.id} failed: {error}")
+        else:
+            job.status = "succeeded"
+            job.result = result
+            logger.info(f"{job.type} job {job.id} succeeded")
+
+    def _evict_history(self):
+        # Chỉ xoá job đã xong, job đang chạy/đang chờ luôn được giữ lại
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.max_history:
+                break
+            if self._jobs[job_id].done:
+                del self._jobs[job_id]
+
+    def shutdown(self, wait: bool = True):
+        for executor in self._executors.values():
+            executor.shutdown(wait=wait, cancel_futures=True)
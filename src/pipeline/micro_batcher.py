@@ -0,0 +1,100 @@
+import asyncio
+import time
+from typing import Optional
+import numpy as np
+from src.utils import get_logger
+
+logger = get_logger()
+
+
+class MicroBatcher:
+    """
+    Gom các request predict đồng thời thành một batch để gọi
+    `scaler.transform` + `model.predict` một lần duy nhất.
+
+    Một batch được đóng khi đủ `max_batch_size` dòng hoặc khi request đầu tiên
+    đã chờ quá `max_wait_ms`. `predict_fn` nhận một mảng 2D và trả về dict các
+    mảng có cùng số dòng (vd. `label_code`, `label_text`).
+    """
+
+    def __init__(self, predict_fn, max_batch_size: int = 64, max_wait_ms: float = 5.0):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def predict(self, rows) -> dict:
+        """Đưa `rows` vào hàng đợi và chờ kết quả của riêng các dòng này"""
+        if self._worker is None:
+            await self.start()
+        queue = self._queue
+        assert queue is not None
+        X = np.asarray(rows, dtype=float)
+        if X.ndim != 2:
+            raise ValueError(f"Expected a 2D array of rows, got shape {X.shape}.")
+        future = asyncio.get_running_loop().create_future()
+        await queue.put((X, future))
+        return await future
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        n_rows = len(batch[0][0])
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while n_rows < self.max_batch_size:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            batch.append(item)
+            n_rows += len(item[0])
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            n_rows = sum(len(rows) for rows, _ in batch)
+            start = time.perf_counter()
+            try:
+                # Request có số cột khác nhau chỉ làm lỗi batch của chúng, worker vẫn chạy tiếp
+                X = np.concatenate([rows for rows, _ in batch])
+                # Chạy predict ngoài event loop để không chặn các request khác
+                result = await loop.run_in_executor(None, self.predict_fn, X)
+            except Exception as e:
+                logger.error(f"Error predicting batch of {n_rows} rows: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            logger.info(
+                "Predicted batch",
+                extra={
+                    "event": "predict", "rows": n_rows, "requests": len(batch),
+                    "duration_ms": (time.perf_counter() - start) * 1000,
+                },
+            )
+
+            offset = 0
+            for rows, future in batch:
+                end = offset + len(rows)
+                if not future.done():
+                    future.set_result({key: value[offset:end] for key, value in result.items()})
+                offset = end
@@ -1,33 +1,63 @@
+import os
+from typing import Optional
 from omegaconf import DictConfig
-from src.utils import get_logger
-from src.models import ModelEvaluation
-import pandas as pd
-from src.data import DVCRemoteManager
-from hydra import compose, initialize
+from src.utils import get_logger, LazyMessage
+from src.models.model_evaluation import ModelEvaluation
+from src.models.compiled_scorer import CompiledScorer
+import numpy as np
+from src.data import get_dvc_manager
 logger = get_logger()
-manager = DVCRemoteManager()
 
-def predict_pipeline(config: DictConfig):
+FEATURE_COLS = ["SepalLengthCm", "SepalWidthCm", "PetalLengthCm", "PetalWidthCm"]
+
+
+def get_feature_names(evaluator: ModelEvaluation) -> list:
+    """Tên các feature theo đúng thứ tự scaler đã được fit"""
+    feature_names = getattr(evaluator, "feature_names", None)
+    if feature_names:
+        return list(feature_names)
+    return list(getattr(evaluator.scaler, "feature_names_in_", FEATURE_COLS))
+
+
+def predict_rows(evaluator: ModelEvaluation, rows) -> dict:
+    """Dự đoán một batch các dòng feature (list hoặc mảng 2D)"""
+    scorer = evaluator if isinstance(evaluator, CompiledScorer) else getattr(evaluator, "scorer", None)
+    if scorer is not None:
+        # Không cần dựng DataFrame cho scorer đã compile
+        return scorer.predict(np.asarray(rows, dtype=np.float64))
+    # pandas chỉ được import khi cần (scorer đã compile không dùng tới)
+    import pandas as pd
+    X = pd.DataFrame(data=rows, columns=get_feature_names(evaluator))
+    return evaluator.predict(X)
+
+
+def predict_pipeline(config: DictConfig, evaluator: Optional[ModelEvaluation] = None, rows=None):
     try:
-        manager.pull_from_s3()
-        manager.check_remote_status()
         logger.info("Starting predict pipeline")
-        evaluator = ModelEvaluation(config)
-            
-            # Load the data to be predicted
-        cols = ["SepalLengthCm", "SepalWidthCm", "PetalLengthCm", "PetalWidthCm"]
-        values = [[6.1, 3.5, 2.0, 0.2]] 
-        X_test = pd.DataFrame(columns=cols, data=values)
-            
-        logger.info(f"X_test data with shape: {X_test.shape} and values: \n{X_test}")
-            # Make predictions
+        if evaluator is None:
+            # Chỉ pull model và scaler/label encoder khi bản local đã cũ
+            get_dvc_manager().sync(
+                [os.path.join(config.paths.models_dir, "model.pkl"), config.data.transformed_data_path],
+                jobs=config.dvc.jobs, remote=config.dvc.remote,
+            )
+            evaluator = ModelEvaluation(config)
+
+        # Load the data to be predicted
+        if rows is None:
+            rows = [[6.1, 3.5, 2.0, 0.2]]
+        import pandas as pd
+        X_test = pd.DataFrame(columns=get_feature_names(evaluator), data=rows)
+
+        logger.debug("X_test data with shape: %s and values: \n%s", X_test.shape, LazyMessage(X_test.to_string))
+        # Make predictions
         y_pred = evaluator.predict(X_test)
-        logger.info(f"Final predict label: {y_pred}")
+        logger.info("Final predict label: %s", y_pred["label_text"], extra={"event": "predict", "rows": len(X_test)})
         logger.info("Predict pipeline successfully!")
-            
+        return y_pred
+
     except Exception as e:
         logger.error(f"Error during prediction: {str(e)}")
         raise e
 
 if __name__ == "__main__":
-    predict_pipeline()
\ No newline at end of file
+    predict_pipeline()
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import shutil
+from typing import Dict, List, Optional, Tuple
+import yaml
+from omegaconf import DictConfig, OmegaConf
+from src.utils import get_logger
+
+logger = get_logger()
+
+FINGERPRINT_FILE = ".stage_fingerprint"
+
+
+def file_md5(file_path: str, block_size: int = 1 << 20) -> str:
+    md5 = hashlib.md5()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            md5.update(block)
+    return md5.hexdigest()
+
+
+class StageCache:
+    """
+    Cache kết quả của từng stage theo fingerprint của input.
+
+    Fingerprint gồm tên stage, version của stage, phần config liên quan và
+    fingerprint của input (md5 dữ liệu raw hoặc fingerprint của stage trước).
+    Mỗi entry là một thư mục `<dir>/<stage>/<fingerprint>/` chứa bản sao các
+    file output; khi cache hit, output được khôi phục và stage được bỏ qua.
+    """
+
+    def __init__(self, config: DictConfig):
+        self.enabled = config.stage_cache.enabled
+        self.cache_dir = config.stage_cache.dir
+        self.max_entries = config.stage_cache.max_entries
+        self.results: Dict[str, str] = {}
+        self._pending: List[Tuple[str, str, list, Optional[str]]] = []
+
+    def fingerprint(self, stage: str, version: int, *inputs) -> str:
+        payload = [stage, version]
+        for item in inputs:
+            if isinstance(item, DictConfig):
+                item = OmegaConf.to_container(item, resolve=True)
+            payload.append(item)
+        return hashlib.sha256(
+            json.dumps(payload, sort_keys=True, default=str).encode()
+        ).hexdigest()
+
+    @staticmethod
+    def raw_data_hash(config: DictConfig) -> str:
+        """md5 của file raw, lấy từ file .dvc nếu có để khỏi phải đọc lại dữ liệu"""
+        raw_file_path = os.path.join(config.data.raw_data_path, config.data.data_file)
+        dvc_file_path = f"{raw_file_path}.dvc"
+        if os.path.exists(dvc_file_path):
+            with open(dvc_file_path) as f:
+                outs = yaml.safe_load(f).get("outs", [])
+            if outs and outs[0].get("md5"):
+                return outs[0]["md5"]
+        return file_md5(raw_file_path)
+
+    @staticmethod
+    def read_marker(directory: str):
+        """Fingerprint của stage đã tạo ra nội dung thư mục `directory`"""
+        marker_path = os.path.join(directory, FINGERPRINT_FILE)
+        if not os.path.exists(marker_path):
+            return None
+        with open(marker_path) as f:
+            return f.read().strip()
+
+    @staticmethod
+    def write_marker(directory: str, fingerprint: str):
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, FINGERPRINT_FILE), "w") as f:
+            f.write(fingerprint)
+
+    def _entry_dir(self, stage: str, fingerprint: str) -> str:
+        return os.path.join(self.cache_dir, stage, fingerprint)
+
+    def restore(self, stage: str, fingerprint: str, output_paths: list, marker_dir: Optional[str] = None) -> bool:
+        """
+        Khôi phục output của stage nếu cache hit. Trả về True nếu hit.
+
+        Khi miss, stage được ghi nhận để `commit()` lưu output sau khi chạy xong.
+        """
+        entry_dir = self._entry_dir(stage, fingerprint)
+        manifest_path = os.path.join(entry_dir, "manifest.json")
+        hit = False
+        if self.enabled and os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            cached = manifest["outputs"]
+            if all(os.path.abspath(path) in cached for path in output_paths):
+                for path in output_paths:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    # Copy thay vì hard link vì stage sau có thể ghi đè file tại chỗ,
+                    # replace để process khác (vd. ModelStore) không đọc phải file dở dang
+                    shutil.copy2(os.path.join(entry_dir, cached[os.path.abspath(path)]), f"{path}.tmp")
+                    os.replace(f"{path}.tmp", path)
+                os.utime(entry_dir)
+                hit = True
+
+        self.results[stage] = "hit" if hit else "miss"
+        logger.info(f"Stage cache {self.results[stage]} for {stage} ({fingerprint[:12]})")
+        if hit:
+            if marker_dir is not None:
+                self.write_marker(marker_dir, fingerprint)
+        else:
+            # Output sắp bị ghi lại nên fingerprint cũ không còn đúng
+            if marker_dir is not None and os.path.exists(os.path.join(marker_dir, FINGERPRINT_FILE)):
+                os.remove(os.path.join(marker_dir, FINGERPRINT_FILE))
+            self._pending.append((stage, fingerprint, output_paths, marker_dir))
+        return hit
+
+    def commit(self):
+        """Lưu output của các stage vừa chạy (cache miss). Gọi khi output đã nằm trên disk"""
+        pending, self._pending = self._pending, []
+        for stage, fingerprint, output_paths, marker_dir in pending:
+            if marker_dir is not None:
+                self.write_marker(marker_dir, fingerprint)
+            self.save(stage, fingerprint, output_paths)
+
+    def missed(self, stage: str) -> bool:
+        """True nếu stage đã phải chạy lại (miss hoặc không dùng cache)"""
+        return self.results.get(stage) != "hit"
+
+    def tags(self) -> dict:
+        return {f"stage_cache.{stage}": result for stage, result in self.results.items()}
+
+    def save(self, stage: str, fingerprint: str, output_paths: list):
+        """Lưu bản sao output của stage vào cache"""
+        if not self.enabled:
+            return
+        entry_dir = self._entry_dir(stage, fingerprint)
+        tmp_dir = f"{entry_dir}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        outputs = {}
+        for i, path in enumerate(output_paths):
+            name = f"{i}_{os.path.basename(path)}"
+            shutil.copy2(path, os.path.join(tmp_dir, name))
+            outputs[os.path.abspath(path)] = name
+        with open(os.path.join(tmp_dir, "manifest.json"), "w") as f:
+            json.dump({"stage": stage, "outputs": outputs}, f, indent=2)
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        os.replace(tmp_dir, entry_dir)
+        self._evict(stage)
+        logger.info(f"Saved {stage} outputs to stage cache ({fingerprint[:12]})")
+
+    def _evict(self, stage: str):
+        stage_dir = os.path.join(self.cache_dir, stage)
+        entries = sorted(
+            (os.path.join(stage_dir, name) for name in os.listdir(stage_dir)),
+            key=os.path.getmtime,
+        )
+        for entry_dir in entries[: max(len(entries) - self.max_entries, 0)]:
+            shutil.rmtree(entry_dir, ignore_errors=True)
@@ -0,0 +1,72 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List
+from src.utils import get_logger, get_tracker
+
+logger = get_logger()
+tracker = get_tracker()
+
+
+class StageContext:
+    """
+    Chuyển artifact (DataFrame, array, scaler...) giữa các stage chạy trong
+    cùng một process mà không phải ghi ra disk rồi đọc lại.
+
+    Việc lưu xuống disk/MLflow được đẩy sang thread nền qua `persist()`
+    (write-behind); gọi `wait()` trước khi cần tới file trên disk, vd. trước
+    `dvc add`. Thao tác lưu ghi vào MLflow run đang mở lúc gọi `persist()`,
+    kể cả khi run đó đã kết thúc trên thread gọi trước khi thao tác chạy xong.
+    """
+
+    def __init__(self, max_workers: int = 2):
+        self._artifacts: Dict[str, Any] = {}
+        self._futures: List[Future] = []
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="write-behind"
+        )
+
+    def put(self, name: str, value):
+        self._artifacts[name] = value
+
+    def get(self, name: str, default=None):
+        return self._artifacts.get(name, default)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._artifacts
+
+    def persist(self, fn, *args, **kwargs):
+        """Chạy hàm lưu artifact ở thread nền"""
+        # Run active của mlflow gắn với thread gọi nên phải lấy run_id ngay tại đây
+        run_id = tracker.current_run_id()
+        future = self._executor.submit(self._run_in, run_id, fn, *args, **kwargs)
+        self._futures.append(future)
+        return future
+
+    @staticmethod
+    def _run_in(run_id, fn, *args, **kwargs):
+        with tracker.bind_run(run_id):
+            return fn(*args, **kwargs)
+
+    def wait(self):
+        """Chờ mọi thao tác lưu hoàn tất, raise lỗi đầu tiên nếu có"""
+        futures, self._futures = self._futures, []
+        errors = [future.exception() for future in futures]
+        errors = [error for error in errors if error is not None]
+        if errors:
+            logger.error(f"{len(errors)} write-behind task(s) failed")
+            raise errors[0]
+
+    def close(self):
+        try:
+            self.wait()
+        finally:
+            self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # Không che lỗi gốc của pipeline bằng lỗi khi lưu
+            self._executor.shutdown(wait=True)
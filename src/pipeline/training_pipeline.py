@@ -1,29 +1,87 @@
-import mlflow
+import time
+from typing import Optional
 from omegaconf import DictConfig
-from src.utils import get_logger
-from src.data import DVCRemoteManager
+from src.utils import get_logger, get_tracker, ConfigProvider
+from src.data import get_dvc_manager, VersioningQueue
 from src.models import ModelTrainer
-from hydra import compose, initialize
+from .stage_cache import StageCache
+from .stage_context import StageContext
 logger = get_logger()
-manager = DVCRemoteManager()
+tracker = get_tracker()
 
-def train_pipeline(config: DictConfig):
-    """Train the model."""
-    with mlflow.start_run(run_name="training_pipeline"):
+def run_training_stage(
+    config: DictConfig,
+    cache: StageCache,
+    context: Optional[StageContext] = None,
+    transformation_fingerprint: Optional[str] = None,
+):
+    """Train và lưu model, bỏ qua nếu dữ liệu transformed và config model không đổi"""
+    start = time.perf_counter()
+    trainer = ModelTrainer(config)
+    model_file_path = trainer.output_paths()[0]
+    if transformation_fingerprint is None:
+        # Fingerprint được ghi kèm thư mục transformed khi stage transformation chạy
+        transformation_fingerprint = cache.read_marker(config.data.transformed_data_path)
+    if transformation_fingerprint is None:
+        logger.info("Transformed data has no fingerprint, stage cache is skipped for training")
+        trainer.train(context)
+        trainer.save_model()
+        trainer.export_compiled()
+        trainer.export_bundle()
+        return model_file_path
+
+    training_fingerprint = cache.fingerprint(
+        "training", ModelTrainer.STAGE_VERSION, transformation_fingerprint,
+        config.model, config.default_model, config.training,
+    )
+    if not cache.restore("training", training_fingerprint, trainer.output_paths()):
+        trainer.train(context)
+        trainer.save_model()
+        tracker.flush(wait=False)
+    if context is not None:
+        # Artifact serving được gắn với sha256 của scaler/label encoder nên chúng phải nằm trên disk
+        context.wait()
+    trainer.export_compiled()
+    trainer.export_bundle()
+    logger.info("Stage training finished", extra={
+        "stage": "training", "run_id": tracker.run_id, "cache": cache.results["training"],
+        "duration_ms": (time.perf_counter() - start) * 1000,
+    })
+    return model_file_path
+
+
+def train_pipeline(config: DictConfig, defer_versioning: bool = False):
+    """
+    Train the model.
+
+    Args:
+        defer_versioning (bool): Trả về VersioningQueue (đã `dvc add`) để caller tự push
+            (vd. JobRunner); mặc định push chạy nền và trả về Future
+    """
+    with tracker.start_run(run_name="training_pipeline", config=config):
         try:
-            manager.pull_from_s3()
-            manager.check_remote_status()
+            get_dvc_manager().sync(
+                [config.data.transformed_data_path],
+                jobs=config.dvc.jobs, remote=config.dvc.remote,
+            )
             logger.info("Starting training pipeline")
-            trainer = ModelTrainer(config)
-            trainer.train()
-            model_file_path = trainer.save_model()
-            manager.add_file(model_file_path)
-            manager.push_to_s3() 
+            cache = StageCache(config)
+            model_file_path = run_training_stage(config, cache)
+            tracker.set_tags(cache.tags())
+            cache.commit()
+            versioning = VersioningQueue(jobs=config.dvc.jobs, remote=config.dvc.remote)
+            if cache.missed("training"):
+                versioning.register(model_file_path)
+            versioning.add()
             logger.info("Training completed successfully")
+            return versioning if defer_versioning else versioning.flush(background=True)
         except Exception as e:
             logger.error(f"Error during training: {str(e)}")
-            mlflow.log_param("training_pipeline_error", str(e))
+            tracker.log_param("training_pipeline_error", str(e))
             raise e
 
 if __name__ == "__main__":
-    train_pipeline()
\ No newline at end of file
+    versioned = train_pipeline(ConfigProvider(config_dir="configs").get())
+    # Chờ dvc push chạy nền xong, lỗi push làm process thoát với mã lỗi
+    if versioned is not None:
+        versioned.result()
@@ -1,4 +1,21 @@
-from .custom_logger import get_logger
+import importlib
+from .custom_logger import get_logger, configure_logging, LazyMessage
+from .config_provider import ConfigProvider
+from .env import load_env
+
+# Tracker import mlflow nên chỉ được import khi dùng tới
+_LAZY_EXPORTS = {
+    "Tracker": ".tracking",
+    "get_tracker": ".tracking",
+}
 __all__ = [
-    "get_logger"
-]
\ No newline at end of file
+    "get_logger","configure_logging","LazyMessage","ConfigProvider","load_env","Tracker","get_tracker"
+]
+
+
+def __getattr__(name):
+    if name not in _LAZY_EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,84 @@
+import os
+import threading
+import time
+from typing import Optional
+from hydra import compose, initialize_config_dir
+from omegaconf import DictConfig, OmegaConf
+from .custom_logger import get_logger, LazyMessage
+
+logger = get_logger()
+
+
+class ConfigProvider:
+    """
+    Compose Hydra config một lần và dùng lại cho mọi request.
+
+    Config chỉ được compose lại khi có file trong `config_dir` thay đổi
+    (kiểm tra tối đa một lần mỗi `check_interval` giây) hoặc khi gọi
+    `reload()`. Config trả về đã được resolve và ở chế độ read-only.
+    """
+
+    def __init__(
+        self,
+        config_dir: str = "configs",
+        config_name: str = "config",
+        job_name: str = "mlops-crack",
+        check_interval: float = 2.0,
+    ):
+        self.config_dir = os.path.abspath(config_dir)
+        self.config_name = config_name
+        self.job_name = job_name
+        self.check_interval = check_interval
+        self._config: Optional[DictConfig] = None
+        self._fingerprint = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def _read_fingerprint(self):
+        fingerprint = []
+        for root, _, files in os.walk(self.config_dir):
+            for file_name in files:
+                stat = os.stat(os.path.join(root, file_name))
+                fingerprint.append((root, file_name, stat.st_mtime_ns, stat.st_size))
+        return tuple(sorted(fingerprint))
+
+    def _compose(self) -> DictConfig:
+        fingerprint = self._read_fingerprint()
+        try:
+            with initialize_config_dir(
+                version_base="1.3", config_dir=self.config_dir, job_name=self.job_name
+            ):
+                config = compose(config_name=self.config_name, return_hydra_config=True)
+                OmegaConf.resolve(config)
+        except Exception as e:
+            logger.error(f"Error during Hydra config initialization: {e}")
+            raise
+        OmegaConf.set_readonly(config, True)
+        self._config = config
+        self._fingerprint = fingerprint
+        self._last_check = time.monotonic()
+        logger.info(f"Config composed successfully from: {self.config_dir}")
+        logger.debug("Resolved config: %s", LazyMessage(OmegaConf.to_yaml, config))
+        return config
+
+    def reload(self) -> DictConfig:
+        """Compose lại config ngay lập tức"""
+        with self._lock:
+            return self._compose()
+
+    def get(self) -> DictConfig:
+        config = self._config
+        if config is not None and time.monotonic() - self._last_check < self.check_interval:
+            return config
+        with self._lock:
+            if self._config is None:
+                return self._compose()
+            self._last_check = time.monotonic()
+            if self._read_fingerprint() != self._fingerprint:
+                logger.info("Config files changed, composing config again")
+                try:
+                    return self._compose()
+                except Exception:
+                    # Giữ config cũ nếu file config mới đang bị lỗi
+                    logger.warning("Keep using the previous config")
+            return self._config
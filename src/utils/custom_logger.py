@@ -1,16 +1,43 @@
 # This file contains the logger configuration for the application.
 
 from datetime import datetime
-from logging.handlers import TimedRotatingFileHandler
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+import atexit
+import json
+import multiprocessing.util
+import os
+import queue
+import random
 import sys
+import threading
+import time
 import click
 import logging
-from copy import copy
 from pathlib import Path
 from typing import Literal
 
 TRACE_LOG_LEVEL = 5
 
+# Các QueueListener đang chạy, được dừng (và flush) bởi `stop_logging()`
+_listeners: list[QueueListener] = []
+# Các handler ghi log thật (stream/file) của từng logger, dùng bởi `configure_logging()`
+_handlers: dict[str, list[logging.Handler]] = {}
+# Formatter dạng text ban đầu của từng handler, dùng lại khi đổi từ json về text
+_text_formatters: dict[logging.Handler, logging.Formatter | None] = {}
+
+
+@lru_cache(maxsize=1024)
+def relative_pathname(pathname: str) -> str:
+    """`<thư mục>/<file>` của pathname, được cache vì mỗi module chỉ có một pathname"""
+    return "/".join(pathname.split("/")[-2:])
+
+
+def _style_parts(fg) -> tuple:
+    # Tách mã màu ANSI của click.style thành (prefix, suffix) để chỉ tính một lần
+    prefix, suffix = click.style("\0", fg=fg).split("\0")
+    return prefix, suffix
+
 
 class ColourizedFormatter(logging.Formatter):
     level_colors = {
@@ -43,6 +70,11 @@ class ColourizedFormatter(logging.Formatter):
         else:
             self.use_colors = sys.stdout.isatty()
         super().__init__(fmt=fmt, datefmt=datefmt, style=style)
+        self._level_styles = {
+            level_no: _style_parts(color) for level_no, color in self.level_colors.items()
+        }
+        self._reset_style = _style_parts("reset")
+        self._date_style = _style_parts((200, 200, 200))
 
     def color_level_name(self, level_name: str, level_no: int) -> str:
         """
@@ -98,73 +130,225 @@ class ColourizedFormatter(logging.Formatter):
         """
         Format the message.
 
+        Không copy record: các field màu được gán tạm rồi trả lại giá trị cũ,
+        record chỉ được một handler format tại một thời điểm.
+
         Args:
             record (logging.LogRecord): The log record.
 
         Returns:
             str: The formatted message.
         """
-        recordcopy = copy(record)
-        levelname = recordcopy.levelname
-        seperator = " " * (8 - len(recordcopy.levelname))
-
-        if self.use_colors:
-            relpathname = "/".join(recordcopy.pathname.split("/")[-2:])
-            levelname = self.color_level_name(levelname, recordcopy.levelno)
-            recordcopy.msg = self.color_message(recordcopy.msg, recordcopy.levelno)
-            recordcopy.__dict__["message"] = recordcopy.getMessage()
-            recordcopy.asctime = self.color_date(recordcopy)
-            recordcopy.__dict__["relpathname"] = relpathname
-
-        recordcopy.__dict__["levelprefix"] = levelname + seperator
-        return super().formatMessage(recordcopy)
+        record.relpathname = relative_pathname(record.pathname) if record.pathname else "N/A"
+        seperator = " " * (8 - len(record.levelname))
+        if not self.use_colors:
+            record.levelprefix = record.levelname + seperator
+            return super().formatMessage(record)
+
+        prefix, suffix = self._level_styles.get(record.levelno, self._reset_style)
+        date_prefix, date_suffix = self._date_style
+        message, asctime = record.message, getattr(record, "asctime", None)
+        record.levelprefix = prefix + record.levelname + suffix + seperator
+        record.message = prefix + message + suffix
+        if asctime is not None:
+            record.asctime = date_prefix + asctime + date_suffix
+        try:
+            return super().formatMessage(record)
+        finally:
+            record.message, record.asctime = message, asctime
+            record.levelprefix = record.levelname + seperator
 
 
 class DefaultFormatter(ColourizedFormatter):
     def should_use_colors(self) -> bool:
         return sys.stderr.isatty()
 
+
+class FileFormater(logging.Formatter):
     def formatMessage(self, record: logging.LogRecord) -> str:
-        recordcopy = copy(record)
+        record.relpathname = relative_pathname(record.pathname) if record.pathname else "N/A"
+        return super().formatMessage(record)
 
-        if "pathname" in recordcopy.__dict__:
-            relpathname = "/".join(recordcopy.pathname.split("/")[-2:])
-            recordcopy.__dict__["relpathname"] = relpathname
-        else:
-            recordcopy.__dict__["relpathname"] = (
-                "N/A"  # Fallback when pathname is missing
-            )
 
-        levelname = recordcopy.levelname
-        seperator = " " * (8 - len(levelname))
+# Các attribute có sẵn của LogRecord, phần còn lại là field truyền qua `extra`
+_RECORD_ATTRS = set(logging.makeLogRecord({}).__dict__) | {"message", "asctime", "relpathname", "levelprefix"}
 
-        if self.use_colors:
-            levelname = self.color_level_name(levelname, recordcopy.levelno)
-            recordcopy.msg = self.color_message(recordcopy.msg, recordcopy.levelno)
-            recordcopy.__dict__["message"] = recordcopy.getMessage()
-            recordcopy.asctime = self.color_date(recordcopy)
 
-        recordcopy.__dict__["levelprefix"] = levelname + seperator
-        return super().formatMessage(recordcopy)
+class JsonFormatter(logging.Formatter):
+    """
+    Mỗi record là một dòng JSON. Các field truyền qua `extra`, vd.
+    `logger.info("Stage done", extra={"stage": "training", "duration_ms": 12.5})`,
+    được giữ nguyên kiểu (số vẫn là số). Việc serialize chỉ xảy ra ở handler,
+    tức là trên thread của QueueListener khi log async.
+    """
 
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "module": relative_pathname(record.pathname) if record.pathname else "N/A",
+            "func": record.funcName,
+            "line": record.lineno,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                payload[key] = value
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+def _record_key(record: logging.LogRecord) -> str:
+    # Sampling/rate limit theo `event` truyền qua extra, không có thì theo tên logger
+    return getattr(record, "event", None) or record.name
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Chỉ giữ lại một tỉ lệ record của mỗi event/logger, vd. `{"predict": 0.01}`.
+    Record từ mức `always_level` (mặc định ERROR) luôn được giữ.
+    """
 
-class FileFormater(logging.Formatter):
-    def formatMessage(self, record: logging.LogRecord) -> str:
-        recordcopy = copy(record)
+    def __init__(self, rates: dict, always_level: int = logging.ERROR):
+        super().__init__()
+        self.rates = dict(rates)
+        self.always_level = always_level
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= self.always_level:
+            return True
+        rate = self.rates.get(_record_key(record))
+        return rate is None or random.random() < rate
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Giới hạn số record mỗi giây của mỗi event/logger (token bucket), vd.
+    `{"predict": 100}`. Record từ mức `always_level` luôn được giữ.
+    """
+
+    def __init__(self, limits: dict, always_level: int = logging.ERROR):
+        super().__init__()
+        self.limits = dict(limits)
+        self.always_level = always_level
+        self._buckets: dict[str, tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= self.always_level:
+            return True
+        key = _record_key(record)
+        limit = self.limits.get(key)
+        if limit is None:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (limit, now))
+            tokens = min(limit, tokens + (now - last) * limit)
+            allowed = tokens >= 1
+            self._buckets[key] = (tokens - 1 if allowed else tokens, now)
+        return allowed
 
-        if "pathname" in recordcopy.__dict__:
-            relpathname = "/".join(recordcopy.pathname.split("/")[-2:])
-            recordcopy.__dict__["relpathname"] = relpathname
-        else:
-            recordcopy.__dict__["relpathname"] = (
-                "N/A"  # Fallback when pathname is missing
-            )
 
-        return super().formatMessage(recordcopy)
+class LazyMessage:
+    """Tham số log chỉ được tính khi record thực sự được ghi, vd. `logger.debug("%s", LazyMessage(fn))`"""
+
+    def __init__(self, fn, *args, **kwargs):
+        self.fn, self.args, self.kwargs = fn, args, kwargs
+
+    def __str__(self) -> str:
+        return str(self.fn(*self.args, **self.kwargs))
+
+
+class _AsyncQueueHandler(QueueHandler):
+    """
+    Chỉ đưa record vào queue, việc format và ghi do QueueListener làm ở thread riêng.
+
+    Queue nằm trong cùng process nên record được giữ nguyên (msg và args chưa
+    format) thay vì bị format và copy như `QueueHandler.prepare`: `%`-format,
+    kể cả `LazyMessage`, chỉ chạy trên thread của listener. Vì vậy args không
+    nên bị thay đổi sau khi log.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def stop_logging():
+    """Dừng các QueueListener, ghi hết các record còn trong queue"""
+    while _listeners:
+        _listeners.pop().stop()
+
+
+atexit.register(stop_logging)
+# Process con của multiprocessing kết thúc bằng os._exit, không chạy atexit
+multiprocessing.util.Finalize(None, stop_logging, exitpriority=0)
+
+
+def configure_logging(
+    name: str = "python_app",
+    log_format: str | None = None,
+    sampling: dict | None = None,
+    rate_limits: dict | None = None,
+    level: str | int | None = None,
+) -> logging.Logger:
+    """
+    Đổi định dạng, level và gắn sampling/rate limit cho logger đã tạo bởi `get_logger`.
+
+    Level và filter được áp dụng ở logger nên record bị loại (vd. `logger.debug`
+    khi level là INFO) không được tạo, không đi tới queue/handler.
+
+    Args:
+        log_format (str | None): `text` hoặc `json`, None thì giữ nguyên.
+        sampling (dict | None): Tỉ lệ giữ lại theo event hoặc tên logger.
+        rate_limits (dict | None): Số record tối đa mỗi giây theo event hoặc tên logger.
+        level (str | int | None): vd. `DEBUG`, `INFO`, None thì giữ nguyên.
+    """
+    logger = get_logger(name)
+    if level is not None:
+        logger.setLevel(_parse_level(level))
+    if log_format is not None:
+        for handler in _handlers.get(name, []):
+            _set_format(handler, log_format)
+    for log_filter in list(logger.filters):
+        if isinstance(log_filter, (SamplingFilter, RateLimitFilter)):
+            logger.removeFilter(log_filter)
+    if sampling:
+        logger.addFilter(SamplingFilter(sampling))
+    if rate_limits:
+        logger.addFilter(RateLimitFilter(rate_limits))
+    return logger
+
+
+def _parse_level(level: str | int) -> int:
+    if isinstance(level, int):
+        return level
+    if level.upper() == "TRACE":
+        return TRACE_LOG_LEVEL
+    level_no = logging.getLevelName(level.upper())
+    if not isinstance(level_no, int):
+        raise ValueError(f"Log level '{level}' is not supported.")
+    return level_no
+
+
+def _set_format(handler: logging.Handler, log_format: str):
+    if log_format not in ("text", "json"):
+        raise ValueError(f"Log format '{log_format}' is not supported. Choose 'text' or 'json'")
+    text_formatter = _text_formatters.setdefault(handler, handler.formatter)
+    handler.setFormatter(JsonFormatter() if log_format == "json" else text_formatter)
 
 
 def get_logger(
-    name: str = "python_app", file_path: str | None = None, global_file_log: bool = True
+    name: str = "python_app",
+    file_path: str | None = None,
+    global_file_log: bool = True,
+    async_mode: bool | None = None,
+    log_format: str | None = None,
+    level: str | int | None = None,
 ) -> logging.Logger:
     """
     Get a coloured logger.
@@ -173,6 +357,13 @@ def get_logger(
         name (str): The name of the logger.
         file_path (str | None): The path to the log file. Defaults to `None`.
         global_file_log (bool): Whether to log to the global file. Defaults to `False`.
+        async_mode (bool | None): Đặt các handler sau QueueHandler/QueueListener để
+            thread gọi log chỉ phải đưa record vào queue. Mặc định lấy từ biến
+            môi trường `LOG_ASYNC` (bật nếu không đặt).
+        log_format (str | None): `text` hoặc `json`. Mặc định lấy từ biến môi
+            trường `LOG_FORMAT` (`text` nếu không đặt).
+        level (str | int | None): Level của logger khi được tạo lần đầu. Mặc định
+            lấy từ biến môi trường `LOG_LEVEL` (`INFO` nếu không đặt).
 
     Returns:
         logging.Logger: The logger object.
@@ -180,16 +371,23 @@ def get_logger(
     **Note:** Name is only used to prevent from being root logger.
     """
     logger = logging.getLogger(name=name)
-    logger.setLevel(TRACE_LOG_LEVEL)
+    if level is not None:
+        logger.setLevel(_parse_level(level))
 
     if not logger.hasHandlers():
+        if level is None:
+            # Chỉ đặt khi tạo logger, không ghi đè level đã được `configure_logging` đổi
+            logger.setLevel(_parse_level(os.getenv("LOG_LEVEL", "INFO")))
+        if async_mode is None:
+            async_mode = os.getenv("LOG_ASYNC", "true").lower() not in ("0", "false", "no")
+        handlers: list[logging.Handler] = []
         stream_handler = logging.StreamHandler()
         stream_formatter = DefaultFormatter(
             "%(asctime)s | %(levelprefix)s - [%(relpathname)s %(funcName)s(%(lineno)d)] - %(message)s",
             datefmt="%Y/%m/%d  %H:%M:%S",
         )
         stream_handler.setFormatter(stream_formatter)
-        logger.addHandler(stream_handler)
+        handlers.append(stream_handler)
 
         if file_path:
             Path(file_path).parent.mkdir(parents=True, exist_ok=True)
@@ -203,7 +401,7 @@ def get_logger(
                 datefmt="%Y/%m/%d - %H:%M:%S",
             )
             file_handler.setFormatter(file_formatter)
-            logger.addHandler(file_handler)
+            handlers.append(file_handler)
 
         if global_file_log:
             date_log_path = f"logs/{datetime.now().strftime('%Y-%m-%d')}"
@@ -218,6 +416,21 @@ def get_logger(
                 datefmt="%Y/%m/%d - %H:%M:%S",
             )
             global_file_handler.setFormatter(global_file_formatter)
-            logger.addHandler(global_file_handler)
+            handlers.append(global_file_handler)
+
+        handler_format = log_format or os.getenv("LOG_FORMAT") or "text"
+        for handler in handlers:
+            _set_format(handler, handler_format)
+        _handlers[name] = handlers
+
+        if async_mode:
+            log_queue: queue.SimpleQueue = queue.SimpleQueue()
+            listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+            listener.start()
+            _listeners.append(listener)
+            logger.addHandler(_AsyncQueueHandler(log_queue))
+        else:
+            for handler in handlers:
+                logger.addHandler(handler)
 
     return logger
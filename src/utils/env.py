@@ -0,0 +1,12 @@
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def load_env() -> bool:
+    """
+    Đọc biến môi trường trong .env (vd. AWS credentials cho DVC remote và
+    artifact store của MLflow) một lần cho cả process, ở lần đầu cần tới
+    thay vì khi import.
+    """
+    from dotenv import load_dotenv
+    return load_dotenv()
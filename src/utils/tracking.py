@@ -0,0 +1,391 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+import mlflow
+from omegaconf import DictConfig
+from mlflow.entities import Metric, Param, RunTag
+from mlflow.tracking import MlflowClient
+from .custom_logger import get_logger
+from .env import load_env
+
+logger = get_logger()
+
+
+class Tracker:
+    """
+    Facade cho MLflow tracking: params, metrics và tags được gom vào buffer và
+    gửi bằng `log_batch` thay vì mỗi lần log là một request HTTP.
+
+    Buffer được flush ở ranh giới các stage (`flush(wait=False)`), bởi thread
+    nền khi đủ `max_buffer_size` phần tử hoặc sau `flush_interval` giây, và
+    luôn được flush khi run kết thúc, kể cả khi pipeline lỗi.
+
+    Artifact (`log_artifact`, `log_artifacts`, `log_model`) được upload bởi một
+    pool thread: mỗi file là một task, file có nội dung (sha256) giống lần
+    upload trước tới cùng đích sẽ được bỏ qua, lỗi được retry với backoff. Run
+    chỉ chờ các upload này khi kết thúc.
+
+    Ngoài một run mở bằng `start_run()` thì mọi lệnh log được gọi thẳng sang
+    mlflow, trừ khi thread đang ở trong `bind_run()`: khi đó lệnh log đi qua
+    MlflowClient vào đúng run đã gắn (API fluent chỉ thấy run active của thread gọi).
+    """
+
+    # Giới hạn của một lần log_batch
+    MAX_BATCH_SIZE = 1000
+    MAX_BATCH_PARAMS = 100
+    MAX_BATCH_TAGS = 100
+    MAX_PARAM_LENGTH = 6000
+
+    def __init__(
+        self,
+        max_buffer_size: int = 500,
+        flush_interval: float = 5.0,
+        upload_workers: int = 4,
+        max_retries: int = 3,
+        retry_backoff: float = 1.0,
+    ):
+        self.max_buffer_size = max_buffer_size
+        self.flush_interval = flush_interval
+        self.upload_workers = upload_workers
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.run_id: Optional[str] = None
+        self._client: Optional[MlflowClient] = None
+        self._params: Dict[str, str] = {}
+        self._tags: Dict[str, str] = {}
+        self._metrics: List[Metric] = []
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._uploader: Optional[ThreadPoolExecutor] = None
+        self._uploads: List[Future] = []
+        self._uploaded: Dict[str, str] = {}
+        self._bound = threading.local()
+
+    @property
+    def active(self) -> bool:
+        return self.run_id is not None
+
+    def current_run_id(self):
+        """Run mà lệnh log trên thread hiện tại sẽ ghi vào, None nếu không có"""
+        if self.active:
+            return self.run_id
+        run_id = getattr(self._bound, "run_id", None)
+        if run_id is not None:
+            return run_id
+        run = mlflow.active_run()
+        return run.info.run_id if run is not None else None
+
+    @contextmanager
+    def bind_run(self, run_id: Optional[str] = None):
+        """
+        Gắn `run_id` cho các lệnh log của thread hiện tại khi không có run mở bằng
+        `start_run()`, vd. trên thread write-behind của StageContext.
+        """
+        previous = getattr(self._bound, "run_id", None)
+        self._bound.run_id = run_id
+        try:
+            yield
+        finally:
+            self._bound.run_id = previous
+
+    def _bound_run_id(self):
+        return getattr(self._bound, "run_id", None)
+
+    @contextmanager
+    def start_run(self, run_name: Optional[str] = None, config: Optional[DictConfig] = None):
+        """
+        Mở MLflow run, buffer mọi lệnh log trong run và flush khi run kết thúc.
+
+        Args:
+            config (DictConfig | None): Config của project, dùng các mục
+                `mlflow.buffer` và `mlflow.artifacts` nếu có
+        """
+        if self.active:
+            raise RuntimeError(f"Run {self.run_id} is already active in this process.")
+        if config is not None:
+            buffer = config.mlflow.get("buffer", {})
+            artifacts = config.mlflow.get("artifacts", {})
+            self.max_buffer_size = buffer.get("max_buffer_size", self.max_buffer_size)
+            self.flush_interval = buffer.get("flush_interval", self.flush_interval)
+            self.upload_workers = artifacts.get("max_workers", self.upload_workers)
+            self.max_retries = artifacts.get("max_retries", self.max_retries)
+            self.retry_backoff = artifacts.get("retry_backoff", self.retry_backoff)
+        # Artifact store (vd. S3) đọc credentials từ .env
+        load_env()
+        with mlflow.start_run(run_name=run_name) as run:
+            # Giữ run_id để thread nền không phụ thuộc vào run đang active
+            self.run_id = run.info.run_id
+            self._client = MlflowClient()
+            self._uploader = ThreadPoolExecutor(
+                max_workers=self.upload_workers, thread_name_prefix="mlflow-upload"
+            )
+            self._stop.clear()
+            thread = threading.Thread(target=self._flush_loop, name="mlflow-flush", daemon=True)
+            thread.start()
+            self._thread = thread
+            try:
+                yield run
+            except BaseException:
+                # Không che lỗi gốc của pipeline bằng lỗi khi flush
+                self._close(raise_errors=False)
+                raise
+            self._close(raise_errors=True)
+
+    def _close(self, raise_errors: bool):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+        try:
+            self.wait_uploads()
+            self.flush()
+        except Exception as e:
+            logger.error(f"Could not flush MLflow buffer of run {self.run_id}: {e}")
+            if raise_errors:
+                raise
+        finally:
+            if self._uploader is not None:
+                self._uploader.shutdown(wait=True, cancel_futures=True)
+            self.run_id = None
+            self._thread = None
+            self._uploader = None
+            self._uploads, self._uploaded = [], {}
+            self._params, self._tags, self._metrics = {}, {}, []
+
+    def _flush_loop(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"Background MLflow flush failed, will retry: {e}")
+
+    def _buffered(self, size: int):
+        if size >= self.max_buffer_size:
+            self._wakeup.set()
+
+    def log_param(self, key: str, value):
+        self.log_params({key: value})
+
+    def log_params(self, params: dict):
+        if not self.active:
+            if self._bound_run_id() is None:
+                mlflow.log_params(params)
+            else:
+                batch = [Param(key, str(value)[: self.MAX_PARAM_LENGTH]) for key, value in params.items()]
+                MlflowClient().log_batch(self._bound_run_id(), params=batch)
+            return
+        with self._lock:
+            for key, value in params.items():
+                self._params[key] = str(value)[: self.MAX_PARAM_LENGTH]
+            size = len(self._params) + len(self._tags) + len(self._metrics)
+        self._buffered(size)
+
+    def log_metric(self, key: str, value: float, step: Optional[int] = None):
+        self.log_metrics({key: value}, step=step)
+
+    def log_metrics(self, metrics: dict, step: Optional[int] = None):
+        timestamp = int(time.time() * 1000)
+        if not self.active:
+            if self._bound_run_id() is None:
+                mlflow.log_metrics(metrics, step=step)
+            else:
+                batch = [Metric(key, float(value), timestamp, step or 0) for key, value in metrics.items()]
+                MlflowClient().log_batch(self._bound_run_id(), metrics=batch)
+            return
+        with self._lock:
+            self._metrics.extend(
+                Metric(key, float(value), timestamp, step or 0) for key, value in metrics.items()
+            )
+            size = len(self._params) + len(self._tags) + len(self._metrics)
+        self._buffered(size)
+
+    def set_tag(self, key: str, value):
+        self.set_tags({key: value})
+
+    def set_tags(self, tags: dict):
+        if not self.active:
+            if self._bound_run_id() is None:
+                mlflow.set_tags(tags)
+            else:
+                batch = [RunTag(key, str(value)) for key, value in tags.items()]
+                MlflowClient().log_batch(self._bound_run_id(), tags=batch)
+            return
+        with self._lock:
+            for key, value in tags.items():
+                self._tags[key] = str(value)
+            size = len(self._params) + len(self._tags) + len(self._metrics)
+        self._buffered(size)
+
+    def log_artifact(self, local_path: str, artifact_path: Optional[str] = None):
+        """Đưa một file vào hàng đợi upload"""
+        if not self.active:
+            if self._bound_run_id() is None:
+                mlflow.log_artifact(local_path, artifact_path)
+            else:
+                MlflowClient().log_artifact(self._bound_run_id(), local_path, artifact_path)
+            return
+        self._submit_upload(self._upload_file, local_path, artifact_path)
+
+    def log_artifacts(self, local_dir: str, artifact_path: Optional[str] = None):
+        """Đưa mọi file trong thư mục vào hàng đợi upload, mỗi file là một task"""
+        if not self.active:
+            if self._bound_run_id() is None:
+                mlflow.log_artifacts(local_dir, artifact_path)
+            else:
+                MlflowClient().log_artifacts(self._bound_run_id(), local_dir, artifact_path)
+            return
+        for root, _, files in os.walk(local_dir):
+            relative_dir = os.path.relpath(root, local_dir)
+            if relative_dir == ".":
+                destination = artifact_path
+            else:
+                destination = os.path.join(artifact_path or "", relative_dir).replace(os.sep, "/")
+            for file_name in sorted(files):
+                self.log_artifact(os.path.join(root, file_name), destination)
+
+    def log_model(self, model, artifact_path: str, registered_model_name: Optional[str] = None):
+        """Log (và đăng ký) model sklearn ở nền"""
+        if not self.active:
+            bound_run_id = self._bound_run_id()
+            if bound_run_id is None:
+                mlflow.sklearn.log_model(model, artifact_path, registered_model_name=registered_model_name)
+            else:
+                self._save_model_to_run(MlflowClient(), bound_run_id, model, artifact_path, registered_model_name)
+            return
+        self._submit_upload(self._upload_model, model, artifact_path, registered_model_name)
+
+    def _submit_upload(self, fn, *args, **kwargs):
+        uploader = self._uploader
+        assert uploader is not None, "uploads are only queued inside start_run()"
+        with self._lock:
+            self._uploads.append(uploader.submit(self._with_retries, fn, *args, **kwargs))
+
+    def _with_retries(self, fn, *args, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return fn(*args, **kwargs)
+            except FileNotFoundError:
+                raise
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.retry_backoff * 2 ** attempt
+                logger.warning(f"Upload to MLflow failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _upload_file(self, local_path: str, artifact_path: Optional[str] = None):
+        destination = "/".join(filter(None, [artifact_path, os.path.basename(local_path)]))
+        sha256 = hashlib.sha256()
+        with open(local_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                sha256.update(block)
+        digest = sha256.hexdigest()
+        with self._lock:
+            if self._uploaded.get(destination) == digest:
+                logger.debug(f"Artifact {destination} is unchanged, skip upload")
+                return
+            # Ghi nhận trước khi upload để upload trùng chạy song song cũng được bỏ qua
+            self._uploaded[destination] = digest
+        client, run_id = self._run_client()
+        try:
+            client.log_artifact(run_id, local_path, artifact_path)
+        except Exception:
+            with self._lock:
+                if self._uploaded.get(destination) == digest:
+                    del self._uploaded[destination]
+            raise
+
+    def _upload_model(self, model, artifact_path: str, registered_model_name: Optional[str] = None):
+        client, run_id = self._run_client()
+        self._save_model_to_run(client, run_id, model, artifact_path, registered_model_name)
+
+    def _run_client(self) -> Tuple[MlflowClient, str]:
+        """Client và run_id của run mở bằng `start_run()`"""
+        if self._client is None or self.run_id is None:
+            raise RuntimeError("No MLflow run was started with start_run().")
+        return self._client, self.run_id
+
+    @staticmethod
+    def _save_model_to_run(client, run_id: str, model, artifact_path: str, registered_model_name: Optional[str] = None):
+        # Không dùng mlflow.sklearn.log_model: run active của mlflow gắn với từng thread
+        # nên trên thread khác nó sẽ tạo một run mới thay vì log vào run_id
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            model_dir = os.path.join(tmp_dir, "model")
+            mlflow.sklearn.save_model(model, model_dir)
+            client.log_artifacts(run_id, model_dir, artifact_path)
+        if registered_model_name:
+            mlflow.register_model(f"runs:/{run_id}/{artifact_path}", registered_model_name)
+
+    def wait_uploads(self):
+        """Chờ mọi upload đang chờ hoàn tất, raise lỗi đầu tiên nếu có"""
+        with self._lock:
+            uploads, self._uploads = self._uploads, []
+        errors = [error for error in (upload.exception() for upload in uploads) if error is not None]
+        if errors:
+            logger.error(f"{len(errors)} artifact upload(s) failed")
+            raise errors[0]
+
+    def flush(self, wait: bool = True):
+        """
+        Gửi mọi thứ trong buffer. `wait=False` chỉ báo cho thread nền flush
+        (dùng ở ranh giới stage để không chặn pipeline).
+        """
+        if not self.active:
+            return
+        if not wait:
+            self._wakeup.set()
+            return
+        client, run_id = self._run_client()
+        with self._send_lock:
+            with self._lock:
+                buffered_params, self._params = self._params, {}
+                buffered_tags, self._tags = self._tags, {}
+                metrics, self._metrics = self._metrics, []
+            params = [Param(key, value) for key, value in buffered_params.items()]
+            tags = [RunTag(key, value) for key, value in buffered_tags.items()]
+            try:
+                while params or tags or metrics:
+                    batch_params, params = params[: self.MAX_BATCH_PARAMS], params[self.MAX_BATCH_PARAMS:]
+                    batch_tags, tags = tags[: self.MAX_BATCH_TAGS], tags[self.MAX_BATCH_TAGS:]
+                    n_metrics = self.MAX_BATCH_SIZE - len(batch_params) - len(batch_tags)
+                    batch_metrics, metrics = metrics[:n_metrics], metrics[n_metrics:]
+                    try:
+                        client.log_batch(
+                            run_id, metrics=batch_metrics, params=batch_params, tags=batch_tags
+                        )
+                    except Exception:
+                        params, tags, metrics = batch_params + params, batch_tags + tags, batch_metrics + metrics
+                        raise
+            finally:
+                # Phần chưa gửi được quay lại buffer để lần flush sau gửi tiếp
+                with self._lock:
+                    for param in params:
+                        self._params.setdefault(param.key, param.value)
+                    for tag in tags:
+                        self._tags.setdefault(tag.key, tag.value)
+                    self._metrics[:0] = metrics
+
+
+_tracker = None
+_tracker_lock = threading.Lock()
+
+
+def get_tracker() -> Tracker:
+    """Tracker dùng chung trong process (run đang active của MLflow là trạng thái toàn cục)"""
+    global _tracker
+    with _tracker_lock:
+        if _tracker is None:
+            _tracker = Tracker()
+        return _tracker
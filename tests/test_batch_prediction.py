@@ -0,0 +1,94 @@
+import os
+import pickle
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from omegaconf import OmegaConf
+from sklearn.linear_model import LogisticRegression
+from src.data import DataStorage
+from src.pipeline import batch_prediction_pipeline
+from src.pipeline.batch_prediction_pipeline import batch_predict_pipeline
+from tests.test_serving_artifacts import FEATURE_COLS, make_dataset
+
+
+class LocalDVCManager:
+    """Artifact đã nằm sẵn trong thư mục test, không cần pull"""
+
+    def sync(self, targets, jobs=None, remote=None, force=False):
+        return []
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_prediction_pipeline, "get_dvc_manager", LocalDVCManager)
+    X, scaler, label_encoder, y = make_dataset(3)
+    model = LogisticRegression(max_iter=1000).fit(scaler.transform(X), y)
+    (tmp_path / "models").mkdir()
+    (tmp_path / "transformed").mkdir()
+    with open(tmp_path / "models" / "model.pkl", "wb") as f:
+        pickle.dump(model, f)
+    joblib.dump(scaler, tmp_path / "transformed" / "scaler.joblib")
+    joblib.dump(label_encoder, tmp_path / "transformed" / "label_encoder.joblib")
+    return OmegaConf.create({
+        "paths": {"models_dir": str(tmp_path / "models")},
+        "data": {"transformed_data_path": str(tmp_path / "transformed"), "id_col": "Id"},
+        "training": {},
+        "dvc": {"jobs": None, "remote": None},
+        "batch_prediction": {
+            "chunk_size": 7, "n_workers": 1, "max_pending": 2,
+            "probabilities": False, "progress_interval": 10.0,
+        },
+    })
+
+
+def write_input(path, n_rows):
+    X = make_dataset(3)[0].iloc[:n_rows]
+    # Id không theo thứ tự để kiểm tra output giữ đúng thứ tự dòng của input
+    df = X.assign(Id=np.arange(n_rows)[::-1] + 100)[["Id", *FEATURE_COLS]]
+    with DataStorage.open_file_writer(str(path)) as writer:
+        writer.write(df)
+    return df
+
+
+def load_artifacts(config):
+    with open(os.path.join(config.paths.models_dir, "model.pkl"), "rb") as f:
+        model = pickle.load(f)
+    scaler = joblib.load(os.path.join(config.data.transformed_data_path, "scaler.joblib"))
+    label_encoder = joblib.load(os.path.join(config.data.transformed_data_path, "label_encoder.joblib"))
+    return model, scaler, label_encoder
+
+
+def test_predictions_keep_input_order_with_proba(tmp_path, config):
+    df = write_input(tmp_path / "input.csv", 30)
+
+    summary = batch_predict_pipeline(
+        config, str(tmp_path / "input.csv"), str(tmp_path / "output.parquet"), with_proba=True
+    )
+
+    assert summary["rows"] == 30 and summary["chunks"] == 5
+    output = pd.read_parquet(tmp_path / "output.parquet")
+    model, scaler, label_encoder = load_artifacts(config)
+    X_scaled = scaler.transform(df[FEATURE_COLS])
+    np.testing.assert_array_equal(output["Id"], df["Id"])
+    np.testing.assert_array_equal(output["label_code"], model.predict(X_scaled))
+    np.testing.assert_array_equal(output["label_text"], label_encoder.inverse_transform(model.predict(X_scaled)))
+    proba_cols = [f"proba_{label}" for label in label_encoder.inverse_transform(model.classes_)]
+    np.testing.assert_allclose(output[proba_cols].to_numpy(), model.predict_proba(X_scaled))
+    assert not os.path.exists(tmp_path / "output.tmp.parquet")
+
+
+@pytest.mark.parametrize("extension", [".csv", ".parquet", ".feather"])
+def test_empty_input_writes_empty_output_with_schema(tmp_path, config, extension):
+    input_path = tmp_path / f"input{extension}"
+    write_input(input_path, 0)
+
+    summary = batch_predict_pipeline(config, str(input_path), str(tmp_path / f"output{extension}"), with_proba=True)
+
+    assert summary["rows"] == 0
+    output = DataStorage.read_file(str(tmp_path / f"output{extension}"))
+    _, _, label_encoder = load_artifacts(config)
+    assert len(output) == 0
+    assert list(output.columns) == [
+        "Id", "label_code", "label_text", *(f"proba_{label}" for label in label_encoder.classes_)
+    ]
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.load_test import build_corpus, summarize
+from benchmarks.synthetic_data import FEATURE_COLS, generate_dataset, parse_rows
+
+
+def test_synthetic_data_schema_and_balance(tmp_path):
+    assert parse_rows("10k") == 10000 and parse_rows("1M") == 1000000
+    path = generate_dataset(
+        str(tmp_path / "synthetic.csv"), 20000, class_weights=[0.7, 0.2, 0.1],
+        extra_features=2, chunk_size=7000,
+    )
+    df = pd.read_csv(path)
+    assert list(df.columns) == ["Id", *FEATURE_COLS, "Feature1", "Feature2", "Species"]
+    assert df["Id"].tolist() == list(range(1, 20001))
+    shares = df["Species"].value_counts(normalize=True)
+    np.testing.assert_allclose(shares[["Iris-setosa", "Iris-versicolor", "Iris-virginica"]], [0.7, 0.2, 0.1], atol=0.02)
+    assert (df[FEATURE_COLS] > 0).all().all()
+
+
+def test_load_test_summary_per_endpoint():
+    corpus = build_corpus(200, seed=0)
+    assert {entry["path"] for entry in corpus} == {"/predict", "/health", "/cache"}
+    samples = [("POST /predict", 200, i / 1000) for i in range(1, 101)] + [("GET /health", "ConnectTimeout", 1.0)]
+    summary = summarize(samples, elapsed=2.0)
+    predict = summary["POST /predict"]
+    assert (predict["p50_ms"], predict["p95_ms"], predict["p99_ms"]) == pytest.approx((50.0, 95.0, 99.0))
+    assert predict["throughput_rps"] == 50.0 and predict["error_rate"] == 0.0
+    assert summary["GET /health"]["error_rate"] == 1.0
+    assert summary["total"]["requests"] == 101 and summary["total"]["errors"] == 1
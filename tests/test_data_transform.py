@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+from omegaconf import OmegaConf
+from src.data import data_transform
+from src.data.data_transform import DataTransformer
+from src.data.storage import DataStorage
+from benchmarks.synthetic_data import generate_chunk
+
+LABEL_COL = "Species"
+
+
+def make_config(tmp_path, storage_format, streaming, chunk_size=17):
+    return OmegaConf.create({"data": {
+        "processed_data_path": str(tmp_path / "processed"),
+        "transformed_data_path": str(tmp_path / ("streaming" if streaming else "in_memory")),
+        "data_file": "Iris.csv",
+        "label_col": LABEL_COL,
+        "storage_format": storage_format,
+        "streaming": streaming,
+        "chunk_size": chunk_size,
+    }})
+
+
+@pytest.fixture(autouse=True)
+def no_tracking(monkeypatch):
+    monkeypatch.setattr(data_transform.tracker, "log_artifacts", lambda *args, **kwargs: None)
+
+
+@pytest.mark.parametrize("storage_format", ["csv", "parquet", "feather"])
+def test_streaming_matches_in_memory_transformation(tmp_path, storage_format):
+    storage = DataStorage(storage_format)
+    (tmp_path / "processed").mkdir()
+    rng = np.random.default_rng(0)
+    for name, rows in [("train", 120), ("val", 30), ("test", 25)]:
+        df = generate_chunk(rng, rows, extra_features=2).drop(columns="Id")
+        if name == "train":
+            # Chunk đầu của train chỉ có một class: tập class phải được gom qua mọi chunk
+            df = df.sort_values(LABEL_COL, ignore_index=True)
+        storage.write(df, str(tmp_path / "processed"), name)
+
+    in_memory = DataTransformer(make_config(tmp_path, storage_format, streaming=False))
+    in_memory.run_transformation()
+    streaming = DataTransformer(make_config(tmp_path, storage_format, streaming=True))
+    streaming.run_transformation()
+
+    np.testing.assert_allclose(streaming.scaler.mean_, in_memory.scaler.mean_)
+    np.testing.assert_allclose(streaming.scaler.scale_, in_memory.scaler.scale_)
+    assert streaming.scaler.n_samples_seen_ == in_memory.scaler.n_samples_seen_ == 120
+    np.testing.assert_array_equal(streaming.label_encoder.classes_, in_memory.label_encoder.classes_)
+    for name in ["train", "val", "test"]:
+        expected = storage.read(in_memory.transformed_data_path, f"{name}_transformed")
+        actual = storage.read(streaming.transformed_data_path, f"{name}_transformed")
+        pd.testing.assert_frame_equal(actual, expected, check_exact=False, rtol=1e-9)
@@ -0,0 +1,132 @@
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import pytest
+import yaml
+from src.data import dvc_manager
+from src.data.dvc_manager import DVCRemoteManager, VersioningQueue
+
+requires_dvc = pytest.mark.skipif(
+    subprocess.run([sys.executable, "-m", "dvc", "--version"], capture_output=True).returncode != 0,
+    reason="dvc is not installed",
+)
+
+
+def dvc(*args):
+    subprocess.run([sys.executable, "-m", "dvc", *args], check=True, capture_output=True)
+
+
+@pytest.fixture
+def dvc_repo(tmp_path, monkeypatch):
+    """Repo DVC (không git) với remote local, có data/processed và data/raw đã push"""
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    monkeypatch.chdir(repo)
+    # DVCRemoteManager gọi `dvc` qua PATH
+    monkeypatch.setenv("PATH", os.path.dirname(sys.executable) + os.pathsep + os.environ["PATH"])
+    dvc("init", "--no-scm")
+    dvc("remote", "add", "-d", "local", str(tmp_path / "remote"))
+    shutil.copy(os.path.join(os.path.dirname(__file__), os.pardir, ".dvcignore"), ".dvcignore")
+
+    os.makedirs("data/processed")
+    os.makedirs("data/raw")
+    for name in ["train", "val"]:
+        with open(f"data/processed/{name}.csv", "w") as f:
+            f.write(f"a,b\n1,{name}\n")
+    with open("data/processed/.stage_fingerprint", "w") as f:
+        f.write("old")
+    with open("data/raw/Iris.csv", "w") as f:
+        f.write("Id,Species\n1,Iris-setosa\n")
+    dvc("add", "data/processed", "data/raw/Iris.csv")
+    dvc("push")
+    return repo
+
+
+@requires_dvc
+def test_marker_is_not_versioned_and_does_not_make_dir_stale(dvc_repo):
+    manager = DVCRemoteManager()
+    # StageCache ghi lại marker sau mỗi lần chạy
+    with open("data/processed/.stage_fingerprint", "w") as f:
+        f.write("new")
+
+    with open("data/processed.dvc") as f:
+        assert yaml.safe_load(f)["outs"][0]["nfiles"] == 2
+    assert manager.is_current("data/processed")
+    assert manager.sync(["data/processed", "data/raw/Iris.csv"]) == []
+
+
+@requires_dvc
+def test_sync_pulls_only_stale_targets(dvc_repo):
+    manager = DVCRemoteManager()
+    os.remove("data/processed/val.csv")
+
+    assert not manager.is_current("data/processed")
+    assert manager.is_current("data/raw/Iris.csv")
+    assert manager.sync(["data/processed", "data/raw/Iris.csv"]) == [os.path.join("data", "processed.dvc")]
+    with open("data/processed/val.csv") as f:
+        assert f.read() == "a,b\n1,val\n"
+    assert manager.is_current("data/processed")
+
+
+def record_command(log_path, name):
+    """Lệnh thay cho dvc: ghi thời điểm bắt đầu/kết thúc để kiểm tra các lệnh có chồng nhau không"""
+    code = (
+        "import sys, time\n"
+        "log = open(sys.argv[1], 'a', buffering=1)\n"
+        "log.write(f'start {time.time()} {sys.argv[2]}\\n')\n"
+        "time.sleep(0.05)\n"
+        "log.write(f'end {time.time()} {sys.argv[2]}\\n')\n"
+    )
+    return [sys.executable, "-c", code, log_path, name]
+
+
+def patch_dvc(log_path, setattr=setattr):
+    run = subprocess.run
+    setattr(subprocess, "run", lambda command, check=True: run(
+        record_command(log_path, " ".join(command[:2])), check=check
+    ))
+    setattr(DVCRemoteManager, "is_current", lambda self, target: False)
+
+
+def run_job_commands(log_path):
+    """Một job trong worker process: pull input rồi add output"""
+    patch_dvc(log_path)
+    manager = dvc_manager.get_dvc_manager()
+    manager.sync(["data/raw/Iris.csv"])
+    manager.add_files(["data/processed"])
+
+
+def test_dvc_commands_never_overlap(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(".dvc")
+    open(".dvc/config", "w").close()
+    log_path = str(tmp_path / "commands.log")
+    patch_dvc(log_path, monkeypatch.setattr)
+    monkeypatch.setattr(dvc_manager, "_manager", DVCRemoteManager())
+    queue = VersioningQueue()
+    queue.register("data/processed")
+
+    # Push chạy nền trong server trong khi các job ở process khác pull và add
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=run_job_commands, args=(log_path,)) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    future = queue.flush(background=True)
+    thread = threading.Thread(target=dvc_manager.get_dvc_manager().sync, args=(["models/model.pkl.dvc"],))
+    thread.start()
+    for worker in workers:
+        worker.join()
+    thread.join()
+    future.result()
+
+    with open(log_path) as f:
+        events = sorted((float(line.split()[1]), line.split()[0]) for line in f)
+    assert len(events) == 2 * (3 * 2 + 3)
+    running = 0
+    for _, kind in events:
+        running += 1 if kind == "start" else -1
+        assert running <= 1
+    assert all(worker.exitcode == 0 for worker in workers)
@@ -0,0 +1,103 @@
+import threading
+import time
+from concurrent.futures import Future
+from omegaconf import OmegaConf
+from src.pipeline.job_runner import JobRunner
+
+
+def make_runner(max_concurrency: int = 1, max_workers: int = 1) -> JobRunner:
+    return JobRunner(OmegaConf.create({
+        "jobs": {
+            "max_workers": max_workers,
+            "max_history": 100,
+            "pipelines": {"prediction": {"executor": "thread", "max_concurrency": max_concurrency}},
+        },
+    }))
+
+
+class InlineExecutor:
+    """Chạy job ngay trong submit: future trả về đã xong trước khi có callback"""
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        future.set_result(fn(*args, **kwargs))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+def wait_until(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_already_finished_jobs_do_not_deadlock():
+    runner = make_runner()
+    runner._executors["thread"] = InlineExecutor()
+    jobs = []
+    # Chạy trong thread riêng để test báo lỗi thay vì treo khi bị deadlock
+    submitter = threading.Thread(
+        target=lambda: jobs.extend(runner.submit("prediction", lambda i=i: i) for i in range(5)), daemon=True
+    )
+    submitter.start()
+    submitter.join(timeout=5)
+    assert not submitter.is_alive()
+    assert [job.status for job in jobs] == ["succeeded"] * 5
+    assert [job.result for job in jobs] == list(range(5))
+
+
+def test_queued_jobs_run_after_running_ones():
+    runner = make_runner(max_concurrency=1, max_workers=2)
+    release = threading.Event()
+    first = runner.submit("prediction", release.wait)
+    second = runner.submit("prediction", lambda: "done")
+    assert second.status == "queued"
+    release.set()
+    assert wait_until(lambda: second.done)
+    assert (first.status, second.status, second.result) == ("succeeded", "succeeded", "done")
+    runner.shutdown()
+
+
+def test_jobs_cancelled_at_shutdown_are_failed():
+    runner = make_runner(max_concurrency=2, max_workers=1)
+    release = threading.Event()
+    running = runner.submit("prediction", release.wait)
+    # Đã được submit nhưng còn chờ trong executor (chỉ có 1 worker)
+    waiting = runner.submit("prediction", lambda: "never")
+    runner.shutdown(wait=False)
+    release.set()
+    assert wait_until(lambda: running.done and waiting.done)
+    assert running.status == "succeeded"
+    assert waiting.status == "failed" and "cancelled" in waiting.error
+
+
+def test_job_types_of_a_group_share_the_limit():
+    runner = JobRunner(OmegaConf.create({
+        "jobs": {
+            "max_workers": 2,
+            "max_history": 100,
+            "groups": {"artifacts": {"max_concurrency": 1}},
+            "pipelines": {
+                "training": {"executor": "thread", "group": "artifacts"},
+                "full": {"executor": "thread", "group": "artifacts"},
+                "prediction": {"executor": "thread", "max_concurrency": 1},
+            },
+        },
+    }))
+    release = threading.Event()
+    full = runner.submit("full", release.wait)
+    training = runner.submit("training", lambda: "trained")
+    # Loại job ngoài group không phải chờ
+    prediction = runner.submit("prediction", lambda: "predicted")
+    assert wait_until(lambda: prediction.done)
+    assert (full.status, training.status) == ("running", "queued")
+    release.set()
+    assert wait_until(lambda: training.done)
+    assert (full.status, training.status, training.result) == ("succeeded", "succeeded", "trained")
+    assert training.started_at >= full.finished_at
+    runner.shutdown()
@@ -0,0 +1,41 @@
+import logging
+import threading
+import time
+from src.utils import LazyMessage, configure_logging, get_logger
+
+
+def make_logger(monkeypatch, name: str, level: str) -> logging.Logger:
+    # Handler bắt log của pytest trên root logger làm get_logger không tạo handler
+    # (hasHandlers() xét cả logger cha) và format record ngay trên thread gọi log
+    monkeypatch.setattr(logging.getLogger(), "handlers", [])
+    logger = get_logger(name, global_file_log=False, async_mode=True, level=level)
+    monkeypatch.setattr(logger, "propagate", False)
+    return logger
+
+
+def wait_until(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_lazy_message_below_level_is_never_formatted(monkeypatch):
+    logger = make_logger(monkeypatch, "test_lazy_disabled", "INFO")
+    calls = []
+    logger.debug("values: %s", LazyMessage(lambda: calls.append("debug") or "expensive"))
+    configure_logging("test_lazy_disabled", level="WARNING")
+    logger.info("values: %s", LazyMessage(lambda: calls.append("info") or "expensive"))
+    logger.warning("flushed")
+    time.sleep(0.1)
+    assert calls == []
+
+
+def test_lazy_message_is_formatted_on_the_listener_thread(monkeypatch):
+    logger = make_logger(monkeypatch, "test_lazy_enabled", "DEBUG")
+    threads = []
+    logger.debug("values: %s", LazyMessage(lambda: threads.append(threading.current_thread()) or "expensive"))
+    assert wait_until(lambda: threads)
+    assert threads[0] is not threading.current_thread()
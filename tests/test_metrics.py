@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from sklearn import metrics as sk_metrics
+from src.models.metrics import ConfusionMatrix, compute_metrics
+
+SKLEARN_METRICS = {
+    "precision": sk_metrics.precision_score,
+    "recall": sk_metrics.recall_score,
+    "f1": sk_metrics.f1_score,
+}
+
+
+def make_labels(kind, n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    y_true = rng.integers(0, 3, n)
+    y_pred = np.where(rng.random(n) < 0.7, y_true, rng.integers(0, 3, n))
+    # Class 2 không bao giờ được dự đoán
+    y_pred[y_pred == 2] = 1
+    if kind == "encoded":
+        # Label 0..k-1 của LabelEncoder: nhánh np.bincount trực tiếp
+        return y_true, y_pred
+    if kind == "sparse_int":
+        # Label nguyên lớn (k * k > số mẫu): nhánh np.unique
+        values = np.array([3, 70, 1000])
+        return values[y_true], values[y_pred]
+    values = np.array(["Iris-setosa", "Iris-versicolor", "Iris-virginica"])
+    return values[y_true], values[y_pred]
+
+
+@pytest.mark.parametrize("kind", ["encoded", "sparse_int", "string"])
+@pytest.mark.parametrize("metric", ["precision", "recall", "f1"])
+@pytest.mark.parametrize("average", ["macro", "micro", "weighted"])
+def test_averaged_metrics_match_sklearn(kind, metric, average):
+    y_true, y_pred = make_labels(kind)
+    expected = SKLEARN_METRICS[metric](y_true, y_pred, average=average, zero_division=0)
+
+    assert compute_metrics(y_true, y_pred, [f"{metric}_{average}"])[f"{metric}_{average}"] == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("kind", ["encoded", "sparse_int", "string"])
+@pytest.mark.parametrize("metric", ["precision", "recall", "f1"])
+def test_per_class_metrics_match_sklearn(kind, metric):
+    y_true, y_pred = make_labels(kind)
+    labels = np.unique(np.concatenate([y_true, y_pred]))
+    expected = SKLEARN_METRICS[metric](y_true, y_pred, labels=labels, average=None, zero_division=0)
+
+    results = compute_metrics(y_true, y_pred, [f"{metric}_per_class"])
+    assert results == pytest.approx({f"{metric}.{label}": value for label, value in zip(labels, expected)})
+    # Metric không có hậu tố là macro
+    assert compute_metrics(y_true, y_pred, [metric])[metric] == pytest.approx(
+        SKLEARN_METRICS[metric](y_true, y_pred, average="macro", zero_division=0)
+    )
+
+
+@pytest.mark.parametrize("kind", ["encoded", "sparse_int", "string"])
+def test_accuracy_and_confusion_matrix_match_sklearn(kind):
+    y_true, y_pred = make_labels(kind)
+    cm = ConfusionMatrix(y_true, y_pred)
+
+    np.testing.assert_array_equal(cm.labels, np.unique(np.concatenate([y_true, y_pred])))
+    np.testing.assert_array_equal(cm.matrix, sk_metrics.confusion_matrix(y_true, y_pred))
+    assert cm.metric("accuracy") == pytest.approx(sk_metrics.accuracy_score(y_true, y_pred))
+
+
+def test_encoded_labels_absent_from_both_sides_are_dropped():
+    # Label 1 không xuất hiện: sklearn cũng bỏ qua nó khi tính macro
+    y_true = np.array([0, 0, 2, 2, 3])
+    y_pred = np.array([0, 2, 2, 2, 0])
+
+    assert list(ConfusionMatrix(y_true, y_pred).labels) == [0, 2, 3]
+    assert compute_metrics(y_true, y_pred, ["f1_macro"])["f1_macro"] == pytest.approx(
+        sk_metrics.f1_score(y_true, y_pred, average="macro", zero_division=0)
+    )
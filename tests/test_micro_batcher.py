@@ -0,0 +1,131 @@
+import asyncio
+import numpy as np
+import pytest
+from src.pipeline.micro_batcher import MicroBatcher
+
+
+def make_batcher(calls, max_batch_size=64, max_wait_ms=50.0, error=None):
+    def predict_fn(X):
+        calls.append(len(X))
+        if error is not None:
+            raise error
+        return {"label_code": X[:, 0].astype(int), "row_sum": X.sum(axis=1)}
+
+    return MicroBatcher(predict_fn, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+
+
+async def predict_all(batcher, requests):
+    await batcher.start()
+    try:
+        return await asyncio.gather(*(batcher.predict(rows) for rows in requests), return_exceptions=True)
+    finally:
+        await batcher.stop()
+
+
+def test_concurrent_requests_are_coalesced_and_split_back():
+    calls = []
+    requests = [[[i, 1.0], [i, 2.0]] if i % 2 else [[i, 0.5]] for i in range(10)]
+
+    results = asyncio.run(predict_all(make_batcher(calls), requests))
+
+    assert calls == [15]
+    for rows, result in zip(requests, results):
+        np.testing.assert_array_equal(result["label_code"], [row[0] for row in rows])
+        np.testing.assert_allclose(result["row_sum"], np.sum(rows, axis=1))
+
+
+def test_batch_is_closed_at_max_batch_size():
+    calls = []
+    requests = [[[i, 0.0]] for i in range(10)]
+
+    asyncio.run(predict_all(make_batcher(calls, max_batch_size=4), requests))
+
+    assert calls == [4, 4, 2]
+
+
+def test_partial_batch_is_flushed_after_max_wait():
+    calls = []
+
+    async def run():
+        batcher = make_batcher(calls, max_wait_ms=20.0)
+        await batcher.start()
+        try:
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            result = await asyncio.wait_for(batcher.predict([[1.0, 2.0]]), timeout=1.0)
+            elapsed = loop.time() - start
+            # Request tới sau khi batch trước đã đóng nằm ở batch mới
+            await batcher.predict([[2.0, 2.0]])
+        finally:
+            await batcher.stop()
+        return result, elapsed
+
+    result, elapsed = asyncio.run(run())
+
+    assert calls == [1, 1]
+    np.testing.assert_array_equal(result["label_code"], [1])
+    assert 0.015 <= elapsed < 0.5
+
+
+def test_predict_error_reaches_every_waiter():
+    calls = []
+    error = ValueError("model failed")
+    requests = [[[i, 0.0]] for i in range(5)]
+
+    results = asyncio.run(predict_all(make_batcher(calls, error=error), requests))
+
+    assert calls == [5]
+    assert all(result is error for result in results)
+
+
+def test_batcher_keeps_serving_after_a_failed_batch():
+    calls = []
+    failures = [ValueError("model failed")]
+
+    def predict_fn(X):
+        calls.append(len(X))
+        if failures:
+            raise failures.pop()
+        return {"label_code": X[:, 0].astype(int)}
+
+    async def run():
+        batcher = MicroBatcher(predict_fn, max_wait_ms=5.0)
+        await batcher.start()
+        try:
+            with pytest.raises(ValueError):
+                await batcher.predict([[1.0]])
+            return await batcher.predict([[2.0]])
+        finally:
+            await batcher.stop()
+
+    result = asyncio.run(run())
+
+    assert calls == [1, 1]
+    np.testing.assert_array_equal(result["label_code"], [2])
+
+
+def test_batcher_keeps_serving_after_a_malformed_request():
+    calls = []
+
+    async def run():
+        batcher = make_batcher(calls, max_wait_ms=20.0)
+        await batcher.start()
+        try:
+            with pytest.raises(ValueError):
+                await batcher.predict([1.0, 2.0])
+            # Số cột khác nhau: cùng batch nên không ghép được thành một mảng
+            mismatched = await asyncio.wait_for(
+                asyncio.gather(batcher.predict([[1.0, 2.0]]), batcher.predict([[1.0, 2.0, 3.0]]),
+                               return_exceptions=True),
+                timeout=1.0,
+            )
+            result = await asyncio.wait_for(batcher.predict([[3.0, 4.0]]), timeout=1.0)
+        finally:
+            await batcher.stop()
+        return mismatched, result
+
+    mismatched, result = asyncio.run(run())
+
+    assert all(isinstance(error, ValueError) for error in mismatched)
+    assert calls == [1]
+    np.testing.assert_array_equal(result["row_sum"], [7.0])
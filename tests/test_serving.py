@@ -0,0 +1,102 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+import numpy as np
+from omegaconf import OmegaConf
+from src.models import model_store as model_store_module
+from src.models.model_store import ModelStore
+from src.models.prediction_cache import PredictionCache
+
+
+def test_serve_does_not_import_training_stack():
+    # Chạy trong process mới vì các test khác đã import sklearn
+    code = (
+        "import sys, serve; "
+        "from benchmarks.startup_benchmark import FORBIDDEN; "
+        "print('forbidden=' + ','.join(name for name in FORBIDDEN if name in sys.modules))"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True
+    ).stdout
+    assert output.strip().splitlines()[-1] == "forbidden="
+
+
+def test_prediction_cache_scores_only_misses_in_order():
+    cache = PredictionCache(max_entries=3)
+    calls = []
+
+    def predict_fn(X):
+        calls.append(X.copy())
+        return {"label_code": X[:, 0].astype(int), "label_text": np.array([f"c{int(x)}" for x in X[:, 0]])}
+
+    first = cache.predict([[1.0, 0.0], [2.0, 0.0], [1.0, 0.0]], 1, predict_fn)
+    np.testing.assert_array_equal(first["label_code"], [1, 2, 1])
+    # Dòng trùng trong cùng batch chỉ được predict một lần
+    assert len(calls[-1]) == 2
+
+    second = cache.predict([[3.0, -0.0], [2.0, 0.0], [1.0, 0.0]], 1, predict_fn)
+    np.testing.assert_array_equal(second["label_code"], [3, 2, 1])
+    np.testing.assert_array_equal(second["label_text"], ["c3", "c2", "c1"])
+    np.testing.assert_array_equal(calls[-1], [[3.0, 0.0]])
+    assert cache.stats()["hits"] == 2
+
+    cache.predict([[4.0, 0.0]], 1, predict_fn)
+    assert cache.stats()["evictions"] == 1
+
+    # Model mới: cache cũ bị bỏ
+    cache.predict([[1.0, 0.0]], 2, predict_fn)
+    assert cache.stats()["invalidations"] == 1
+    assert cache.stats()["size"] == 1
+
+
+def test_prediction_cache_ttl():
+    cache = PredictionCache(ttl_seconds=0.01, decimals=2)
+
+    def predict_fn(X):
+        return {"label_code": np.zeros(len(X), dtype=int)}
+
+    cache.predict([[1.001]], 1, predict_fn)
+    cache.predict([[1.0]], 1, predict_fn)
+    assert cache.stats()["hits"] == 1
+    time.sleep(0.02)
+    cache.predict([[1.0]], 1, predict_fn)
+    assert cache.stats()["expirations"] == 1
+
+
+def test_model_store_watcher_reloads_off_the_calling_thread(tmp_path, monkeypatch):
+    monkeypatch.setattr(model_store_module, "ModelEvaluation", lambda config: object())
+    config = OmegaConf.create({
+        "paths": {"models_dir": str(tmp_path)},
+        "data": {"transformed_data_path": str(tmp_path)},
+        "serving": {"reload_check_interval": 0.01, "model_format": "pickle"},
+    })
+    store = ModelStore(config)
+    for path in store.artifact_paths():
+        with open(path, "wb") as f:
+            f.write(b"v1")
+    store.load()
+    reads = []
+    read_signature = store._read_signature
+
+    def record_read():
+        reads.append(threading.current_thread())
+        return read_signature()
+
+    monkeypatch.setattr(store, "_read_signature", record_read)
+
+    store.start_watcher()
+    try:
+        with open(store.artifact_paths()[0], "wb") as f:
+            f.write(b"version 2")
+        deadline = time.monotonic() + 5
+        while store.version < 2 and time.monotonic() < deadline:
+            store.get()
+            time.sleep(0.005)
+    finally:
+        store.stop_watcher()
+
+    assert store.version == 2
+    assert reads and threading.main_thread() not in reads
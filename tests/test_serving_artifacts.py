@@ -0,0 +1,115 @@
+import pickle
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.datasets import make_classification
+from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+from sklearn.svm import SVC, LinearSVC
+from sklearn.tree import DecisionTreeClassifier
+from src.models.compiled_scorer import CompiledScorer, compile_model, export_compiled_model, load_compiled_model
+from src.models.model_bundle import ModelBundle, export_model_bundle, load_model_bundle
+
+FEATURE_COLS = ["SepalLengthCm", "SepalWidthCm", "PetalLengthCm", "PetalWidthCm"]
+MODELS = [
+    lambda: RandomForestClassifier(n_estimators=30, random_state=0),
+    lambda: ExtraTreesClassifier(n_estimators=10, random_state=0),
+    lambda: DecisionTreeClassifier(random_state=0),
+    lambda: LogisticRegression(max_iter=1000),
+    lambda: LinearSVC(),
+    lambda: SVC(kernel="linear"),
+]
+
+
+def make_dataset(n_classes: int):
+    X, y = make_classification(
+        n_samples=1500, n_features=4, n_informative=3, n_redundant=0,
+        n_classes=n_classes, random_state=0,
+    )
+    # Feature có scale/offset khác nhau để scaler thực sự có tác dụng
+    X = pd.DataFrame(X * [1.0, 10.0, 100.0, 0.1] + [5.0, -3.0, 40.0, 1.0], columns=FEATURE_COLS)
+    labels = np.array(["Iris-setosa", "Iris-versicolor", "Iris-virginica"])[y]
+    scaler = StandardScaler().fit(X)
+    label_encoder = LabelEncoder().fit(labels)
+    return X, scaler, label_encoder, label_encoder.transform(labels)
+
+
+@pytest.mark.parametrize("n_classes", [2, 3])
+@pytest.mark.parametrize("build_model", MODELS)
+def test_compiled_scorer_matches_sklearn(tmp_path, build_model, n_classes):
+    X, scaler, label_encoder, y = make_dataset(n_classes)
+    model = build_model().fit(scaler.transform(X), y)
+
+    compiled_path = str(tmp_path / "model_compiled.npz")
+    compile_model(model, scaler, label_encoder).save(compiled_path)
+    scorer = CompiledScorer.load(compiled_path)
+    y_pred = scorer.predict(X)
+
+    expected = model.predict(scaler.transform(X))
+    np.testing.assert_array_equal(y_pred["label_code"], expected)
+    np.testing.assert_array_equal(y_pred["label_text"], label_encoder.inverse_transform(expected))
+    assert scorer.feature_names == FEATURE_COLS
+
+
+def test_compile_unsupported_model():
+    X, scaler, label_encoder, y = make_dataset(3)
+    model = KNeighborsClassifier().fit(scaler.transform(X), y)
+    with pytest.raises(NotImplementedError):
+        compile_model(model, scaler, label_encoder)
+
+
+def write_sources(directory, model, scaler, label_encoder):
+    """Ghi model.pkl, scaler.joblib, label_encoder.joblib như training, trả về đường dẫn theo thứ tự đó"""
+    paths = [str(directory / name) for name in ["model.pkl", "scaler.joblib", "label_encoder.joblib"]]
+    with open(paths[0], "wb") as f:
+        pickle.dump(model, f)
+    joblib.dump(scaler, paths[1])
+    joblib.dump(label_encoder, paths[2])
+    return paths
+
+
+@pytest.mark.parametrize("changed", ["model", "scaler", "label_encoder"])
+@pytest.mark.parametrize("export, load", [
+    (export_compiled_model, load_compiled_model),
+    (lambda *args: export_model_bundle(*args, model_name="model"), load_model_bundle),
+])
+def test_serving_artifact_is_stale_when_any_source_changes(tmp_path, changed, export, load):
+    X, scaler, label_encoder, y = make_dataset(3)
+    model = LogisticRegression(max_iter=1000).fit(scaler.transform(X), y)
+    source_paths = write_sources(tmp_path, model, scaler, label_encoder)
+    export(source_paths, model, scaler, label_encoder)
+    assert load(source_paths) is not None
+
+    # Chạy lại transformation/training với dữ liệu khác
+    artifacts = {"model": model, "scaler": scaler, "label_encoder": label_encoder}
+    artifacts[changed] = {
+        "model": lambda: LogisticRegression(C=0.01, max_iter=1000).fit(scaler.transform(X), y),
+        "scaler": lambda: StandardScaler().fit(X * 2),
+        "label_encoder": lambda: LabelEncoder().fit(["a", "b", "c"]),
+    }[changed]()
+    write_sources(tmp_path, *artifacts.values())
+
+    assert load(source_paths) is None
+
+
+@pytest.mark.parametrize("build_model", [MODELS[0], lambda: KNeighborsClassifier()])
+def test_model_bundle_roundtrip(tmp_path, build_model):
+    X, scaler, label_encoder, y = make_dataset(3)
+    model = build_model().fit(scaler.transform(X), y)
+
+    bundle_path = str(tmp_path / "model.bundle")
+    ModelBundle.build(model, scaler, label_encoder, "model", "Species").save(bundle_path)
+    bundle = ModelBundle.load(bundle_path, mmap_mode="r")
+
+    expected = model.predict(scaler.transform(X))
+    np.testing.assert_array_equal(bundle.predict(X)["label_code"], expected)
+    np.testing.assert_array_equal(bundle.model.predict(scaler.transform(X)), expected)
+    # Mảng của scaler và của model được mmap thay vì copy vào từng process
+    assert isinstance(bundle.scaler.mean_, np.memmap)
+    if isinstance(bundle.model, KNeighborsClassifier):
+        assert isinstance(bundle.model._fit_X, np.memmap)
+    assert bundle.feature_names == FEATURE_COLS
+    assert bundle.schema["labels"] == list(label_encoder.classes_)
@@ -0,0 +1,108 @@
+import os
+import mlflow
+import pandas as pd
+import pytest
+from omegaconf import OmegaConf
+from benchmarks.synthetic_data import generate_dataset
+from src.pipeline.data_pipeline import run_data_stages
+from src.pipeline.stage_cache import StageCache
+from src.pipeline.stage_context import StageContext
+from src.utils import get_tracker
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    uri = (tmp_path / "mlruns").as_uri()
+    monkeypatch.setenv("MLFLOW_TRACKING_URI", uri)
+    mlflow.set_tracking_uri(uri)
+    generate_dataset(str(tmp_path / "raw" / "Iris.csv"), 150)
+    yield OmegaConf.create({
+        "data": {
+            "raw_data_path": str(tmp_path / "raw"),
+            "processed_data_path": str(tmp_path / "processed"),
+            "transformed_data_path": str(tmp_path / "transformed"),
+            "data_file": "Iris.csv",
+            "label_col": "Species",
+            "id_col": "Id",
+            "train_ratio": 0.8,
+            "val_ratio": 0.1,
+            "test_ratio": 0.1,
+            "random_state": 42,
+            "storage_format": "csv",
+            "streaming": False,
+            "chunk_size": 1000,
+        },
+        "stage_cache": {"enabled": True, "dir": str(tmp_path / ".cache" / "stages"), "max_entries": 5},
+    })
+    mlflow.set_tracking_uri(None)
+
+
+def run_stages(config):
+    """Ingestion + transformation như data_preprocessing_pipeline, không có DVC"""
+    cache = StageCache(config)
+    with get_tracker().start_run(run_name="test"), StageContext() as context:
+        run_data_stages(config, context, cache)
+        context.wait()
+        cache.commit()
+    return cache.results
+
+
+def read_outputs(config):
+    return {
+        name: pd.read_csv(os.path.join(directory, f"{name}.csv"))
+        for directory, names in [
+            (config.data.processed_data_path, ["train", "val", "test"]),
+            (config.data.transformed_data_path, ["train_transformed", "test_transformed"]),
+        ]
+        for name in names
+    }
+
+
+def test_fingerprint_depends_on_stage_version_config_and_input(config):
+    cache = StageCache(config)
+    fingerprint = cache.fingerprint("ingestion", 1, "raw-md5", config.data)
+
+    assert cache.fingerprint("ingestion", 1, "raw-md5", OmegaConf.create(config.data)) == fingerprint
+    assert cache.fingerprint("ingestion", 2, "raw-md5", config.data) != fingerprint
+    assert cache.fingerprint("ingestion", 1, "other-md5", config.data) != fingerprint
+    changed = OmegaConf.merge(config.data, {"random_state": 7})
+    assert cache.fingerprint("ingestion", 1, "raw-md5", changed) != fingerprint
+
+
+def test_second_run_restores_outputs_from_the_cache(config):
+    assert run_stages(config) == {"ingestion": "miss", "transformation": "miss"}
+    expected = read_outputs(config)
+    for directory in [config.data.processed_data_path, config.data.transformed_data_path]:
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+
+    assert run_stages(config) == {"ingestion": "hit", "transformation": "hit"}
+    actual = read_outputs(config)
+    for name, df in expected.items():
+        pd.testing.assert_frame_equal(actual[name], df)
+    assert os.path.exists(os.path.join(config.data.transformed_data_path, "scaler.joblib"))
+    assert StageCache.read_marker(config.data.processed_data_path) is not None
+
+
+def test_config_change_misses_every_downstream_stage(config):
+    run_stages(config)
+    changed = OmegaConf.merge(config, {"data": {"random_state": 7}})
+
+    assert run_stages(changed) == {"ingestion": "miss", "transformation": "miss"}
+    # Entry của config cũ vẫn còn trong cache
+    assert run_stages(config) == {"ingestion": "hit", "transformation": "hit"}
+
+
+def test_raw_data_change_misses(config):
+    run_stages(config)
+    generate_dataset(os.path.join(config.data.raw_data_path, "Iris.csv"), 150, random_state=7)
+
+    assert run_stages(config) == {"ingestion": "miss", "transformation": "miss"}
+
+
+def test_disabled_cache_always_misses(config):
+    config.stage_cache.enabled = False
+    run_stages(config)
+
+    assert run_stages(config) == {"ingestion": "miss", "transformation": "miss"}
+    assert not os.path.exists(config.stage_cache.dir)
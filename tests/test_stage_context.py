@@ -0,0 +1,42 @@
+import threading
+import mlflow
+import pytest
+from mlflow.tracking import MlflowClient
+from src.pipeline.stage_context import StageContext
+from src.utils import get_tracker
+
+
+@pytest.fixture
+def tracking_uri(tmp_path, monkeypatch):
+    uri = (tmp_path / "mlruns").as_uri()
+    monkeypatch.setenv("MLFLOW_TRACKING_URI", uri)
+    mlflow.set_tracking_uri(uri)
+    yield uri
+    mlflow.set_tracking_uri(None)
+
+
+def test_persist_logs_into_the_run_active_at_submit(tracking_uri, tmp_path):
+    artifact_dir = tmp_path / "processed"
+    artifact_dir.mkdir()
+    (artifact_dir / "train.csv").write_text("a,b\n1,2\n")
+    release = threading.Event()
+
+    def save():
+        release.wait(5)
+        tracker = get_tracker()
+        tracker.log_artifacts(str(artifact_dir), artifact_path="processed_data")
+        tracker.log_params({"rows": 1})
+
+    with StageContext() as context:
+        with mlflow.start_run() as run:
+            context.persist(save)
+        # Run đã kết thúc trên thread gọi trước khi thao tác lưu chạy
+        release.set()
+    client = MlflowClient()
+
+    runs = client.search_runs([run.info.experiment_id])
+    assert [r.info.run_id for r in runs] == [run.info.run_id]
+    assert [a.path for a in client.list_artifacts(run.info.run_id, "processed_data")] == [
+        "processed_data/train.csv"
+    ]
+    assert runs[0].data.params == {"rows": "1"}
@@ -0,0 +1,151 @@
+import os
+from collections import Counter
+import mlflow
+import mlflow.sklearn
+import numpy as np
+import pytest
+from mlflow.tracking import MlflowClient
+from sklearn.linear_model import LogisticRegression
+from src.utils.tracking import Tracker
+
+
+@pytest.fixture
+def tracking_uri(tmp_path, monkeypatch):
+    uri = (tmp_path / "mlruns").as_uri()
+    monkeypatch.setenv("MLFLOW_TRACKING_URI", uri)
+    mlflow.set_tracking_uri(uri)
+    yield uri
+    mlflow.set_tracking_uri(None)
+
+
+def test_log_model_lands_in_the_tracker_run(tracking_uri, monkeypatch):
+    # Từ MLflow 2.18 run active là thread-local: gọi API fluent trên thread upload sẽ tạo run mới
+    def fluent_log_model(*args, **kwargs):
+        raise AssertionError("fluent mlflow.sklearn.log_model must not be used on upload threads")
+
+    monkeypatch.setattr(mlflow.sklearn, "log_model", fluent_log_model)
+    model = LogisticRegression().fit(np.array([[0.0], [1.0], [2.0], [3.0]]), [0, 0, 1, 1])
+    tracker = Tracker()
+    with tracker.start_run(run_name="test") as run:
+        tracker.log_model(model, "model", registered_model_name="test_model")
+    client = MlflowClient()
+
+    runs = client.search_runs([run.info.experiment_id])
+    # Upload trên thread nền không được tạo run thứ hai
+    assert [r.info.run_id for r in runs] == [run.info.run_id]
+    assert runs[0].info.status == "FINISHED"
+    assert "MLmodel" in [a.path.split("/")[-1] for a in client.list_artifacts(run.info.run_id, "model")]
+    versions = client.search_model_versions("name='test_model'")
+    assert [v.run_id for v in versions] == [run.info.run_id]
+    loaded = mlflow.sklearn.load_model(f"runs:/{run.info.run_id}/model")
+    np.testing.assert_array_equal(loaded.predict([[0.0], [3.0]]), [0, 1])
+
+
+@pytest.fixture
+def batches(monkeypatch):
+    """Ghi lại mọi lần gọi MlflowClient.log_batch"""
+    calls = []
+    log_batch = MlflowClient.log_batch
+
+    def spy(self, run_id, metrics=(), params=(), tags=(), **kwargs):
+        calls.append((list(metrics), list(params), list(tags)))
+        return log_batch(self, run_id, metrics=metrics, params=params, tags=tags, **kwargs)
+
+    monkeypatch.setattr(MlflowClient, "log_batch", spy)
+    return calls
+
+
+def make_tracker():
+    # Chỉ flush khi gọi flush() hoặc khi run kết thúc
+    return Tracker(max_buffer_size=10**6, flush_interval=3600)
+
+
+def test_buffered_logs_are_sent_with_log_batch(tracking_uri, batches, monkeypatch):
+    monkeypatch.setattr(MlflowClient, "log_param", lambda *args, **kwargs: pytest.fail("log_param called"))
+    monkeypatch.setattr(MlflowClient, "log_metric", lambda *args, **kwargs: pytest.fail("log_metric called"))
+    tracker = make_tracker()
+    with tracker.start_run(run_name="test") as run:
+        tracker.log_params({"model": "svm", "C": 1.0})
+        tracker.log_metric("accuracy", 0.9)
+        tracker.log_metric("loss", 0.5, step=3)
+        tracker.set_tag("stage", "training")
+        assert batches == []
+
+    assert len(batches) == 1
+    data = MlflowClient().get_run(run.info.run_id).data
+    assert data.params == {"model": "svm", "C": "1.0"}
+    assert data.metrics == {"accuracy": 0.9, "loss": 0.5}
+    assert data.tags["stage"] == "training"
+    assert [m.step for m in MlflowClient().get_metric_history(run.info.run_id, "loss")] == [3]
+
+
+def test_large_buffers_are_split_within_batch_limits(tracking_uri, batches):
+    tracker = make_tracker()
+    with tracker.start_run(run_name="test") as run:
+        tracker.log_params({f"param_{i}": i for i in range(250)})
+        tracker.set_tags({f"tag_{i}": i for i in range(120)})
+        for step in range(1500):
+            tracker.log_metric("loss", 1.0 / (step + 1), step=step)
+
+    for metrics, params, tags in batches:
+        assert len(params) <= Tracker.MAX_BATCH_PARAMS
+        assert len(tags) <= Tracker.MAX_BATCH_TAGS
+        assert len(metrics) + len(params) + len(tags) <= Tracker.MAX_BATCH_SIZE
+    assert sum(len(params) for _, params, _ in batches) == 250
+    client = MlflowClient()
+    data = client.get_run(run.info.run_id).data
+    assert len(data.params) == 250
+    assert len([key for key in data.tags if key.startswith("tag_")]) == 120
+    assert [m.step for m in client.get_metric_history(run.info.run_id, "loss")] == list(range(1500))
+
+
+def test_failed_batch_returns_to_the_buffer(tracking_uri, monkeypatch):
+    log_batch = MlflowClient.log_batch
+    failures = []
+
+    def flaky_log_batch(self, *args, **kwargs):
+        if not failures:
+            failures.append(True)
+            raise ConnectionError("tracking server unavailable")
+        return log_batch(self, *args, **kwargs)
+
+    monkeypatch.setattr(MlflowClient, "log_batch", flaky_log_batch)
+    tracker = make_tracker()
+    with tracker.start_run(run_name="test") as run:
+        tracker.log_params({"model": "svm"})
+        tracker.log_metric("accuracy", 0.9)
+        with pytest.raises(ConnectionError):
+            tracker.flush()
+        # Log mới sau lỗi không ghi đè giá trị đang chờ gửi lại
+        tracker.log_metric("accuracy", 0.95, step=1)
+
+    history = MlflowClient().get_metric_history(run.info.run_id, "accuracy")
+    assert sorted((m.step, m.value) for m in history) == [(0, 0.9), (1, 0.95)]
+    assert MlflowClient().get_run(run.info.run_id).data.params == {"model": "svm"}
+
+
+def test_unchanged_artifacts_are_uploaded_once(tracking_uri, tmp_path, monkeypatch):
+    uploads = []
+    log_artifact = MlflowClient.log_artifact
+
+    def spy(self, run_id, local_path, artifact_path=None):
+        uploads.append((os.path.basename(local_path), artifact_path))
+        return log_artifact(self, run_id, local_path, artifact_path)
+
+    monkeypatch.setattr(MlflowClient, "log_artifact", spy)
+    artifact_dir = tmp_path / "transformed"
+    artifact_dir.mkdir()
+    (artifact_dir / "train.csv").write_text("a\n1\n")
+    (artifact_dir / "test.csv").write_text("a\n2\n")
+    tracker = make_tracker()
+    with tracker.start_run(run_name="test") as run:
+        tracker.log_artifacts(str(artifact_dir), artifact_path="data")
+        tracker.wait_uploads()
+        (artifact_dir / "test.csv").write_text("a\n3\n")
+        tracker.log_artifacts(str(artifact_dir), artifact_path="data")
+        # Cùng nội dung nhưng khác đích vẫn được upload
+        tracker.log_artifact(str(artifact_dir / "train.csv"))
+
+    assert Counter(uploads) == {("test.csv", "data"): 2, ("train.csv", "data"): 1, ("train.csv", None): 1}
+    with open(MlflowClient().download_artifacts(run.info.run_id, "data/test.csv", str(tmp_path))) as f:
+        assert f.read() == "a\n3\n"